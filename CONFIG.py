@@ -1,7 +1,10 @@
 import os
 from typing import Tuple
 
-BASE_URL = "https://blast.ncbi.nlm.nih.gov/Blast.cgi"
+# Overridable so benchmarks can point the pipeline at a local stand-in server.
+BASE_URL = os.environ.get("BATCHBLAST_BASE_URL", "https://blast.ncbi.nlm.nih.gov/Blast.cgi")
+RESULTS_FOLDER = os.environ.get("BATCHBLAST_RESULTS_DIR", "blast_res")
+UPLOADS_FOLDER = os.environ.get("BATCHBLAST_UPLOADS_DIR", "uploads")
 CONFIG_FILE = "config"
 DEFAULT_CONFIG = ("mL", "1000", "blastn", "nt", "bos taurus", "sus scrofa")
 
@@ -44,5 +47,52 @@ def load_config() -> Tuple[str, str, str, str, str, str]:
 
 
 CONFIG = {
-    'normal_sample_size': 5
+    'normal_sample_size': 5,
+    # seconds between NCBI status polls
+    'poll_interval': float(os.environ.get("BATCHBLAST_POLL_INTERVAL", "4")),
+    # minimum seconds between Put requests across all jobs (NCBI usage guidelines)
+    'submit_interval': float(os.environ.get("BATCHBLAST_SUBMIT_INTERVAL", "10")),
+    # micro-batching of small jobs into shared submissions; a window of 0 disables it
+    'batch_window': float(os.environ.get("BATCHBLAST_BATCH_WINDOW", "0")),
+    'batch_small_job': 3,
+    'batch_max_queries': 50,
+    # seconds a job may wait on NCBI before its searches are given up; 0 waits forever
+    'job_deadline': float(os.environ.get("BATCHBLAST_JOB_DEADLINE", "3600")),
+    # resubmit a search that waits past rtoe_factor x its RTOE or the given percentile of
+    # recent searches (never sooner than min_wait seconds); the first RID to finish wins
+    'hedge_max': int(os.environ.get("BATCHBLAST_HEDGE_MAX", "1")),
+    'hedge_rtoe_factor': float(os.environ.get("BATCHBLAST_HEDGE_RTOE_FACTOR", "3")),
+    'hedge_percentile': 95,
+    'hedge_min_wait': float(os.environ.get("BATCHBLAST_HEDGE_MIN_WAIT", "60")),
+    # adaptive hit lists: search with a short list first, then rerun only queries whose
+    # list was cut off while its top-scoring hits (within adaptive_tail_ratio of the best
+    # bit score) mix normal and anomalous species
+    'adaptive_hitlist': os.environ.get("BATCHBLAST_ADAPTIVE_HITLIST", "") == "1",
+    'adaptive_initial_hits': 50,
+    'adaptive_tail_ratio': 0.9,
+    # largest accepted /upload body
+    'upload_max_bytes': int(os.environ.get("BATCHBLAST_UPLOAD_MAX_BYTES", str(2 * 1024**3))),
+    # screen nucleotide queries locally before submission (see prescreen.py); failing ones
+    # are not searched, the client gets a "prescreen" event and the job folder gets qc.tsv.
+    # On by default; BATCHBLAST_PRESCREEN=0 turns it off
+    'prescreen': os.environ.get("BATCHBLAST_PRESCREEN", "1") != "0",
+    'prescreen_min_length': int(os.environ.get("BATCHBLAST_PRESCREEN_MIN_LENGTH", "20")),
+    'prescreen_max_n': float(os.environ.get("BATCHBLAST_PRESCREEN_MAX_N", "0.2")),
+    # DUST level as in dustmasker; a sequence fails when more than max_low_complexity of it
+    # is low complexity, and with mask the low-complexity stretches of the rest become N
+    'prescreen_dust_level': float(os.environ.get("BATCHBLAST_PRESCREEN_DUST_LEVEL", "20")),
+    'prescreen_max_low_complexity': float(os.environ.get("BATCHBLAST_PRESCREEN_MAX_LOW_COMPLEXITY", "0.5")),
+    'prescreen_mask': os.environ.get("BATCHBLAST_PRESCREEN_MASK", "") == "1",
+    # "pdf" renders both PDFs with every job; "html" writes report.html instead and
+    # leaves the PDFs to be rendered on first download (can also be set per job)
+    'report_format': os.environ.get("BATCHBLAST_REPORT_FORMAT", "pdf"),
+    # worker processes for PDF rendering, started at server startup; 0 renders in-process
+    'report_workers': int(os.environ.get("BATCHBLAST_REPORT_WORKERS", "0")),
+    # worker processes for parsing result archives; 0 parses in-process
+    'parse_workers': int(os.environ.get("BATCHBLAST_PARSE_WORKERS", "0")),
+    # archives with fewer query files than this parse in-process anyway: below a few
+    # hundred, shipping chunks to workers costs more than it saves (benchmarks/parse_bench.py)
+    'parse_pool_min_queries': int(os.environ.get("BATCHBLAST_PARSE_POOL_MIN_QUERIES", "500")),
+    # profile the parse and report stages of every job (can also be set per job)
+    'profile_jobs': os.environ.get("BATCHBLAST_PROFILE", "") == "1",
 }
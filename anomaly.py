@@ -0,0 +1,137 @@
+"""Anomaly classification of BLAST hits, shared by the reports and the job pipeline.
+
+The per-file summaries here are plain Python over the result CSVs, so the
+HTML report can use them without importing pandas or ReportLab.
+"""
+import csv
+import heapq
+import os
+import random
+
+from CONFIG import CONFIG, load_config
+
+
+def is_anomaly(title, non_anomaly_keywords):
+    """Check if a result is anomalous based on absence of non-anomaly keywords"""
+    if not title:
+        return True  # Empty title is considered anomalous
+    title_lower = title.lower()
+    return not any(keyword.lower() in title_lower for keyword in non_anomaly_keywords)
+
+
+def extract_species_group(title):
+    """Extract species group from title - improved version"""
+    if not title:
+        return "Unknown"
+    
+    # Try to extract genus and species (first 2 meaningful words)
+    words = title.split()
+    if len(words) >= 2:
+        # Look for the genus (first capitalized word typically)
+        for i, word in enumerate(words):
+            if word and word[0].isupper() and len(word) > 1:
+                # Try to get genus and next word for species
+                if i + 1 < len(words):
+                    # Clean the species name (remove commas, etc.)
+                    species_word = words[i + 1].rstrip(',.;')
+                    return f"{word} {species_word}"
+                return word
+    return title[:50]  # Return first 50 chars if we can't extract properly
+
+# rows kept per file (and for the job) in the ranked anomaly-score table
+TOP_SCORED = 25
+
+
+def row_score(row):
+    """A CSV row's anomaly_score as a float, or None for files written before scoring."""
+    try:
+        return float(row.get('anomaly_score') or '')
+    except ValueError:
+        return None
+
+
+class AnomalyAggregator:
+    """One-pass summary of a result file in O(groups + sample size) memory.
+
+    Normal rows are reservoir-sampled; anomalies only keep a running count
+    and the first row seen per species group as its exemplar.
+    """
+
+    def __init__(self, non_anomaly_keywords, sample_size, rng=random):
+        self.non_anomaly_keywords = non_anomaly_keywords
+        self.sample_size = sample_size
+        self.rng = rng
+        self.total_records = 0
+        self.anomaly_count = 0
+        self.normal_count = 0
+        self.normal_samples = []
+        self.groups = {}  # species group -> [count, exemplar row]
+        self.targets = {}  # target -> [records, anomalies], for multi-target jobs
+        self.top_scored = []  # min-heap of (anomaly_score, seq, row), TOP_SCORED long
+
+    def add(self, row):
+        self.total_records += 1
+        score = row_score(row)
+        if score is not None:
+            entry = (score, self.total_records, row)
+            if len(self.top_scored) < TOP_SCORED:
+                heapq.heappush(self.top_scored, entry)
+            elif score > self.top_scored[0][0]:
+                heapq.heapreplace(self.top_scored, entry)
+        target = row.get('target')
+        if target:
+            counts = self.targets.setdefault(target, [0, 0])
+            counts[0] += 1
+        # Use subject_title instead of title for BLAST results
+        title = row.get('subject_title', '')
+        if is_anomaly(title, self.non_anomaly_keywords):
+            self.anomaly_count += 1
+            if target:
+                counts[1] += 1
+            species = extract_species_group(title)
+            group = self.groups.get(species)
+            if group is None:
+                self.groups[species] = [1, row]
+            else:
+                group[0] += 1
+        else:
+            self.normal_count += 1
+            if len(self.normal_samples) < self.sample_size:
+                self.normal_samples.append(row)
+            else:
+                slot = self.rng.randrange(self.normal_count)
+                if slot < self.sample_size:
+                    self.normal_samples[slot] = row
+
+    def grouped_anomalies(self):
+        grouped = [
+            {'species_group': species, 'count': count, 'sample': sample}
+            for species, (count, sample) in self.groups.items()
+        ]
+        return sorted(grouped, key=lambda x: x['count'], reverse=True)
+
+
+def process_csv_file(csv_path, non_anomaly_keywords=None):
+    """Process a single CSV file and return data for PDF"""
+    if non_anomaly_keywords is None:
+        non_anomaly_keywords = [load_config()[4]]
+    filename = os.path.basename(csv_path)
+    aggregator = AnomalyAggregator(non_anomaly_keywords, CONFIG['normal_sample_size'])
+
+    try:
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                aggregator.add(row)
+    except Exception as e:
+        print(f"Error processing {csv_path}: {str(e)}")
+
+    return {
+        'filename': filename,
+        'grouped_anomalies': aggregator.grouped_anomalies(),
+        'normal_samples': aggregator.normal_samples,
+        'total_records': aggregator.total_records,
+        'anomaly_count': aggregator.anomaly_count,
+        'normal_count': aggregator.normal_count,
+        'target_counts': aggregator.targets,
+        'top_scored': [row for _, _, row in sorted(aggregator.top_scored, reverse=True)]
+    }
@@ -0,0 +1,159 @@
+"""Micro-batching of small jobs into shared NCBI submissions.
+
+Jobs with only a few queries and the same search settings are held for a
+short window, submitted together as one multi-query request and share the
+resulting RID. Each job's query titles are prefixed with its ticket tag so
+``parse_blast`` can route the archive members back to the right folder.
+"""
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fasta import FastaRecord
+
+TAG_SEPARATOR = "__"
+
+
+class BatchTicket:
+    """A job's place in a batch; resolves to the shared RID and result archive."""
+
+    def __init__(self, tag: str):
+        loop = asyncio.get_running_loop()
+        self.tag = tag
+        self.rid: asyncio.Future = loop.create_future()
+        self.result: asyncio.Future = loop.create_future()
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.tag}{TAG_SEPARATOR}"
+
+    def fail(self, error: BaseException) -> None:
+        for future in (self.rid, self.result):
+            if not future.done():
+                future.set_exception(error)
+                # mark retrieved so an abandoned ticket doesn't log a warning
+                future.exception()
+
+
+class _Batch:
+    def __init__(self, config: Tuple[str, ...]):
+        self.config = config
+        self.entries: List[Tuple[BatchTicket, List[FastaRecord]]] = []
+        self.query_count = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, ticket: BatchTicket, records: List[FastaRecord]) -> None:
+        self.entries.append((ticket, records))
+        self.query_count += len(records)
+
+    def fasta(self) -> str:
+        return "\n".join(
+            f">{ticket.prefix}{record.title}\n{record.sequence}"
+            for ticket, records in self.entries
+            for record in records
+        )
+
+
+class SubmissionBatcher:
+    def __init__(
+        self,
+        submit: Callable[[str, Tuple[str, ...]], Awaitable[str]],
+        wait: Callable[[str], Awaitable[bytes]],
+        window: float,
+        small_job: int,
+        max_queries: int,
+    ):
+        self.submit = submit
+        self.wait = wait
+        self.window = window
+        self.small_job = small_job
+        self.max_queries = max_queries
+        self._open: Dict[Tuple[str, ...], _Batch] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._batches: Dict[str, _Batch] = {}
+        self._tags = itertools.count(1)
+
+    def accepts(self, records: List[FastaRecord]) -> bool:
+        return self.window > 0 and 0 < len(records) <= self.small_job
+
+    def enqueue(self, records: List[FastaRecord], config: Tuple[str, ...]) -> BatchTicket:
+        # only settings that change the remote search need to match
+        key = tuple(config[:4])
+        batch = self._open.get(key)
+        if batch is not None and batch.query_count + len(records) > self.max_queries:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = _Batch(config)
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+            self._open[key] = batch
+
+        ticket = BatchTicket(f"bb{next(self._tags):x}")
+        batch.add(ticket, records)
+        self._batches[ticket.tag] = batch
+        if batch.query_count >= self.max_queries:
+            self._flush(key)
+        return ticket
+
+    def _flush(self, key: Tuple[str, ...]) -> None:
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        task = batch.task = asyncio.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    def withdraw(self, ticket: BatchTicket) -> None:
+        """Drop a ticket whose job no longer wants the result (cancelled or hedged past).
+
+        An unsubmitted ticket leaves its batch; a submitted batch keeps
+        polling only while some other ticket is still waiting on it.
+        """
+        batch = self._batches.pop(ticket.tag, None)
+        ticket.rid.cancel()
+        ticket.result.cancel()
+        if batch is None:
+            return
+        if batch.task is None:
+            batch.entries = [(t, r) for t, r in batch.entries if t is not ticket]
+            batch.query_count = sum(len(r) for _, r in batch.entries)
+            if not batch.entries:
+                if batch.timer:
+                    batch.timer.cancel()
+                key = tuple(batch.config[:4])
+                if self._open.get(key) is batch:
+                    del self._open[key]
+        elif all(t.result.done() for t, _ in batch.entries):
+            batch.task.cancel()
+
+    async def _run(self, batch: _Batch) -> None:
+        tickets = [ticket for ticket, _ in batch.entries]
+        try:
+            await self._submit_and_wait(batch, tickets)
+        finally:
+            for ticket in tickets:
+                self._batches.pop(ticket.tag, None)
+
+    async def _submit_and_wait(self, batch: _Batch, tickets: List[BatchTicket]) -> None:
+        try:
+            rid = await self.submit(batch.fasta(), batch.config)
+        except Exception as e:
+            for ticket in tickets:
+                ticket.fail(e)
+            return
+        for ticket in tickets:
+            if not ticket.rid.done():
+                ticket.rid.set_result(rid)
+
+        try:
+            content = await self.wait(rid)
+        except Exception as e:
+            for ticket in tickets:
+                ticket.fail(e)
+            return
+        for ticket in tickets:
+            if not ticket.result.done():
+                ticket.result.set_result(content)
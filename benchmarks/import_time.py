@@ -0,0 +1,102 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to import ``main:app``.
+
+Each run is a new process, so nothing is cached in ``sys.modules``; the OS
+page cache is warm after the first run, which matches uvicorn reloads and
+worker restarts. The slowest top-level imports are taken from
+``python -X importtime`` so regressions can be traced to a module.
+
+    python -m benchmarks.import_time --runs 10 --output import_time.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.report_bench import REPO_ROOT, _git_revision
+
+# modules that must stay out of the server's import path
+HEAVY_MODULES = ("pandas", "reportlab", "requests")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(module: str) -> Dict[str, Any]:
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` output into the modules with the largest cumulative time."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header row
+        # names are indented two spaces per nesting level; keep direct imports of the probe
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            rows.append({
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the web app.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to report")
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    samples = [time_import(args.module) for _ in range(args.runs)]
+    seconds = sorted(sample["seconds"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    breakdown = slowest_imports(args.module, args.top)
+
+    print(f"import {args.module}: median {statistics.median(seconds) * 1000:.0f}ms "
+          f"min {seconds[0] * 1000:.0f}ms max {seconds[-1] * 1000:.0f}ms over {args.runs} runs")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    for row in breakdown:
+        print(f"  {row['cumulative_ms']:8.1f}ms  {row['module']}")
+
+    document = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "module": args.module,
+        "runs": args.runs,
+        "median_seconds": statistics.median(seconds),
+        "samples_seconds": seconds,
+        "heavy_modules_loaded": loaded,
+        "slowest_imports": breakdown,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""End-to-end load benchmark for the BLAST pipeline.
+
+Starts the mock NCBI server and ``main:app`` as subprocesses, drives N
+concurrent websocket jobs through the real ``run_blast_job`` pipeline and
+reports jobs/min, time per stage and websocket event latency percentiles.
+
+    python -m benchmarks.load_test --jobs 20 --queries 4 --hits 200 --latency 3
+
+Results land in a temporary results folder unless --results-dir is given.
+Requires ``websockets`` in addition to the app's own dependencies.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# progress titles emitted by run_blast_job that close a stage
+STAGE_MARKERS = {
+    "Waiting for BLAST Result...": "submit",
+    "BLAST Completed...": "ncbi_wait",
+    "Parsing Completed...": "parse",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def synthetic_fasta(queries: int, seq_len: int, rng: random.Random) -> str:
+    records = []
+    for i in range(queries):
+        seq = "".join(rng.choices("ACGT", k=seq_len))
+        records.append(f">bench_{rng.randrange(10**9)}_{i}\n{seq}")
+    return "\n".join(records)
+
+
+def _server_time(timestamp: str) -> float:
+    # main.py stamps events with naive UTC isoformat strings
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+async def run_client(url: str, fasta: str) -> Dict[str, Any]:
+    events = []
+    started = time.time()
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"action": "start", "fasta": fasta}))
+        async for raw in ws:
+            received = time.time()
+            message = json.loads(raw)
+            events.append((received, message))
+            if message.get("type") in {"complete", "error"}:
+                break
+
+    result: Dict[str, Any] = {
+        "status": events[-1][1].get("type") if events else "error",
+        "total": time.time() - started,
+        "stages": {},
+        "server_stages": events[-1][1].get("metrics", {}).get("stages", {}) if events else {},
+        "latencies": [],
+    }
+    last = started
+    for received, message in events:
+        if message.get("timestamp") and message.get("type") not in {"job_ack", "resume_ack"}:
+            result["latencies"].append(received - _server_time(message["timestamp"]))
+        payload = message.get("payload")
+        title = payload[0] if isinstance(payload, list) and payload else None
+        if title in STAGE_MARKERS:
+            result["stages"][STAGE_MARKERS[title]] = received - last
+            last = received
+        elif message.get("type") == "complete":
+            result["stages"]["reports"] = received - last
+    return result
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    mock_port, app_port = free_port(), free_port()
+    results_dir = args.results_dir or tempfile.mkdtemp(prefix="batchblast_bench_")
+
+    mock = start_process(
+        ["benchmarks.mock_ncbi:app", "--port", str(mock_port)],
+        {
+            "MOCK_NCBI_HITS": str(args.hits),
+            "MOCK_NCBI_HSPS": str(args.hsps),
+            "MOCK_NCBI_LATENCY": str(args.latency),
+            "MOCK_NCBI_JITTER": str(args.jitter),
+        },
+    )
+    app = start_process(
+        ["main:app", "--port", str(app_port)],
+        {
+            "BATCHBLAST_BASE_URL": f"http://127.0.0.1:{mock_port}/Blast.cgi",
+            "BATCHBLAST_RESULTS_DIR": str(results_dir),
+            "BATCHBLAST_POLL_INTERVAL": str(args.poll_interval),
+            "BATCHBLAST_SUBMIT_INTERVAL": str(args.submit_interval),
+            "BATCHBLAST_BATCH_WINDOW": str(args.batch_window),
+        },
+    )
+    try:
+        await wait_ready(f"http://127.0.0.1:{mock_port}/stats")
+        await wait_ready(f"http://127.0.0.1:{app_port}/getconfig")
+
+        url = f"ws://127.0.0.1:{app_port}/"
+        started = time.time()
+        runs = await asyncio.gather(*[
+            run_client(url, synthetic_fasta(args.queries, args.seq_len, rng))
+            for _ in range(args.jobs)
+        ])
+        wall = time.time() - started
+        async with httpx.AsyncClient() as client:
+            mock_stats = (await client.get(f"http://127.0.0.1:{mock_port}/stats")).json()
+    finally:
+        for proc in (app, mock):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    completed = [r for r in runs if r["status"] == "complete"]
+    stage_names = ["submit", "ncbi_wait", "parse", "reports"]
+    return {
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "results_dir": str(results_dir),
+        "wall_seconds": wall,
+        "jobs_completed": len(completed),
+        "jobs_failed": len(runs) - len(completed),
+        "jobs_per_min": len(completed) / wall * 60 if wall else 0,
+        "job_seconds": summarize([r["total"] for r in completed]),
+        "stages": {
+            name: summarize([r["stages"][name] for r in completed if name in r["stages"]])
+            for name in stage_names
+        },
+        "server_stages": {
+            name: summarize([r["server_stages"][name] for r in completed if name in r["server_stages"]])
+            for name in sorted({n for r in completed for n in r["server_stages"]})
+        },
+        "event_latency_ms": summarize([l * 1000 for r in runs for l in r["latencies"]]),
+        "mock_ncbi": mock_stats,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def fmt(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.3f}"
+
+    print(f"jobs completed : {report['jobs_completed']} ({report['jobs_failed']} failed)")
+    print(f"wall time      : {report['wall_seconds']:.2f}s")
+    print(f"throughput     : {report['jobs_per_min']:.2f} jobs/min")
+    print(f"{'stage':<24}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}  (seconds)")
+    for name, stats in [("job", report["job_seconds"]), *report["stages"].items()]:
+        print(f"{name:<24}{fmt(stats['mean']):>10}{fmt(stats['p50']):>10}"
+              f"{fmt(stats['p95']):>10}{fmt(stats['max']):>10}")
+    for name, stats in report["server_stages"].items():
+        print(f"{'server:' + name:<24}{fmt(stats['mean']):>10}{fmt(stats['p50']):>10}"
+              f"{fmt(stats['p95']):>10}{fmt(stats['max']):>10}")
+    lat = report["event_latency_ms"]
+    print(f"event latency  : p50 {fmt(lat['p50'])}ms  p95 {fmt(lat['p95'])}ms  "
+          f"p99 {fmt(lat['p99'])}ms  max {fmt(lat['max'])}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark for BatchBLAST.")
+    parser.add_argument("--jobs", type=int, default=10, help="concurrent websocket jobs")
+    parser.add_argument("--queries", type=int, default=4, help="sequences per job")
+    parser.add_argument("--seq-len", type=int, default=300)
+    parser.add_argument("--hits", type=int, default=100, help="hits per query returned by the mock")
+    parser.add_argument("--hsps", type=int, default=1, help="HSPs per hit returned by the mock")
+    parser.add_argument("--latency", type=float, default=3, help="simulated NCBI search time (s)")
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--submit-interval", type=float, default=0,
+                        help="server-side spacing between NCBI submissions (s)")
+    parser.add_argument("--batch-window", type=float, default=0,
+                        help="micro-batching window for small jobs (s); 0 disables")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results-dir", default=None)
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
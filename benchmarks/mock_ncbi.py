@@ -0,0 +1,243 @@
+"""Local stand-in for the NCBI BLAST URL API (Blast.cgi).
+
+Implements just enough of the CMD=Put / CMD=Get protocol spoken by
+``send_blast`` and ``check_blast``: Put returns the RID HTML page, Get
+returns a Status=WAITING page until the simulated search time has elapsed
+and then a zipped JSON2 archive with synthetic hits.
+
+    python -m benchmarks.mock_ncbi --port 8001 --hits 100 --latency 5
+    BATCHBLAST_BASE_URL=http://127.0.0.1:8001/Blast.cgi python main.py
+
+Settings are read from MOCK_NCBI_* environment variables so the app can
+also be served with ``uvicorn benchmarks.mock_ncbi:app``.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import string
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+SETTINGS = {
+    "hits": int(os.environ.get("MOCK_NCBI_HITS", "100")),
+    "hsps": int(os.environ.get("MOCK_NCBI_HSPS", "1")),
+    "latency": float(os.environ.get("MOCK_NCBI_LATENCY", "5")),
+    "jitter": float(os.environ.get("MOCK_NCBI_JITTER", "0")),
+    "seed": int(os.environ.get("MOCK_NCBI_SEED", "0")),
+    # every Nth submission (the 1st, N+1th, ...) stays WAITING forever; 0 disables
+    "stall_every": int(os.environ.get("MOCK_NCBI_STALL_EVERY", "0")),
+    # chance that a hit comes from its query's dominant species instead of a random one
+    "purity": float(os.environ.get("MOCK_NCBI_PURITY", "0")),
+}
+
+SPECIES = [
+    ("Sus scrofa", 9823),
+    ("Bos taurus", 9913),
+    ("Danio rerio", 7955),
+    ("Homo sapiens", 9606),
+    ("Gallus gallus", 9031),
+    ("Ovis aries", 9940),
+    ("Capra hircus", 9925),
+    ("Mus musculus", 10090),
+]
+
+app = FastAPI()
+
+# rid -> job info; kept in memory for the lifetime of the process
+jobs: Dict[str, Dict[str, Any]] = {}
+stats = {"put": 0, "get": 0, "ready": 0}
+
+
+def _new_rid() -> str:
+    return "".join(random.choices(string.ascii_uppercase + string.digits, k=11))
+
+
+def parse_query(query: str) -> List[Tuple[str, str]]:
+    """Split a FASTA query into (title, sequence) pairs."""
+    records = []
+    title = None
+    seq: List[str] = []
+    for line in query.splitlines():
+        line = line.strip()
+        if line.startswith(">"):
+            if title is not None:
+                records.append((title, "".join(seq)))
+            title = line[1:].strip()
+            seq = []
+        elif title is not None:
+            seq.append(line)
+    if title is not None:
+        records.append((title, "".join(seq)))
+    return records
+
+
+def make_hit(
+    rng: random.Random, num: int, query_seq: str, hsp_count: int,
+    dominant: Optional[Tuple[str, int]] = None,
+) -> Dict[str, Any]:
+    if dominant and rng.random() < SETTINGS["purity"]:
+        species, taxid = dominant
+    else:
+        species, taxid = rng.choice(SPECIES)
+    accession = "".join(rng.choices(string.ascii_uppercase, k=2)) + str(rng.randint(100000, 999999))
+    query_len = max(len(query_seq), 1)
+    hsps = []
+    for hsp_num in range(1, hsp_count + 1):
+        align_len = rng.randint(max(query_len // 2, 1), query_len)
+        identity = rng.randint(int(align_len * 0.8), align_len)
+        gaps = rng.randint(0, max(align_len - identity, 0))
+        query_from = rng.randint(1, query_len - align_len + 1)
+        hit_from = rng.randint(1, 16000)
+        bit_score = round(identity * 1.8 + rng.random(), 4)
+        hsps.append({
+            "num": hsp_num,
+            "bit_score": bit_score,
+            "score": int(bit_score / 1.8),
+            "evalue": float(f"{rng.uniform(1e-30, 1.0) ** 4:.6g}"),
+            "identity": identity,
+            "query_from": query_from,
+            "query_to": query_from + align_len - 1,
+            "query_strand": "Plus",
+            "hit_from": hit_from,
+            "hit_to": hit_from + align_len - 1,
+            "hit_strand": rng.choice(["Plus", "Minus"]),
+            "align_len": align_len,
+            "gaps": gaps,
+            "qseq": query_seq[query_from - 1: query_from - 1 + align_len],
+            "hseq": query_seq[query_from - 1: query_from - 1 + align_len],
+            "midline": "|" * align_len,
+        })
+    return {
+        "num": num,
+        "description": [{
+            "id": f"gi|{rng.randint(10**8, 10**10)}|gb|{accession}.1|",
+            "accession": accession,
+            "title": f"{species} isolate {accession[-4:]} mitochondrion, complete genome",
+            "taxid": taxid,
+            "sciname": species,
+        }],
+        "len": 16000,
+        "hsps": hsps,
+    }
+
+
+def build_archive(rid: str, records: List[Tuple[str, str]], hits: int, hsps: int, seed: int) -> bytes:
+    """Build a JSON2 zip archive the way NCBI lays it out: an index plus one file per query."""
+    rng = random.Random(f"{seed}:{rid}")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        files = [f"{rid}_{i}.json" for i in range(1, len(records) + 1)]
+        zf.writestr(f"{rid}.json", json.dumps({"BlastJSON": [{"File": f} for f in files]}))
+        for index, ((title, seq), member) in enumerate(zip(records, files), start=1):
+            # only drawn when enabled so default archives stay identical across versions
+            dominant = rng.choice(SPECIES) if SETTINGS["purity"] > 0 else None
+            search = {
+                "query_id": f"Query_{index}",
+                "query_title": title,
+                "query_len": len(seq),
+                "hits": [make_hit(rng, n, seq, hsps, dominant) for n in range(1, hits + 1)],
+                "stat": {"db_num": 100000, "db_len": 10**9},
+            }
+            payload = {"BlastOutput2": {"report": {
+                "program": "blastn",
+                "results": {"search": search},
+            }}}
+            zf.writestr(member, json.dumps(payload))
+    return buffer.getvalue()
+
+
+def rid_page(rid: str, rtoe: int) -> str:
+    return f"""<html><body>
+<!--QBlastInfoBegin
+    RID = {rid}
+    RTOE = {rtoe}
+QBlastInfoEnd
+-->
+<form><input name="RID" type="hidden" value="{rid}" id="rid" /></form>
+</body></html>"""
+
+
+def status_page(status: str) -> str:
+    return f"""<html><body>
+<!--QBlastInfoBegin
+    Status={status}
+QBlastInfoEnd
+-->
+</body></html>"""
+
+
+@app.api_route("/Blast.cgi", methods=["GET", "POST"])
+async def blast_cgi(request: Request):
+    params = dict(request.query_params)
+    if request.method == "POST":
+        params.update(dict(await request.form()))
+    cmd = params.get("CMD", "")
+
+    if cmd == "Put":
+        stats["put"] += 1
+        rid = _new_rid()
+        latency = max(SETTINGS["latency"] + random.uniform(-1, 1) * SETTINGS["jitter"], 0)
+        stalled = SETTINGS["stall_every"] > 0 and (stats["put"] - 1) % SETTINGS["stall_every"] == 0
+        jobs[rid] = {
+            "records": parse_query(str(params.get("QUERY", ""))),
+            # the hit list size requested by the client caps the synthetic hit count
+            "hits": min(int(params.get("HITLIST_SIZE") or SETTINGS["hits"]), SETTINGS["hits"]),
+            "ready_at": float("inf") if stalled else time.monotonic() + latency,
+            "archive": None,
+        }
+        return HTMLResponse(rid_page(rid, int(latency) or 1))
+
+    if cmd == "Get":
+        stats["get"] += 1
+        job = jobs.get(str(params.get("RID", "")))
+        if job is None:
+            return HTMLResponse(status_page("UNKNOWN"))
+        if time.monotonic() < job["ready_at"]:
+            return HTMLResponse(status_page("WAITING"))
+        if job["archive"] is None:
+            stats["ready"] += 1
+            job["archive"] = build_archive(
+                str(params["RID"]), job["records"], job["hits"], SETTINGS["hsps"], SETTINGS["seed"]
+            )
+        return Response(job["archive"], media_type="application/zip")
+
+    return HTMLResponse("An error has occurred on the server", status_code=400)
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "jobs": len(jobs), "settings": SETTINGS}
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--hits", type=int, default=SETTINGS["hits"], help="hits per query")
+    parser.add_argument("--hsps", type=int, default=SETTINGS["hsps"], help="HSPs per hit")
+    parser.add_argument("--latency", type=float, default=SETTINGS["latency"],
+                        help="seconds a search stays WAITING")
+    parser.add_argument("--jitter", type=float, default=SETTINGS["jitter"],
+                        help="uniform +/- jitter applied to latency")
+    parser.add_argument("--seed", type=int, default=SETTINGS["seed"])
+    parser.add_argument("--stall-every", type=int, default=SETTINGS["stall_every"],
+                        help="every Nth search never finishes (exercises hedging); 0 disables")
+    parser.add_argument("--purity", type=float, default=SETTINGS["purity"],
+                        help="chance a hit is from its query's dominant species (0 = all random)")
+    args = parser.parse_args()
+    SETTINGS.update(hits=args.hits, hsps=args.hsps, latency=args.latency,
+                    jitter=args.jitter, seed=args.seed, stall_every=args.stall_every,
+                    purity=args.purity)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
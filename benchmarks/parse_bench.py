@@ -0,0 +1,92 @@
+"""Benchmark for parsing a multi-query archive in-process versus on the parse pool.
+
+Builds a mock JSON2 archive (see mock_ncbi.build_archive), parses it with
+``parse_archives`` and then with ``parsing.parse_in_pool`` at each worker
+count, checks that every CSV and hsps.tsv match the in-process output
+byte for byte, and reports the wall time of each.
+
+    python -m benchmarks.parse_bench --queries 500 --hits 200 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.mock_ncbi import build_archive
+from benchmarks.report_bench import _git_revision
+from blast import parse_archives
+from parsing import parse_in_pool
+from workers import _warm_parser
+
+
+def _snapshot(folder: Path):
+    return {path.name: path.read_bytes() for path in sorted(folder.iterdir()) if path.is_file()}
+
+
+async def _pooled(workers: int, archives, folder: Path, keywords) -> float:
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_parser
+    )
+    try:
+        loop = asyncio.get_running_loop()
+        # time the parse, not process start
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_parser) for _ in range(workers)))
+        start = time.perf_counter()
+        await parse_in_pool(executor, workers, archives, folder, keywords)
+        return time.perf_counter() - start
+    finally:
+        executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time serial and pooled archive parsing.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--hits", type=int, default=200)
+    parser.add_argument("--hsps", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    records = [(f"sample_{index:04d}", "ACGT" * 40) for index in range(args.queries)]
+    archives = [(None, build_archive("BENCH", records, args.hits, args.hsps, args.seed), None)]
+    keywords = ["sus scrofa"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = Path(tmp) / "serial"
+        start = time.perf_counter()
+        parse_archives(archives, serial, keywords)
+        serial_seconds = time.perf_counter() - start
+        expected = _snapshot(serial)
+        print(f"  serial  {serial_seconds:7.2f}s")
+
+        cases = [{"workers": 0, "seconds": serial_seconds}]
+        for workers in args.workers:
+            folder = Path(tmp) / f"pool{workers}"
+            seconds = asyncio.run(_pooled(workers, archives, folder, keywords))
+            if _snapshot(folder) != expected:
+                raise SystemExit(f"pooled output with {workers} workers differs from parse_archives")
+            cases.append({"workers": workers, "seconds": seconds})
+            print(f"{workers:>3} workers {seconds:7.2f}s  ({serial_seconds / seconds:.2f}x)")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": multiprocessing.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "queries": args.queries,
+            "hits": args.hits,
+            "hsps": args.hsps,
+            "cases": cases,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
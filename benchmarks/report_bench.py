@@ -0,0 +1,158 @@
+"""Synthetic-data benchmarks for the report.py generators.
+
+Synthesizes job folders shaped like ``parse_blast`` output at a grid of
+scales and times the individual report stages. Each scale runs in a fresh
+process so peak RSS is attributable to that case alone.
+
+    python -m benchmarks.report_bench --queries 10 100 --hits 10 100 --output bench.json
+
+Results are written as JSON (one record per case) so runs from different
+versions can be diffed.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+FIELDNAMES = [
+    "query_id", "query_title", "subject_id", "subject_accession",
+    "subject_title", "taxid", "sci_name", "identity_pct",
+    "bit_score", "evalue"
+]
+
+SPECIES = [
+    ("Sus scrofa", 9823),
+    ("Bos taurus", 9913),
+    ("Danio rerio", 7955),
+    ("Homo sapiens", 9606),
+    ("Gallus gallus", 9031),
+    ("Ovis aries", 9940),
+]
+
+
+def synthesize_job_folder(folder: Path, queries: int, hits: int, seed: int = 0) -> None:
+    """Write one parse_blast-style CSV per query into folder."""
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for q in range(queries):
+        title = f"sample_{q:05d}"
+        with (folder / f"{title}.csv").open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            for h in range(hits):
+                species, taxid = rng.choice(SPECIES)
+                accession = f"AB{rng.randint(100000, 999999)}"
+                writer.writerow([
+                    f"Query_{q}", title, f"gi|{h}|gb|{accession}.1|", accession,
+                    f"{species} isolate {accession[-4:]} mitochondrion, complete genome",
+                    taxid, species, round(rng.uniform(80, 100), 2),
+                    round(rng.uniform(40, 600), 4), f"{rng.uniform(0, 1) ** 6:.6g}",
+                ])
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _timed(timings: Dict[str, float], name: str, fn: Callable, *args) -> Any:
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def run_case(queries: int, hits: int, seed: int) -> Dict[str, Any]:
+    """Time every report stage for one synthetic job folder (runs in a child process)."""
+    sys.path.insert(0, str(REPO_ROOT))
+    import report
+
+    base_rss = _peak_rss_mb()
+    workdir = Path(tempfile.mkdtemp(prefix="batchblast_report_bench_"))
+    try:
+        folder = workdir / "job"
+        timings: Dict[str, float] = {}
+        _timed(timings, "synthesize", synthesize_job_folder, folder, queries, hits, seed)
+        csv_files = sorted(folder.glob("*.csv"))
+
+        start = time.perf_counter()
+        keywords = [report.load_config()[4]]
+        all_data = [report.process_csv_file(str(path), keywords) for path in csv_files]
+        timings["process_csv_file"] = time.perf_counter() - start
+        _timed(timings, "create_pdf_report", report.create_pdf_report, all_data, folder)
+
+        generator = report.BLASTReportGenerator("BLAST_Full_Report.pdf")
+        dataframes = _timed(timings, "read_csv_files", generator.read_csv_files, folder)
+        _timed(timings, "generate_summary_stats", generator.generate_summary_stats, dataframes)
+        _timed(timings, "create_file_data_tables", generator.create_file_data_tables, dataframes)
+
+        return {
+            "queries": queries,
+            "hits": hits,
+            "rows": queries * hits,
+            "seconds": timings,
+            "peak_rss_mb": _peak_rss_mb(),
+            "import_rss_mb": base_rss,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_grid(grid: List[Tuple[int, int]], seed: int) -> List[Dict[str, Any]]:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for queries, hits in grid:
+        with ctx.Pool(1) as pool:
+            case = pool.apply(run_case, (queries, hits, seed))
+        results.append(case)
+        stages = "  ".join(f"{k}={v:.3f}s" for k, v in case["seconds"].items())
+        print(f"{queries:>5} queries x {hits:>5} hits  rss={case['peak_rss_mb']:.0f}MB  {stages}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark report.py generators on synthetic data.")
+    parser.add_argument("--queries", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--hits", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    grid = [(q, h) for q in args.queries for h in args.hits]
+    results = run_grid(grid, args.seed)
+    document = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2))
+
+
+if __name__ == "__main__":
+    main()
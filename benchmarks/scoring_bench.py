@@ -0,0 +1,63 @@
+"""Benchmark for the vectorized anomaly scoring in scoring.py.
+
+Scores synthetic hit arrays (one value per hit, as parse_archives passes
+them) at several sizes and reports the wall time of each pass.
+
+    python -m benchmarks.scoring_bench --hits 100000 1000000 --hits-per-query 1000
+"""
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.report_bench import _git_revision
+from scoring import score_hits
+
+
+def synthesize(hits: int, hits_per_query: int, seed: int):
+    rng = np.random.default_rng(seed)
+    query = np.repeat(np.arange(-(-hits // hits_per_query)), hits_per_query)[:hits]
+    identity = rng.uniform(80, 100, hits)
+    bit_score = identity * rng.uniform(1.5, 2.0, hits)
+    evalue = rng.uniform(0, 1, hits) ** 6
+    taxid = rng.integers(0, 8, hits)
+    keyword_miss = rng.random(hits) < 0.3
+    return query, identity, bit_score, evalue, taxid, keyword_miss
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time scoring.score_hits on synthetic hits.")
+    parser.add_argument("--hits", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--hits-per-query", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    cases = []
+    for hits in args.hits:
+        arrays = synthesize(hits, args.hits_per_query, args.seed)
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            score_hits(*arrays)
+            samples.append(time.perf_counter() - start)
+        cases.append({"hits": hits, "hits_per_query": args.hits_per_query, "seconds": min(samples)})
+        print(f"{hits:>9} hits  {min(samples) * 1000:8.1f}ms  ({hits / min(samples) / 1e6:.1f}M hits/s)")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cases": cases,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
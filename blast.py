@@ -1,4 +1,3 @@
-import requests
 import string
 import random
 import re
@@ -9,15 +8,130 @@ import io
 import csv
 import zipfile
 import asyncio
+from collections import Counter
 from pathlib import Path
 
 from CONFIG import *
-from report import *
+from fasta import (
+    PROTEIN_QUERY_PROGRAMS, FastaError, collapse_duplicates, format_fasta, parse_fasta,
+    parse_fasta_file, query_alphabet,
+)
+from metrics import CURRENT_JOB, JobMetrics, WaitLine, count_global
+from batcher import SubmissionBatcher
+from hitindex import INDEX_FILENAME, build_hit_index
+from hittable import HSP_COLUMN_NAMES, HSP_FILENAME, HitTable
+from profiling import JobProfiler, profile_call
+from catalog import finish_job, record_job, recent_search_seconds
+from workers import PARSE_POOL, REPORT_POOL
+from hedging import Hedger
+from anomaly import extract_species_group, is_anomaly
+from htmlreport import write_html_report
 
-async def send_blast(fasta_string):
+class BlastError(Exception):
+    """NCBI reported a failed or unknown search."""
+
+
+class RateLimiter:
+    """Space out NCBI requests so concurrent jobs share one request budget."""
+
+    def __init__(self, min_interval, name="ncbi_submit"):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+        self.line = WaitLine(name)
+
+    async def wait(self):
+        # the lock is FIFO, so the line's order is the order requests go out
+        with self.line.waiting():
+            async with self._lock:
+                delay = self._next - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next = time.monotonic() + self.min_interval
+
+
+SUBMIT_LIMITER = RateLimiter(CONFIG['submit_interval'])
+
+# rid -> NCBI's estimated seconds to completion, reported with the RID
+RTOE_ESTIMATES = {}
+
+
+def new_results_folder():
     folder_name = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
-    folder_path = Path("blast_res") / folder_name
+    folder_path = Path(RESULTS_FOLDER) / folder_name
     folder_path.mkdir(parents=True, exist_ok=True)
+    return folder_path
+
+def program_params(program):
+    """Translate a UI program name into NCBI Put parameters (megablast variants are blastn tasks)."""
+    if program == "megablast":
+        return {"PROGRAM": "blastn", "MEGABLAST": "on"}
+    if program == "dc-megablast":
+        return {"PROGRAM": "blastn", "BLAST_PROGRAMS": "discoMegablast"}
+    return {"PROGRAM": program}
+
+
+def normalize_targets(targets, config):
+    """Return a de-duplicated list of (program, database) pairs.
+
+    Targets may be given as "program:database" strings, [program, database]
+    pairs or {"program", "database"} objects; missing parts fall back to the
+    configured program and database. None means just the configured pair.
+    """
+    default = (config[2], config[3])
+    if not targets:
+        return [default]
+    if isinstance(targets, (str, dict)):
+        targets = [targets]
+    normalized = []
+    for target in targets:
+        if isinstance(target, str):
+            program, _, database = target.partition(":")
+        elif isinstance(target, dict):
+            program, database = target.get("program"), target.get("database")
+        elif isinstance(target, (list, tuple)) and len(target) == 2:
+            program, database = target
+        else:
+            raise ValueError(f"Invalid BLAST target: {target!r}")
+        pair = (str(program or default[0]).strip(), str(database or default[1]).strip())
+        if pair not in normalized:
+            normalized.append(pair)
+    return normalized
+
+
+def target_label(target):
+    return f"{target[0]}:{target[1]}"
+
+
+def target_config(config, target):
+    """The job's config snapshot with the program and database swapped for one target."""
+    return (config[0], config[1], target[0], target[1], *config[4:])
+
+
+def prescreens(targets):
+    """Whether a job's queries go through the local pre-screen, which only judges nucleotides."""
+    return CONFIG['prescreen'] and not any(program in PROTEIN_QUERY_PROGRAMS for program, _ in targets)
+
+
+def adaptive_hitlist_size(config, adaptive):
+    """First-phase hit list size for an adaptive job, or None to search with the full list."""
+    if not adaptive:
+        return None
+    try:
+        full = int(config[1])
+    except (TypeError, ValueError):
+        return None
+    initial = CONFIG['adaptive_initial_hits']
+    return initial if full > initial else None
+
+
+def with_hitlist(config, size):
+    return (config[0], str(size), *config[2:])
+
+
+async def submit_blast(fasta_string, config=None):
+    filter_value, output_qty, program, database = (config or load_config())[:4]
+    await SUBMIT_LIMITER.wait()
     async with httpx.AsyncClient() as client:
         headers = {
             "User-Agent": "Mozilla/5.0"
@@ -25,14 +139,14 @@ async def send_blast(fasta_string):
         
         put_params = {
             "CMD": "Put",
-            "PROGRAM": load_config()[2],
-            "DATABASE": load_config()[3],
+            **program_params(program),
+            "DATABASE": database,
             "QUERY": fasta_string,
             "FORMAT_TYPE": "JSON2",
-            "HITLIST_SIZE": load_config()[1],
-            "DESCRIPTIONS": load_config()[1],
-            "ALIGNMENTS": load_config()[1],
-            "FILTER": load_config()[0]
+            "HITLIST_SIZE": output_qty,
+            "DESCRIPTIONS": output_qty,
+            "ALIGNMENTS": output_qty,
+            "FILTER": filter_value
         }
         
         for i in range(10):
@@ -41,12 +155,20 @@ async def send_blast(fasta_string):
                 break
         rid_match = re.search(r'name="RID"\s+[^>]*value="([A-Z0-9]+)"', resp.text)
         rid = rid_match.group(1)
-        return rid, folder_path
+        rtoe_match = re.search(r'RTOE\s*=\s*(\d+)', resp.text)
+        if rtoe_match:
+            RTOE_ESTIMATES[rid] = int(rtoe_match.group(1))
+        return rid
+
+async def send_blast(fasta_string, config=None):
+    folder_path = new_results_folder()
+    rid = await submit_blast(fasta_string, config)
+    return rid, folder_path
 
 async def check_blast(rid):
     async with httpx.AsyncClient() as client:
         poll = await client.get(
-            "https://blast.ncbi.nlm.nih.gov/Blast.cgi",
+            BASE_URL,
             params={"CMD": "Get", "RID": rid, "FORMAT_TYPE": "JSON2"},
         )
         text = poll.text
@@ -67,116 +189,711 @@ async def check_blast(rid):
         else:  # Add this check
             return 1, poll.content
 
-def parse_blast(content, folderid):
-    folder_path = Path(folderid)
-    folder_path.mkdir(parents=True, exist_ok=True)
+async def wait_for_blast(rid, count=count_global):
+    """Poll a RID until its results are ready and return the archive bytes.
+
+    Gives up with BlastError after CONFIG['job_deadline'] seconds so no RID
+    (including one shared by a batch) is polled forever.
+    """
+    deadline = time.monotonic() + CONFIG['job_deadline'] if CONFIG['job_deadline'] > 0 else None
+    try:
+        while True:
+            count("polls")
+            code, content = await check_blast(rid)
+            if code == 0:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise BlastError(f"BLAST search {rid} did not finish in time")
+                await asyncio.sleep(CONFIG['poll_interval'])
+            elif code == 9:
+                raise BlastError(f"BLAST search {rid} failed")
+            else:
+                count("download_bytes", len(content))
+                return content
+    finally:
+        RTOE_ESTIMATES.pop(rid, None)
+
+
+BATCHER = SubmissionBatcher(
+    submit_blast,
+    wait_for_blast,
+    window=CONFIG['batch_window'],
+    small_job=CONFIG['batch_small_job'],
+    max_queries=CONFIG['batch_max_queries'],
+)
+
+HEDGER = Hedger(
+    wait_for_blast,
+    rtoe_factor=CONFIG['hedge_rtoe_factor'],
+    percentile=CONFIG['hedge_percentile'],
+    min_wait=CONFIG['hedge_min_wait'],
+    max_hedges=CONFIG['hedge_max'],
+    load_history=recent_search_seconds,
+)
+
+RAW_ARCHIVE = "blast_raw.zip"
+RAW_MANIFEST = "blast_raw.json"
+REPROCESS_NOTE = "reprocess.json"
+# per-query pre-screen results (see prescreen.py)
+QC_FILENAME = "qc.tsv"
+REPORT_FORMATS = ("pdf", "html")
+
+CSV_FIELDNAMES = [
+    "query_id", "query_title", "subject_id", "subject_accession",
+    "subject_title", "taxid", "sci_name", "identity_pct",
+    "bit_score", "evalue"
+]
+
+
+def safe_filename(query_title):
+    # Remove or replace characters that are not safe for filenames
+    safe = re.sub(r'[<>:"/\\|?*]', '_', query_title)
+    # Limit filename length to avoid filesystem issues
+    return safe[:100]
+
+
+def archive_members(content):
+    """Yield (name, data) for each JSON file in a result archive."""
     with zipfile.ZipFile(io.BytesIO(content)) as zf:
         for name in zf.namelist():
-            if not name.lower().endswith(".json"):
-                continue
-    
-            with zf.open(name) as f:
-                j = json.load(f)
+            if name.lower().endswith(".json"):
+                yield name, zf.read(name)
 
-            if "BlastJSON" in j:
-                continue
 
-            try:
-                report = j["BlastOutput2"]["report"]
-                search = report["results"]["search"]
-                query_title = search.get("query_title", "")
-                
-                # Create a safe filename from query_title
-                if query_title:
-                    # Remove or replace characters that are not safe for filenames
-                    safe_filename = re.sub(r'[<>:"/\\|?*]', '_', query_title)
-                    # Limit filename length to avoid filesystem issues
-                    safe_filename = safe_filename[:100]
-                else:
-                    # Fallback to original name if query_title is empty
-                    safe_filename = name.replace(".json", "")
-            except (KeyError, TypeError):
-                continue
-    
-            rows = []
-            for hit in search.get("hits", []):
-                if not hit.get("description") or not hit.get("hsps"):
+def read_member(name, data, query_prefix=None):
+    """(query_title, csv_name, report) for one archive member, or None if it holds no search of ours."""
+    j = json.loads(data)
+    if "BlastJSON" in j:
+        return None
+
+    try:
+        report = j["BlastOutput2"]["report"]
+        search = report["results"]["search"]
+        query_title = search.get("query_title", "")
+        if query_prefix is not None:
+            if not query_title.startswith(query_prefix):
+                return None
+            query_title = query_title[len(query_prefix):]
+
+        # Create a safe filename from query_title
+        if query_title:
+            csv_name = safe_filename(query_title)
+        else:
+            # Fallback to original name if query_title is empty
+            csv_name = name.replace(".json", "")
+    except (KeyError, TypeError):
+        return None
+
+    return query_title, csv_name, report
+
+
+def _iter_reports(content, query_prefix=None):
+    """Yield (query_title, csv_name, report) for each query in a JSON2 archive."""
+    for name, data in archive_members(content):
+        member = read_member(name, data, query_prefix)
+        if member is not None:
+            yield member
+
+
+def _iter_searches(content, query_prefix=None):
+    """Yield (query_title, csv_name, search) for each query in a JSON2 archive."""
+    for query_title, csv_name, report in _iter_reports(content, query_prefix):
+        yield query_title, csv_name, report["results"]["search"]
+
+
+def undecided_queries(content, query_prefix, hitlist_size, non_anomaly_keywords):
+    """Titles of queries a short hit list can't settle, so need the full list.
+
+    A list shorter than the requested size already holds every hit NCBI
+    found. A full list is undecided only when its top-scoring hits, those
+    within adaptive_tail_ratio of the best bit score, mix normal and
+    anomalous species: more hits at those scores could tip the call either
+    way. Anomalous hits far down the list don't change it.
+    """
+    undecided = set()
+    for query_title, _, search in _iter_searches(content, query_prefix):
+        hits = [hit for hit in search.get("hits", []) if hit.get("description") and hit.get("hsps")]
+        if len(hits) < hitlist_size:
+            continue
+        scores = [hit["hsps"][0].get("bit_score") or 0 for hit in hits]
+        cutoff = CONFIG['adaptive_tail_ratio'] * max(scores)
+        classes = {
+            is_anomaly(hit["description"][0].get("title", ""), non_anomaly_keywords)
+            for hit, score in zip(hits, scores) if score >= cutoff
+        }
+        if len(classes) > 1:
+            undecided.add(query_title)
+    return undecided
+
+
+def query_summary(query_title, search, non_anomaly_keywords):
+    """A compact summary of one query's search, for live ``query_result`` events."""
+    hits = [hit for hit in search.get("hits", []) if hit.get("description") and hit.get("hsps")]
+    species = Counter()
+    anomalies = 0
+    best_identity = None
+    for hit in hits:
+        desc = hit["description"][0]
+        title = desc.get("title", "")
+        species[desc.get("sciname") or extract_species_group(title)] += 1
+        anomalies += is_anomaly(title, non_anomaly_keywords)
+        hsp = hit["hsps"][0]
+        identity = round(100 * hsp.get("identity", 0) / max(hsp.get("align_len") or 0, 1), 2)
+        best_identity = identity if best_identity is None else max(best_identity, identity)
+    top_species, top_hits = species.most_common(1)[0] if species else (None, 0)
+    return {
+        "query": query_title,
+        "hits": len(hits),
+        "topSpecies": top_species,
+        "topSpeciesHits": top_hits,
+        "bestIdentity": best_identity,
+        "anomalies": anomalies,
+    }
+
+
+def merge_phase_archives(first, first_prefix, second, second_prefix, requeried):
+    """One archive with the second phase's searches for requeried queries and the first's for the rest.
+
+    Batch prefixes are stripped (and batch-mates' queries dropped) so the
+    result parses like an archive of this job alone.
+    """
+    buffer = io.BytesIO()
+    files = []
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for content, query_prefix, from_second in ((first, first_prefix, False), (second, second_prefix, True)):
+            for query_title, _, report in _iter_reports(content, query_prefix):
+                if (query_title in requeried) != from_second:
                     continue
-                desc = hit["description"][0]
-                hsps = hit["hsps"][0]
-                rows.append({
-                    "query_id": search.get("query_id", ""),
-                    "query_title": search.get("query_title", ""),
-                    "subject_id": desc.get("id", ""),
-                    "subject_accession": desc.get("accession", ""),
-                    "subject_title": desc.get("title", ""),
-                    "taxid": desc.get("taxid", ""),
-                    "sci_name": desc.get("sciname", ""),
-                    "identity_pct": round(100 * hsps.get("identity", 0) / max(hsps.get("align_len", 1), 1), 2),
-                    "bit_score": hsps.get("bit_score", ""),
-                    "evalue": hsps.get("evalue", "")
-                })
-    
-            csv_path = folder_path / f"{safe_filename}.csv"
+                report["results"]["search"]["query_title"] = query_title
+                name = f"query_{len(files) + 1}.json"
+                zf.writestr(name, json.dumps({"BlastOutput2": {"report": report}}))
+                files.append(name)
+        zf.writestr("index.json", json.dumps({"BlastJSON": [{"File": name} for name in files]}))
+    return buffer.getvalue()
+
+
+def parse_archives(archives, folderid, non_anomaly_keywords=None, stop=None, on_query=None):
+    """Merge one or more result archives into per-query CSVs plus hsps.tsv.
+
+    ``archives`` is a list of (target, content, query_prefix); target is a
+    "program:database" label, or None for a single-target job. When any
+    target is labelled the CSVs gain a ``target`` column and each query's
+    rows from every target land in the same file. Every row is scored
+    against the rest of its query (see scoring.py). Returns {query_title: csv_path}.
+    ``on_query(summary)`` gets each search's ``query_summary`` (with its
+    target) as it is decoded. Once the ``stop`` event (a threading.Event)
+    is set it gives up at the next query, returning {} and leaving
+    partial output.
+    """
+    # numpy is only needed once results arrive; keep it off the server's import path
+    from scoring import SCORE_COLUMNS, score_table
+
+    if non_anomaly_keywords is None:
+        non_anomaly_keywords = [load_config()[4]]
+    folder_path = Path(folderid)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    table = HitTable()
+    queries = {}  # query_title -> (csv_name, [row ranges, one per target])
+    for target, content, query_prefix in archives:
+        for query_title, csv_name, search in _iter_searches(content, query_prefix):
+            if stop is not None and stop.is_set():
+                return {}
+            rows = table.add_search(search, query_title, target or "")
+            if on_query is not None:
+                on_query({**query_summary(query_title, search, non_anomaly_keywords), "target": target})
+            queries.setdefault(query_title, (csv_name, []))[1].append(rows)
+
+    fieldnames = CSV_FIELDNAMES + (["target"] if any(target for target, _, _ in archives) else [])
+    # each hit's top HSP, in file order; scored in one pass over the whole job
+    top = {
+        query_title: [index for rows in ranges for index in table.top_hsps(rows)]
+        for query_title, (_, ranges) in queries.items()
+    }
+    scores, ranks = score_table(
+        table, [index for indices in top.values() for index in indices], non_anomaly_keywords
+    )
+    scores, ranks = scores.tolist(), ranks.tolist()
+    written = {}
+    position = 0
+    for query_title, (csv_name, _) in queries.items():
+        if stop is not None and stop.is_set():
+            return {}
+        csv_path = folder_path / f"{csv_name}.csv"
+        with csv_path.open("w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames + SCORE_COLUMNS)
+            for index in top[query_title]:
+                writer.writerow(table.row(index, fieldnames) + [scores[position], ranks[position]])
+                position += 1
+        written[query_title] = csv_path
+
+    table.write_tsv(folder_path / HSP_FILENAME)
+    return written
+
+
+def parse_blast(content, folderid, query_prefix=None, non_anomaly_keywords=None):
+    """Write one CSV per query plus every HSP to hsps.tsv; returns {query_title: csv_path}.
+
+    The per-query CSVs keep the top HSP of each hit, which is what the
+    reports read; hsps.tsv carries all HSPs with coordinates and strands.
+    With query_prefix only queries whose title carries that prefix are kept
+    and the prefix is stripped, which demultiplexes a shared batch archive.
+    """
+    return parse_archives([(None, content, query_prefix)], folderid, non_anomaly_keywords)
+
+
+def parse_progress_notifier(notifier):
+    """A ``progress(done, total)`` callback for PARSE_POOL.parse that reports to the client."""
+    async def progress(done, total):
+        await notifier("progress", ["Parsing BLAST result...", f"Parsed {done} of {total} result files."])
+    return progress
+
+
+def query_result_notifier(notifier, groups):
+    """A ``results(summaries)`` callback for PARSE_POOL.parse that sends ``query_result`` events."""
+    async def results(summaries):
+        for summary in summaries:
+            # collapsed duplicates get their own event under each input title
+            for title in groups.get(summary["query"]) or [summary["query"]]:
+                await notifier("query_result", {**summary, "query": title})
+    return results
+
+
+def fan_out_duplicates(written, groups):
+    """Copy each collapsed query's CSV and HSP rows to every input title that shared its sequence."""
+    hsp_path = None
+    extra_hsps = []
+    for kept_title, titles in groups.items():
+        source = written.get(kept_title)
+        if source is None or len(titles) < 2:
+            continue
+        with source.open("r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+            fieldnames = reader.fieldnames or CSV_FIELDNAMES
+        for title in titles:
+            if title == kept_title:
+                continue
+            csv_path = source.parent / f"{safe_filename(title)}.csv"
             with csv_path.open("w", newline="", encoding="utf-8") as csvfile:
-                fieldnames = [
-                    "query_id", "query_title", "subject_id", "subject_accession",
-                    "subject_title", "taxid", "sci_name", "identity_pct",
-                    "bit_score", "evalue"
-                ]
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
-                if rows:
-                    writer.writerows(rows)
+                writer.writerows({**row, "query_title": title} for row in rows)
+            written[title] = csv_path
+        hsp_path = source.parent / HSP_FILENAME
+        extra_hsps.append((kept_title, [title for title in titles if title != kept_title]))
 
-def write_fasta(fasta_string, folder_path):
+    if hsp_path is None or not hsp_path.exists():
+        return
+    duplicates = dict(extra_hsps)
+    title_column = HSP_COLUMN_NAMES.index("query_title")
+    with hsp_path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        next(reader, None)
+        copies = [
+            [*row[:title_column], title, *row[title_column + 1:]]
+            for row in reader
+            if row[title_column] in duplicates
+            for title in duplicates[row[title_column]]
+        ]
+    with hsp_path.open("a", newline="", encoding="utf-8") as f:
+        csv.writer(f, delimiter="\t").writerows(copies)
+
+def write_fasta(records, folder_path):
     folder = Path(folder_path)
     folder.mkdir(parents=True, exist_ok=True)
-    (folder / "inputs.fasta").write_text(fasta_string)
+    with (folder / "inputs.fasta").open("w", encoding="utf-8") as f:
+        for record in records:
+            f.write(f">{record.title}\n{record.sequence}\n")
+
+
+def save_raw_results(results, folder_path, groups, config, report_format="pdf"):
+    """Keep the NCBI archives (already zip-compressed) so analysis can be rerun later.
+
+    ``results`` holds one dict per target with its label, rid, query prefix
+    and archive content; the manifest records how to parse them again.
+    """
+    folder = Path(folder_path)
+    targets = []
+    for index, result in enumerate(results, start=1):
+        archive = RAW_ARCHIVE if index == 1 else RAW_ARCHIVE.replace(".zip", f"_{index}.zip")
+        (folder / archive).write_bytes(result["content"])
+        targets.append({
+            "label": result["label"],
+            "rid": result["rid"],
+            "queryPrefix": result["queryPrefix"],
+            "archive": archive,
+            **({"adaptive": result["adaptive"]} if result.get("adaptive") else {}),
+        })
+    manifest = {
+        "targets": targets, "groups": groups, "config": list(config), "reportFormat": report_format,
+    }
+    (folder / RAW_MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def load_raw_results(folder_path):
+    """Read back what save_raw_results stored as (manifest, [(label, content, query_prefix)])."""
+    folder = Path(folder_path)
+    raw = json.loads((folder / RAW_MANIFEST).read_text(encoding="utf-8"))
+    targets = raw.get("targets") or [
+        # manifests written before multi-target jobs
+        {"label": None, "rid": raw.get("rid"), "queryPrefix": raw.get("queryPrefix"), "archive": RAW_ARCHIVE}
+    ]
+    archives = [
+        (target["label"], (folder / target["archive"]).read_bytes(), target["queryPrefix"])
+        for target in targets
+    ]
+    return raw, archives
+
+
+def raw_results_folder(folder_path):
+    """The folder holding a job's stored archives, or None.
+
+    A reprocessed version (v2, v3, ...) has no archives of its own; it is
+    reprocessed from its parent job folder.
+    """
+    folder = Path(folder_path)
+    if (folder / RAW_MANIFEST).exists():
+        return folder
+    if (folder / REPROCESS_NOTE).exists() and (folder.parent / RAW_MANIFEST).exists():
+        return folder.parent
+    return None
+
+
+def stored_config(folder_path):
+    """The config a results folder was parsed with (manifest or reprocess note), or None."""
+    folder = Path(folder_path)
+    for name in (RAW_MANIFEST, REPROCESS_NOTE):
+        path = folder / name
+        if path.exists():
+            config = json.loads(path.read_text(encoding="utf-8")).get("config")
+            if config:
+                return tuple(config)
+    return None
+
+
+def reprocess_config(stored, current):
+    """The config to reprocess an archive with.
+
+    The searched program and database (and the filter and hit list size they
+    were run with) stay those of the archive; only the reporting settings, the
+    non-anomaly keyword and the species, come from ``current``.
+    """
+    if not stored:
+        return tuple(current)
+    return (*stored[:4], *current[4:])
+
+
+def normalize_report_format(value):
+    """Validate a job's report format; None means the configured default."""
+    if value is None:
+        return CONFIG['report_format']
+    value = str(value).strip().lower()
+    if value not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format {value!r}; expected one of: {', '.join(REPORT_FORMATS)}")
+    return value
+
+
+async def in_thread(profiler, func, *args, **kwargs):
+    """Run a blocking stage on a thread, profiled there when the job is profiled."""
+    result, stats = await asyncio.to_thread(profile_call, profiler is not None, func, *args, **kwargs)
+    if stats is not None:
+        profiler.add_marshalled(stats)
+    return result
+
+
+async def run_reports(folder_path, config, metrics, profiler=None, report_format="pdf"):
+    if report_format == "html":
+        # the PDFs are left for the first download to render
+        with metrics.stage("report_html"):
+            await in_thread(profiler, write_html_report, folder_path, config)
+        return
+    with metrics.phase("report"):
+        timings, stats = await REPORT_POOL.render(folder_path, config, profile=profiler is not None)
+    for stage, seconds in timings.items():
+        metrics.record(stage, seconds)
+    if stats is not None:
+        profiler.add_marshalled(stats)
+
+
+def new_version_folder(folder_path):
+    """Create the next versioned output folder (v2, v3, ...) inside a job folder."""
+    folder = Path(folder_path)
+    versions = [int(p.name[1:]) for p in folder.glob("v*") if p.is_dir() and p.name[1:].isdigit()]
+    version = max(versions, default=1) + 1
+    while True:
+        target = folder / f"v{version}"
+        try:
+            target.mkdir()
+            return target
+        except FileExistsError:
+            version += 1
+
+
+def job_version_folder(folder_path, version=None):
+    """A job folder's output for ``version`` (1 is the original run), or None.
+
+    Without a version this is the latest reprocessed version that finished
+    indexing, falling back to the original run.
+    """
+    folder = Path(folder_path)
+    versions = {int(p.name[1:]): p for p in folder.glob("v*") if p.is_dir() and p.name[1:].isdigit()}
+    if version is not None:
+        return folder if version == 1 else versions.get(version)
+    for number in sorted(versions, reverse=True):
+        if (versions[number] / INDEX_FILENAME).exists():
+            return versions[number]
+    return folder
+
+
+async def _submit_target(records, config):
+    """Submit one target's search, through the batcher when the job is small; returns (rid, ticket)."""
+    if BATCHER.accepts(records):
+        ticket = BATCHER.enqueue(records, config)
+        try:
+            return await ticket.rid, ticket
+        except asyncio.CancelledError:
+            BATCHER.withdraw(ticket)
+            raise
+    return await submit_blast(format_fasta(records), config), None
+
+
+async def _await_target(rid, ticket, records, config, metrics, deadline):
+    """Wait for one target's search, hedging a straggler; returns (rid, query_prefix, content)."""
+    primary = ticket.result if ticket else wait_for_blast(rid, metrics.count)
+    hedge_rids = []
+
+    async def resubmit():
+        # a hedge carries only this job's queries, never a shared batch
+        hedge_rids.append(await submit_blast(format_fasta(records), config))
+        return hedge_rids[-1]
 
-async def run_blast_job(data, notifier):
-    content_ = ""
     try:
-        await notifier(
-            "progress",
-            ["Running BLAST NCBI...", "Server is running mass BLAST operation."],
+        hedge_rid, content = await HEDGER.run(
+            primary, RTOE_ESTIMATES.get(rid), resubmit, deadline, metrics.count, metrics.observe_search
         )
-        rid, folder_path = await send_blast(data)
-        write_fasta(data, folder_path)
+    except TimeoutError as e:
+        raise BlastError(f"BLAST search {rid} did not finish in time") from e
+    finally:
+        # wait_for_blast drops a RID's estimate, but not for a RID cancelled before its wait began
+        for submitted in hedge_rids if ticket else [rid, *hedge_rids]:
+            RTOE_ESTIMATES.pop(submitted, None)
+        if ticket:
+            # stop a shared batch from polling once no job is waiting on it
+            BATCHER.withdraw(ticket)
+    if hedge_rid:
+        return hedge_rid, None, content
+    return rid, ticket.prefix if ticket else None, content
+
+
+async def _collect_target(
+    submission, records, first_config, config, metrics, deadline, notify
+):
+    """Await one target's search; in adaptive mode rerun its undecided queries with the full list.
+
+    Returns the target's result dict
+    (rid, queryPrefix, content, adaptive).
+    """
+    rid, ticket = submission
+    rid, query_prefix, content = await _await_target(
+        rid, ticket, records, first_config, metrics, deadline
+    )
+    result = {"rid": rid, "queryPrefix": query_prefix, "content": content}
+    if first_config == config:
+        return result
+
+    hitlist_size = int(first_config[1])
+    undecided = await asyncio.to_thread(
+        undecided_queries, content, query_prefix, hitlist_size, [config[4]]
+    )
+    subset = [record for record in records if record.title in undecided]
+    result["adaptive"] = {"initialHits": hitlist_size, "requeried": len(subset)}
+    if not subset:
+        return result
+    await notify(len(subset))
+    metrics.count("requeried_queries", len(subset))
+    second_rid, second_ticket = await _submit_target(subset, config)
+    second_rid, second_prefix, second_content = await _await_target(
+        second_rid, second_ticket, subset, config, metrics, deadline
+    )
+    result["adaptive"]["rid"] = second_rid
+    result["content"] = await asyncio.to_thread(
+        merge_phase_archives,
+        content, query_prefix, second_content, second_prefix, {record.title for record in subset},
+    )
+    result["queryPrefix"] = None
+    return result
+
+
+async def run_blast_job(
+    data, notifier, metrics=None, profile=None, config=None, targets=None, adaptive=None,
+    report_format=None,
+):
+    metrics = metrics or JobMetrics()
+    config = config or load_config()
+    targets = normalize_targets(targets, config)
+    report_format = normalize_report_format(report_format)
+    CURRENT_JOB.set(metrics)
+    if profile is None:
+        profile = CONFIG['profile_jobs']
+    if adaptive is None:
+        adaptive = CONFIG['adaptive_hitlist']
+    first_hits = adaptive_hitlist_size(config, adaptive)
+    profiler = None
+    metrics.start()
+    folder_path = None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CONFIG['job_deadline'] if CONFIG['job_deadline'] > 0 else None
+    content_ = ""
+    try:
+        try:
+            if isinstance(data, Path):
+                # streamed uploads are referenced by path; parse them off the event loop
+                records = await asyncio.to_thread(parse_fasta_file, data, query_alphabet(config[2]))
+            else:
+                records = parse_fasta(data, query_alphabet(config[2]))
+        except FastaError as e:
+            metrics.finish("error")
+            await notifier("error", ["Invalid FASTA input", str(e)])
+            return
+        unique_records, groups = collapse_duplicates(records)
+        qc_rows = None
+        if prescreens(targets):
+            # numpy is only needed once a job runs; keep it off the server's import path
+            from prescreen import prescreen, write_qc_table
+
+            with metrics.stage("prescreen"):
+                unique_records, qc_rows = prescreen(records, unique_records)
+            await notifier("prescreen", {
+                "screened": len(qc_rows),
+                "rejected": [{"query": row.title, "reason": row.reason} for row in qc_rows if not row.passed],
+            })
+            kept_titles = {record.title for record in unique_records}
+            groups = {title: titles for title, titles in groups.items() if title in kept_titles}
+            if not unique_records:
+                metrics.finish("error")
+                await notifier("error", [
+                    "No sequences passed the pre-screen",
+                    *(f"{row.title}: {row.reason}" for row in qc_rows[:10]),
+                ])
+                return
+
+        status_lines = ["Running BLAST NCBI...", "Server is running mass BLAST operation."]
+        searched = sum(len(titles) for titles in groups.values())
+        if searched < len(records):
+            status_lines.append(
+                f"{len(records) - searched} of {len(records)} sequences failed the pre-screen "
+                "and are not searched (see qc.tsv)."
+            )
+        if len(unique_records) < searched:
+            status_lines.append(
+                f"{searched} sequences collapsed to {len(unique_records)} unique queries."
+            )
+        await notifier("progress", status_lines)
+        folder_path = new_results_folder()
+        if qc_rows is not None:
+            write_qc_table(qc_rows, folder_path)
+        labelled = len(targets) > 1
+        configs = {target: target_config(config, target) for target in targets}
+        # adaptive jobs first search with a short hit list
+        first_configs = {
+            target: with_hitlist(configs[target], first_hits) if first_hits else configs[target]
+            for target in targets
+        }
+
+        def refine_notifier(target):
+            async def notify(count):
+                where = f" ({target_label(target)})" if labelled else ""
+                await notifier("progress", [
+                    "Refining BLAST Result...",
+                    f"Re-running {count} of {len(unique_records)} queries with the full hit list{where}.",
+                ])
+            return notify
+
+        with metrics.stage("submit"):
+            # the shared limiter spaces the Puts; the searches then run side by side
+            submissions = await asyncio.gather(
+                *(_submit_target(unique_records, first_configs[target]) for target in targets)
+            )
+        await asyncio.to_thread(write_fasta, records, folder_path)
+        if profile:
+            profiler = JobProfiler(folder_path)
         folder_display = folder_path.as_posix()
         await notifier("folder", {"folderId": folder_display})
+        if labelled:
+            rid_lines = [
+                f"{target_label(target)} Request ID: {rid}"
+                for target, (rid, _) in zip(targets, submissions)
+            ]
+        else:
+            rid_lines = [f"BLAST NCBI Request ID: {submissions[0][0]}"]
         await notifier(
             "progress",
             [
                 "Waiting for BLAST Result...",
-                f"BLAST NCBI Request ID: {rid}",
+                *rid_lines,
                 f"BatchBLAST ID: {folder_display}",
                 " This may take up 5 minutes",
             ],
         )
 
-        while True:
-            code, content = await check_blast(rid)
-            if code == 0:
-                await asyncio.sleep(4)
-                continue
-            elif code == 9:
-                await notifier(
-                    "error", ["Error", "An error occurred, please check error.log file."]
-                )
-                return
-            elif code == 1:
-                content_ = content
-                break
+        with metrics.stage("ncbi_wait"):
+            outcomes = await asyncio.gather(
+                *(
+                    _collect_target(
+                        submission, unique_records, first_configs[target], configs[target],
+                        metrics, deadline, refine_notifier(target),
+                    )
+                    for target, submission in zip(targets, submissions)
+                ),
+                return_exceptions=True,
+            )
+        results = []
+        failed = []
+        reasons = []
+        for target, outcome in zip(targets, outcomes):
+            if isinstance(outcome, BlastError):
+                failed.append(target_label(target))
+                reasons.append(str(outcome))
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results.append({"label": target_label(target) if labelled else None, **outcome})
+        if not results:
+            metrics.finish("error")
+            await notifier(
+                "error", ["Error", "An error occurred, please check error.log file.", *reasons]
+            )
+            return
+        content_ = results[0]["content"]
 
-        await notifier("progress", ["BLAST Completed...", "Processing result."])
-        parse_blast(content_, folder_path)
+        save_raw_results(results, folder_path, groups, config, report_format)
+        status_lines = ["BLAST Completed...", "Processing result."]
+        if failed:
+            status_lines.append(f"No results from {', '.join(failed)}; continuing with the other targets.")
+        for (rid, _), result in zip(submissions, results):
+            if result["rid"] != rid:
+                status_lines.append(f"Search {rid} stalled; used resubmitted search {result['rid']}.")
+        await notifier("progress", status_lines)
+        archives = [(result["label"], result["content"], result["queryPrefix"]) for result in results]
+        with metrics.stage("parse"):
+            written = await PARSE_POOL.parse(
+                archives, folder_path, [config[4]], parse_progress_notifier(notifier), profiler,
+                query_result_notifier(notifier, groups),
+            )
+            await in_thread(profiler, fan_out_duplicates, written, groups)
+        with metrics.stage("index"):
+            await in_thread(profiler, build_hit_index, folder_path)
+        with metrics.stage("catalog"):
+            await asyncio.to_thread(record_job, folder_path, config, status="parsed")
         await notifier(
             "progress",
             ["Parsing Completed...", "BLAST Result successfully parsed, making reports."],
         )
-        generate_report(folder_path)
-        generate_blast_full_report(folder_path)
+        await run_reports(folder_path, config, metrics, profiler, report_format)
+        if profiler:
+            await asyncio.to_thread(profiler.write)
+        metrics.finish("completed")
+        await asyncio.to_thread(finish_job, folder_path, "completed", metrics.as_dict())
         await notifier(
             "complete",
             [
@@ -184,13 +901,91 @@ async def run_blast_job(data, notifier):
                 "Mass BLAST is completed successfully and you can download the reports.",
             ],
         )
+    except asyncio.CancelledError:
+        metrics.finish("cancelled")
+        if folder_path is not None:
+            await asyncio.to_thread(finish_job, folder_path, "cancelled", metrics.as_dict())
+        raise
     except Exception as e:
         with open("error.log", 'w+') as f:
                 f.write(str(e))
                 f.write(str(content_))
+        metrics.finish("error")
+        if folder_path is not None:
+            await asyncio.to_thread(finish_job, folder_path, "error", metrics.as_dict())
+        await notifier(
+            "error", ["Error", "An error occurred, please check error.log file."]
+        )
+    finally:
+        # make sure the active-jobs gauge is released on cancellation too
+        metrics.finish("error")
+
+
+async def reprocess_job(folder_path, notifier, metrics=None, config=None, report_format=None):
+    """Rerun parsing and reports from a job's stored archive into a new version folder.
+
+    ``config`` only supplies the reporting settings, see reprocess_config.
+    """
+    metrics = metrics or JobMetrics()
+    folder = raw_results_folder(folder_path)
+    CURRENT_JOB.set(metrics)
+    metrics.start()
+    try:
+        if folder is None:
+            metrics.finish("error")
+            await notifier("error", ["Cannot reprocess", "No stored BLAST results for this job."])
+            return
+        raw, archives = await asyncio.to_thread(load_raw_results, folder)
+        config = reprocess_config(raw.get("config"), config or load_config())
+        report_format = normalize_report_format(report_format or raw.get("reportFormat"))
+
+        version_folder = new_version_folder(folder)
+        inputs = folder / "inputs.fasta"
+        if inputs.exists():
+            (version_folder / "inputs.fasta").write_bytes(inputs.read_bytes())
+        (version_folder / REPROCESS_NOTE).write_text(
+            json.dumps({
+                "source": folder.name, "targets": raw.get("targets"), "config": list(config),
+                "reportFormat": report_format,
+            }),
+            encoding="utf-8",
+        )
+        folder_display = version_folder.as_posix()
+        await notifier("folder", {"folderId": folder_display})
+        await notifier(
+            "progress",
+            ["Reprocessing stored BLAST result...", f"BatchBLAST ID: {folder_display}"],
+        )
+
+        with metrics.stage("parse"):
+            written = await PARSE_POOL.parse(
+                archives, version_folder, [config[4]], parse_progress_notifier(notifier),
+                results=query_result_notifier(notifier, raw.get("groups") or {}),
+            )
+            await asyncio.to_thread(fan_out_duplicates, written, raw.get("groups") or {})
+        with metrics.stage("index"):
+            await asyncio.to_thread(build_hit_index, version_folder)
+        await run_reports(version_folder, config, metrics, report_format=report_format)
+        metrics.finish("completed")
+        await notifier(
+            "complete",
+            [
+                "Successfully reprocessed BLAST result",
+                "Reports were regenerated with the current report settings.",
+            ],
+        )
+    except asyncio.CancelledError:
+        metrics.finish("cancelled")
+        raise
+    except Exception as e:
+        with open("error.log", 'w+') as f:
+                f.write(str(e))
+        metrics.finish("error")
         await notifier(
             "error", ["Error", "An error occurred, please check error.log file."]
         )
+    finally:
+        metrics.finish("error")
 
 
 # ---- FIXES BELOW ----
@@ -0,0 +1,306 @@
+"""Cross-job catalog of BLAST runs with an inverted index of their hits.
+
+One SQLite database in the results folder records each job's inputs,
+config snapshot, timings and artifacts, plus an inverted index from
+accession / taxid / species to the (job, query) pairs that hit it. Jobs
+are added as soon as their results are parsed; folders from before the
+catalog existed can be added with ``python catalog.py backfill``.
+"""
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from CONFIG import RESULTS_FOLDER
+from fasta import AMINO_ACID_CODES, FastaError, parse_fasta
+from hitindex import ensure_hit_index
+
+CATALOG_FILENAME = "catalog.sqlite"
+CONFIG_KEYS = ("filter", "output_qty", "program", "database", "non_anomaly_keyword", "species_name")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    folder_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    status TEXT,
+    query_count INTEGER,
+    hit_count INTEGER,
+    inputs TEXT,
+    config TEXT,
+    timings TEXT,
+    artifacts TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS hit_terms (
+    term_type TEXT NOT NULL,
+    term TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    query_title TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (term_type, term, folder_id, query_title)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_hit_terms_folder ON hit_terms (folder_id);
+"""
+
+
+def catalog_path(results_dir=None) -> Path:
+    return Path(results_dir or RESULTS_FOLDER) / CATALOG_FILENAME
+
+
+def connect(results_dir=None) -> sqlite3.Connection:
+    path = catalog_path(results_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+def _config_dict(config) -> Optional[Dict[str, str]]:
+    if not config:
+        return None
+    return dict(zip(CONFIG_KEYS, config))
+
+
+def _artifacts(folder: Path) -> List[str]:
+    return sorted(p.name for p in folder.iterdir() if p.is_file())
+
+
+def _input_titles(folder: Path) -> List[str]:
+    fasta_path = folder / "inputs.fasta"
+    if not fasta_path.exists():
+        return []
+    try:
+        # only the titles matter; the amino-acid codes cover nucleotide queries too
+        records = parse_fasta(fasta_path.read_text(encoding="utf-8"), AMINO_ACID_CODES)
+        return [record.title for record in records]
+    except FastaError:
+        return []
+
+
+def _hit_terms(folder: Path) -> Tuple[List[Tuple[str, str, str, int]], int]:
+    """Aggregate (term_type, term, query_title, hits) from the job's hit index."""
+    index_path = ensure_hit_index(folder)
+    with closing(sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)) as conn:
+        hit_count = conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0]
+        terms = []
+        for term_type, expr in (
+            ("accession", "subject_accession"),
+            ("taxid", "taxid"),
+            ("species", "lower(sci_name)"),
+        ):
+            rows = conn.execute(
+                f"SELECT {expr}, query_title, COUNT(*) FROM hits "
+                f"WHERE {expr} IS NOT NULL AND {expr} != '' GROUP BY 1, 2"
+            )
+            terms.extend((term_type, str(term), query, count) for term, query, count in rows)
+    return terms, hit_count
+
+
+def record_job(folder_path, config=None, status=None, timings=None, results_dir=None) -> None:
+    """Insert or refresh a job and its hit terms from its results folder."""
+    folder = Path(folder_path)
+    folder_id = folder.name
+    # the inputs file is written once at submission; the folder mtime moves
+    # whenever an artifact (or the hit index) is added
+    inputs_path = folder / "inputs.fasta"
+    created_at = _iso((inputs_path if inputs_path.exists() else folder).stat().st_mtime)
+    terms, hit_count = _hit_terms(folder)
+    titles = _input_titles(folder)
+
+    with closing(connect(results_dir)) as conn, conn:
+        existing = conn.execute(
+            "SELECT created_at, config, timings FROM jobs WHERE folder_id = ?", (folder_id,)
+        ).fetchone()
+        if existing:
+            created_at = existing[0]
+        conn.execute(
+            """INSERT OR REPLACE INTO jobs
+               (folder_id, created_at, updated_at, status, query_count, hit_count,
+                inputs, config, timings, artifacts)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                folder_id,
+                created_at,
+                _iso(time.time()),
+                status,
+                len(titles),
+                hit_count,
+                json.dumps(titles),
+                json.dumps(_config_dict(config)) if config else (existing[1] if existing else None),
+                json.dumps(timings) if timings else (existing[2] if existing else None),
+                json.dumps(_artifacts(folder)),
+            ),
+        )
+        conn.execute("DELETE FROM hit_terms WHERE folder_id = ?", (folder_id,))
+        conn.executemany(
+            "INSERT INTO hit_terms VALUES (?, ?, ?, ?, ?)",
+            [(term_type, term, folder_id, query, count) for term_type, term, query, count in terms],
+        )
+
+
+def finish_job(folder_path, status: str, timings=None, results_dir=None) -> None:
+    """Update a catalogued job's status, timings and artifact list."""
+    folder = Path(folder_path)
+    with closing(connect(results_dir)) as conn, conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, timings = coalesce(?, timings), artifacts = ?, "
+            "updated_at = ? WHERE folder_id = ?",
+            (
+                status,
+                json.dumps(timings) if timings else None,
+                json.dumps(_artifacts(folder)) if folder.exists() else None,
+                _iso(time.time()),
+                folder.name,
+            ),
+        )
+
+
+def recent_search_seconds(limit: int = 200, results_dir=None) -> List[float]:
+    """How long single NCBI searches (one RID each) took, newest jobs first, up to ``limit``."""
+    with closing(connect(results_dir)) as conn:
+        rows = conn.execute(
+            "SELECT timings FROM jobs WHERE status = 'completed' AND timings IS NOT NULL "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    seconds = []
+    for (timings,) in rows:
+        seconds.extend(float(value) for value in json.loads(timings).get("search_seconds") or [] if value)
+        if len(seconds) >= limit:
+            break
+    return seconds[:limit]
+
+
+def backfill(results_dir=None, force: bool = False) -> int:
+    """Catalogue existing job folders; returns the number of folders added."""
+    root = Path(results_dir or RESULTS_FOLDER)
+    with closing(connect(results_dir)) as conn:
+        known = {row[0] for row in conn.execute("SELECT folder_id FROM jobs")}
+    added = 0
+    for folder in sorted(p for p in root.iterdir() if p.is_dir()):
+        if folder.name in known and not force:
+            continue
+        if not any(folder.glob("*.csv")):
+            continue
+        record_job(folder, status="completed", results_dir=results_dir)
+        added += 1
+    return added
+
+
+def _job_row(row) -> Dict[str, Any]:
+    keys = ("folderId", "createdAt", "updatedAt", "status", "queryCount", "hitCount",
+            "inputs", "config", "timings", "artifacts")
+    job = dict(zip(keys, row))
+    for key in ("inputs", "config", "timings", "artifacts"):
+        job[key] = json.loads(job[key]) if job[key] else None
+    return job
+
+
+def search_jobs(
+    species: Optional[str] = None,
+    taxid: Optional[str] = None,
+    accession: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+    results_dir=None,
+) -> List[Dict[str, Any]]:
+    """Find jobs by hit term and/or creation time, newest first.
+
+    ``species`` matches by case-insensitive prefix ("danio" finds
+    "danio rerio"); taxid and accession match exactly. Each job lists the
+    queries that matched the term.
+    """
+    term_filters = []
+    if species:
+        lowered = species.strip().lower()
+        term_filters.append(("species", "term >= ? AND term < ?", [lowered, lowered + "\U0010ffff"]))
+    if taxid:
+        term_filters.append(("taxid", "term = ?", [str(taxid)]))
+    if accession:
+        term_filters.append(("accession", "term = ?", [accession.strip()]))
+
+    with closing(connect(results_dir)) as conn:
+        matches: Optional[Dict[str, set]] = None
+        for term_type, clause, params in term_filters:
+            found: Dict[str, set] = {}
+            rows = conn.execute(
+                f"SELECT folder_id, query_title FROM hit_terms WHERE term_type = ? AND {clause}",
+                [term_type, *params],
+            )
+            for folder_id, query_title in rows:
+                found.setdefault(folder_id, set()).add(query_title)
+            if matches is None:
+                matches = found
+            else:
+                matches = {
+                    folder_id: queries & found[folder_id]
+                    for folder_id, queries in matches.items()
+                    if folder_id in found
+                }
+
+        clauses, params = [], []
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if matches is not None:
+            if not matches:
+                return []
+            clauses.append(f"folder_id IN ({', '.join('?' for _ in matches)})")
+            params.extend(matches)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = conn.execute(
+            f"SELECT folder_id, created_at, updated_at, status, query_count, hit_count, "
+            f"inputs, config, timings, artifacts FROM jobs {where} "
+            f"ORDER BY created_at DESC LIMIT ?",
+            [*params, int(limit)],
+        ).fetchall()
+
+    jobs = [_job_row(row) for row in rows]
+    if matches is not None:
+        for job in jobs:
+            job["matchedQueries"] = sorted(matches.get(job["folderId"], ()))
+    return jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the BatchBLAST job catalog.")
+    parser.add_argument("--results-dir", default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+    fill = sub.add_parser("backfill", help="catalogue existing result folders")
+    fill.add_argument("--force", action="store_true", help="re-index folders already catalogued")
+    find = sub.add_parser("search", help="find jobs by hit term or date")
+    find.add_argument("--species")
+    find.add_argument("--taxid")
+    find.add_argument("--accession")
+    find.add_argument("--since")
+    find.add_argument("--until")
+    find.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        added = backfill(args.results_dir, force=args.force)
+        print(f"Catalogued {added} job folder(s) in {catalog_path(args.results_dir)}")
+    else:
+        for job in search_jobs(args.species, args.taxid, args.accession, args.since,
+                               args.until, args.limit, args.results_dir):
+            matched = ", ".join(job.get("matchedQueries", []))
+            print(f"{job['folderId']}  {job['createdAt']}  {job['queryCount']} queries  "
+                  f"{job['hitCount']} hits  {matched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Headless batch runner: BLAST FASTA files from the command line.
+
+    batchblast plates/ extra.fasta --concurrency 3 --results-dir /data/blast_res
+
+Every input file becomes one job, run through the same pipeline (and the
+same NCBI rate limits) as the web UI. Progress goes to stderr and a JSON
+run summary is written next to the results; the exit code is non-zero if
+any job failed, so cron can alert on it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+FASTA_SUFFIXES = {".fasta", ".fa", ".fas", ".fna", ".fsa", ".txt"}
+
+
+def collect_inputs(paths: List[str]) -> List[Path]:
+    """Expand directories into their FASTA files, keeping command-line order."""
+    inputs: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            inputs.extend(
+                sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower() in FASTA_SUFFIXES)
+            )
+        elif path.is_file():
+            inputs.append(path)
+        else:
+            raise SystemExit(f"batchblast: no such file or directory: {raw}")
+    unique: Dict[Path, Path] = {}
+    for path in inputs:
+        unique.setdefault(path.resolve(), path)
+    return list(unique.values())
+
+
+class ConsoleNotifier:
+    """Prints job events to stderr and remembers what the summary needs."""
+
+    def __init__(self, label: str, quiet: bool = False):
+        self.label = label
+        self.quiet = quiet
+        self.folder = None
+        self.status = "running"
+        self.messages: List[str] = []
+
+    def _print(self, text: str) -> None:
+        stamp = datetime.now().strftime("%H:%M:%S")
+        print(f"{stamp} [{self.label}] {text}", file=sys.stderr, flush=True)
+
+    async def __call__(self, event_type: str, payload: Any) -> None:
+        if event_type == "folder":
+            self.folder = payload.get("folderId")
+            self._print(f"results -> {self.folder}")
+            return
+        if event_type == "query_result":
+            if not self.quiet:
+                where = f" [{payload['target']}]" if payload.get("target") else ""
+                self._print(
+                    f"{payload['query']}{where}: {payload['hits']} hits, "
+                    f"top {payload['topSpecies'] or '-'}, best identity {payload['bestIdentity'] or '-'}%, "
+                    f"{payload['anomalies']} anomalies"
+                )
+            return
+        lines = payload if isinstance(payload, list) else [str(payload)]
+        if event_type in ("complete", "error"):
+            self.status = "completed" if event_type == "complete" else "error"
+            self.messages = [str(line) for line in lines]
+            self._print(f"{event_type}: {' / '.join(self.messages)}")
+        elif not self.quiet:
+            self._print(" / ".join(str(line).strip() for line in lines))
+
+
+async def run_batch(
+    inputs: List[Path], config, targets, concurrency: int, profile: bool, quiet: bool, adaptive=None,
+    report_format=None,
+) -> List[Dict[str, Any]]:
+    from blast import run_blast_job
+    from metrics import JobMetrics
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(path: Path) -> Dict[str, Any]:
+        notifier = ConsoleNotifier(path.name, quiet)
+        # queue_wait covers the time spent waiting for a concurrency slot
+        metrics = JobMetrics()
+        async with semaphore:
+            await run_blast_job(
+                path, notifier, metrics, profile=profile or None, config=config, targets=targets,
+                adaptive=adaptive, report_format=report_format,
+            )
+        return {
+            "input": str(path),
+            "folder": notifier.folder,
+            "status": notifier.status,
+            "messages": notifier.messages,
+            "metrics": metrics.as_dict(),
+        }
+
+    return await asyncio.gather(*(run_one(path) for path in inputs))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="batchblast", description="Run BatchBLAST jobs for FASTA files without the web UI."
+    )
+    parser.add_argument("paths", nargs="+", help="FASTA files or directories of FASTA files")
+    parser.add_argument("--results-dir", help="where job folders are written (default: blast_res)")
+    parser.add_argument(
+        "--target", action="append", dest="targets", metavar="PROGRAM:DATABASE",
+        help="search this program/database pair; repeat to fan out (default: the saved config)",
+    )
+    parser.add_argument(
+        "--adaptive", action=argparse.BooleanOptionalAction, default=None,
+        help="search with a short hit list first and rerun only undecided queries with the full one",
+    )
+    parser.add_argument(
+        "--report-format", choices=["pdf", "html"], default=None,
+        help="render the PDF reports, or only a report.html (PDFs then render on first web download)",
+    )
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs in flight at once (default: 2)")
+    parser.add_argument("--summary", help="path of the JSON run summary (default: inside the results dir)")
+    parser.add_argument("--profile", action="store_true", help="capture a cProfile for every job")
+    parser.add_argument("--quiet", action="store_true", help="only print folder and final status lines")
+    args = parser.parse_args(argv)
+
+    # CONFIG reads the results directory at import time, so set it first
+    if args.results_dir:
+        os.environ["BATCHBLAST_RESULTS_DIR"] = args.results_dir
+    from CONFIG import RESULTS_FOLDER, load_config
+
+    inputs = collect_inputs(args.paths)
+    if not inputs:
+        print("batchblast: no FASTA files found", file=sys.stderr)
+        return 2
+
+    # one config snapshot for the whole batch, as the web UI does per job
+    config = load_config()
+    started = datetime.now()
+    start = time.monotonic()
+    from blast import normalize_targets
+    try:
+        targets = normalize_targets(args.targets, config)
+    except ValueError as e:
+        parser.error(str(e))
+    jobs = asyncio.run(
+        run_batch(
+            inputs, config, targets, args.concurrency, args.profile, args.quiet, args.adaptive,
+            args.report_format,
+        )
+    )
+    failed = [job for job in jobs if job["status"] != "completed"]
+
+    summary = {
+        "started": started.isoformat(timespec="seconds"),
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(time.monotonic() - start, 3),
+        "results_dir": str(Path(RESULTS_FOLDER).resolve()),
+        "config": list(config),
+        "targets": [list(target) for target in targets],
+        "concurrency": args.concurrency,
+        "completed": len(jobs) - len(failed),
+        "failed": len(failed),
+        "jobs": jobs,
+    }
+    summary_path = Path(args.summary) if args.summary else (
+        Path(RESULTS_FOLDER) / f"run_summary_{started.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print(
+        f"{summary['completed']}/{len(jobs)} jobs completed in {summary['elapsed_seconds']:.1f}s; "
+        f"summary: {summary_path}",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""FASTA parsing, normalization and duplicate collapsing for BLAST submissions."""
+from typing import Dict, List, NamedTuple, Tuple
+
+# IUPAC nucleotide codes NCBI accepts in a nucleotide query
+NUCLEOTIDE_CODES = frozenset("ACGTURYSWKMBDHVN")
+# IUPAC amino-acid codes (B/Z/J ambiguity, U/O selenocysteine/pyrrolysine), X and stop
+AMINO_ACID_CODES = frozenset("ACDEFGHIKLMNPQRSTVWYBZJUOX*")
+# programs whose queries are proteins; blastx and tblastx translate nucleotide queries
+PROTEIN_QUERY_PROGRAMS = frozenset({"blastp", "tblastn"})
+
+# Cyrillic and Greek capitals that render identically to nucleotide codes and
+# arrive through copy-paste from spreadsheets and lab reports.
+HOMOGLYPHS = str.maketrans({
+    "А": "A", "В": "B", "С": "C", "Н": "H", "К": "K", "М": "M", "Т": "T",
+    "а": "A", "в": "B", "с": "C", "н": "H", "к": "K", "м": "M", "т": "T",
+    "Α": "A", "Β": "B", "Η": "H", "Κ": "K", "Μ": "M", "Ν": "N", "Τ": "T",
+})
+
+
+class FastaError(ValueError):
+    """Raised when a FASTA payload cannot be submitted as-is."""
+
+
+class FastaRecord(NamedTuple):
+    title: str
+    sequence: str
+
+
+def normalize_sequence(raw: str) -> str:
+    """Strip whitespace, fold homoglyphs and upper-case a sequence."""
+    return "".join(raw.split()).translate(HOMOGLYPHS).upper()
+
+
+def query_alphabet(program: str) -> frozenset:
+    """Residue codes a query for the given BLAST program may contain."""
+    return AMINO_ACID_CODES if program in PROTEIN_QUERY_PROGRAMS else NUCLEOTIDE_CODES
+
+
+def invalid_characters(sequence: str, alphabet: frozenset = NUCLEOTIDE_CODES) -> str:
+    return "".join(sorted(set(sequence) - alphabet))
+
+
+class FastaStreamParser:
+    """Incremental FASTA parser that can be fed arbitrary text chunks.
+
+    Anything before the first header is ignored, including a label glued to
+    the first ">" on the same line; input without any header is one record
+    named Query_1, as NCBI treats a bare sequence. Raises FastaError for
+    records with empty sequences or characters outside ``alphabet``. Records
+    are only kept in memory when ``collect`` is set; counts are always tracked.
+    """
+
+    def __init__(self, collect: bool = True, alphabet: frozenset = NUCLEOTIDE_CODES):
+        self.collect = collect
+        self.alphabet = alphabet
+        self.records: List[FastaRecord] = []
+        self.record_count = 0
+        self.residue_count = 0
+        self._title = None
+        self._chunks: List[str] = []
+        self._pending = ""
+        self._seen_header = False
+        self._preamble: List[str] = []
+
+    def _flush(self) -> None:
+        if self._title is None:
+            return
+        sequence = normalize_sequence("".join(self._chunks))
+        if not sequence:
+            raise FastaError(f"Sequence '{self._title}' is empty")
+        bad = invalid_characters(sequence, self.alphabet)
+        if bad:
+            raise FastaError(f"Sequence '{self._title}' contains invalid characters: {bad}")
+        self.record_count += 1
+        self.residue_count += len(sequence)
+        if self.collect:
+            self.records.append(FastaRecord(self._title, sequence))
+
+    def _line(self, line: str) -> None:
+        if self._title is None and ">" in line:
+            line = line[line.index(">"):]
+        if line.startswith(">"):
+            self._flush()
+            self._seen_header = True
+            self._preamble = []
+            self._title = line[1:].strip() or f"Query_{self.record_count + 1}"
+            self._chunks = []
+        elif self._title is not None:
+            self._chunks.append(line)
+        elif not self._seen_header:
+            # kept in case no header ever comes
+            self._preamble.append(line)
+
+    def feed(self, text: str) -> None:
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._line(line.rstrip("\r"))
+
+    def close(self) -> List[FastaRecord]:
+        if self._pending:
+            self._line(self._pending.rstrip("\r"))
+            self._pending = ""
+        if not self._seen_header and "".join(self._preamble).strip():
+            self._title = "Query_1"
+            self._chunks = self._preamble
+        self._flush()
+        self._title = None
+        self._preamble = []
+        if not self.record_count:
+            raise FastaError("No FASTA records found")
+        return self.records
+
+
+def parse_fasta(text: str, alphabet: frozenset = NUCLEOTIDE_CODES) -> List[FastaRecord]:
+    """Parse and validate FASTA text (see FastaStreamParser)."""
+    parser = FastaStreamParser(alphabet=alphabet)
+    parser.feed(text)
+    return parser.close()
+
+
+def parse_fasta_file(path, alphabet: frozenset = NUCLEOTIDE_CODES,
+                     chunk_size: int = 1 << 20) -> List[FastaRecord]:
+    """Parse and validate a FASTA file a chunk at a time, without reading it whole."""
+    parser = FastaStreamParser(alphabet=alphabet)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(chunk_size):
+            parser.feed(chunk)
+    return parser.close()
+
+
+def format_fasta(records: List[FastaRecord]) -> str:
+    return "\n".join(f">{record.title}\n{record.sequence}" for record in records)
+
+
+def collapse_duplicates(records: List[FastaRecord]) -> Tuple[List[FastaRecord], Dict[str, List[str]]]:
+    """Keep the first record of each distinct sequence.
+
+    Returns the unique records and a map from each kept title to every input
+    title that shares its sequence (the kept title first).
+    """
+    by_sequence: Dict[str, FastaRecord] = {}
+    groups: Dict[str, List[str]] = {}
+    for record in records:
+        kept = by_sequence.setdefault(record.sequence, record)
+        groups.setdefault(kept.title, []).append(record.title)
+    return list(by_sequence.values()), groups
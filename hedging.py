@@ -0,0 +1,143 @@
+"""Tail-latency hedging for NCBI searches.
+
+Most RIDs finish close to the RTOE ("estimated time of execution") NCBI
+reports at submission, but a few sit in WAITING far longer than their
+siblings. Once a search has waited past a multiple of its RTOE, or past a
+high percentile of recent search times, the same queries are submitted
+again; whichever RID returns first wins and the rest are abandoned. Hedges
+go through the normal submit path, so they count against the shared NCBI
+request budget.
+"""
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+class Hedger:
+    def __init__(
+        self,
+        wait: Callable[..., Awaitable[bytes]],
+        rtoe_factor: float,
+        percentile: float,
+        min_wait: float,
+        max_hedges: int,
+        history_size: int = 200,
+        load_history: Optional[Callable[[], Iterable[float]]] = None,
+    ):
+        self.wait = wait
+        self.rtoe_factor = rtoe_factor
+        self.percentile = percentile
+        self.min_wait = min_wait
+        self.max_hedges = max_hedges
+        self.history = deque(maxlen=history_size)
+        self._load_history = load_history
+
+    async def seed(self) -> None:
+        """Load past runs' per-RID times once, so the percentile applies before this process has one.
+
+        The loader (a job catalog query) runs in a thread, off the event loop.
+        """
+        load, self._load_history = self._load_history, None
+        if load is None:
+            return
+        try:
+            seconds = list(await asyncio.to_thread(load))
+        except Exception:
+            return  # history is advisory
+        self.history.extendleft(s for s in seconds if s and s > 0)
+
+    def observe(self, seconds: float) -> None:
+        self.history.append(seconds)
+
+    def historical(self) -> Optional[float]:
+        """The configured percentile of recent search times; None until there's enough history."""
+        if len(self.history) < 5:
+            return None
+        ordered = sorted(self.history)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+    def delay(self, rtoe: Optional[float]) -> Optional[float]:
+        """Seconds a search may wait before it is hedged, or None to never hedge."""
+        if self.max_hedges <= 0:
+            return None
+        limits = [
+            limit for limit in (
+                rtoe * self.rtoe_factor if rtoe else None,
+                self.historical(),
+            ) if limit is not None
+        ]
+        if not limits:
+            return None
+        return max(self.min_wait, min(limits))
+
+    async def _primary(self, primary: Awaitable[bytes]) -> Tuple[Optional[str], bytes]:
+        return None, await primary
+
+    async def _hedge(
+        self, resubmit: Callable[[], Awaitable[str]], count: Callable[..., None]
+    ) -> Tuple[Optional[str], bytes]:
+        # the resubmission waits its turn at the rate limiter inside the race
+        rid = await resubmit()
+        return rid, await self.wait(rid, count)
+
+    async def run(
+        self,
+        primary: Awaitable[bytes],
+        rtoe: Optional[float],
+        resubmit: Callable[[], Awaitable[str]],
+        deadline: Optional[float] = None,
+        count: Callable[..., None] = lambda name, amount=1: None,
+        observe: Callable[[float], None] = lambda seconds: None,
+    ) -> Tuple[Optional[str], bytes]:
+        """Await ``primary``, hedging with ``resubmit()`` RIDs when it runs long.
+
+        Returns ``(rid, content)`` where ``rid`` is None if the primary search
+        won, otherwise the hedge RID whose result was used. Raises
+        ``TimeoutError`` once the loop-time ``deadline`` passes. The winning
+        RID's search time goes into the history and to ``observe``.
+        """
+        await self.seed()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        delay = self.delay(rtoe)
+        attempts: Dict[asyncio.Future, float] = {
+            asyncio.ensure_future(self._primary(primary)): started
+        }
+        hedges = 0
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                next_hedge = None
+                if delay is not None and hedges < self.max_hedges:
+                    next_hedge = started + delay * (hedges + 1)
+                wake = min((t for t in (next_hedge, deadline) if t is not None), default=None)
+                timeout = None if wake is None else max(0.0, wake - loop.time())
+                done, _ = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    attempt_started = attempts.pop(task)
+                    if task.exception() is not None:
+                        # keep racing while another attempt is still alive
+                        error = task.exception()
+                        continue
+                    rid, content = task.result()
+                    seconds = loop.time() - attempt_started
+                    self.observe(seconds)
+                    observe(seconds)
+                    if rid is not None:
+                        count("hedge_wins")
+                    return rid, content
+                now = loop.time()
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError(f"search did not finish within {now - started:.0f}s")
+                if attempts and next_hedge is not None and now >= next_hedge:
+                    hedges += 1
+                    count("hedges")
+                    attempts[asyncio.ensure_future(self._hedge(resubmit, count))] = now
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
@@ -0,0 +1,266 @@
+"""Per-job SQLite index of BLAST hits for the paginated results API.
+
+The index is built once after parsing so queries never rescan the CSVs.
+Pagination is keyset-based: the cursor encodes the last row's sort value
+and rowid, so every page costs an index seek regardless of depth. Rows
+whose sort value is NULL follow all the others.
+"""
+import base64
+import csv
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from hittable import HSP_COLUMNS, HSP_COLUMN_NAMES, HSP_FILENAME
+
+INDEX_FILENAME = "hits.sqlite"
+# bump when the schema changes so older job indexes are rebuilt on first use
+INDEX_VERSION = 3
+MAX_PAGE_SIZE = 1000
+
+COLUMNS = [
+    ("query_id", "TEXT"),
+    ("query_title", "TEXT"),
+    ("subject_id", "TEXT"),
+    ("subject_accession", "TEXT"),
+    ("subject_title", "TEXT"),
+    ("taxid", "TEXT"),
+    ("sci_name", "TEXT"),
+    ("identity_pct", "REAL"),
+    ("bit_score", "REAL"),
+    ("evalue", "REAL"),
+    ("target", "TEXT"),
+    ("anomaly_score", "REAL"),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+# sort keys exposed by the API -> (column, default direction)
+SORT_KEYS = {
+    "evalue": ("evalue", "asc"),
+    "identity": ("identity_pct", "desc"),
+    "bit_score": ("bit_score", "desc"),
+    "query": ("query_title", "asc"),
+    "anomaly": ("anomaly_score", "desc"),
+}
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rows_from_csv(csv_path: Path):
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield tuple(
+                _float(row.get(name)) if kind == "REAL" else row.get(name, "")
+                for name, kind in COLUMNS
+            )
+
+
+def _rows_from_hsp_tsv(tsv_path: Path):
+    kinds = [kind for _, kind in HSP_COLUMNS]
+    with tsv_path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        next(reader, None)
+        for row in reader:
+            values = tuple(_float(value) if kind in "dI" else value for value, kind in zip(row, kinds))
+            # files written before a column was added are padded with NULLs
+            yield values + (None,) * (len(kinds) - len(values))
+
+
+def _sql_type(kind: str) -> str:
+    return {"S": "TEXT", "I": "INTEGER", "d": "REAL"}[kind]
+
+
+def build_hit_index(folder_path) -> Path:
+    """(Re)build the hit index from every per-query CSV and hsps.tsv in the job folder."""
+    folder = Path(folder_path)
+    index_path = folder / INDEX_FILENAME
+    tmp_path = folder / f"{INDEX_FILENAME}.tmp"
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(f"CREATE TABLE hits ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with conn:
+            for csv_path in sorted(folder.glob("*.csv")):
+                conn.executemany(f"INSERT INTO hits VALUES ({placeholders})", _rows_from_csv(csv_path))
+        hsp_path = folder / HSP_FILENAME
+        conn.execute(f"CREATE TABLE hsps ({', '.join(f'{n} {_sql_type(k)}' for n, k in HSP_COLUMNS)})")
+        if hsp_path.exists():
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO hsps VALUES ({', '.join('?' for _ in HSP_COLUMNS)})",
+                    _rows_from_hsp_tsv(hsp_path),
+                )
+        with conn:
+            for column in ("query_title", "taxid", "identity_pct", "bit_score", "evalue", "anomaly_score"):
+                conn.execute(f"CREATE INDEX idx_hits_{column} ON hits ({column})")
+            conn.execute("CREATE INDEX idx_hsps_query_subject ON hsps (query_title, subject_accession)")
+            conn.execute("CREATE INDEX idx_hsps_subject ON hsps (subject_accession)")
+        conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    finally:
+        conn.close()
+    # swap in atomically so readers never see a half-built index
+    tmp_path.replace(index_path)
+    return index_path
+
+
+def _index_version(index_path: Path) -> int:
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def ensure_hit_index(folder_path) -> Path:
+    """Return the job's index, building it for folders that predate indexing."""
+    index_path = Path(folder_path) / INDEX_FILENAME
+    if not index_path.exists() or _index_version(index_path) != INDEX_VERSION:
+        build_hit_index(folder_path)
+    return index_path
+
+
+def encode_cursor(value: Any, rowid: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, rowid]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        value, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(rowid)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def query_hits(
+    folder_path,
+    query: Optional[str] = None,
+    taxid: Optional[str] = None,
+    min_identity: Optional[float] = None,
+    max_identity: Optional[float] = None,
+    max_evalue: Optional[float] = None,
+    target: Optional[str] = None,
+    sort: str = "evalue",
+    order: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}'")
+    column, default_order = SORT_KEYS[sort]
+    order = (order or default_order).lower()
+    if order not in {"asc", "desc"}:
+        raise ValueError(f"Unknown order '{order}'")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    clauses: List[str] = []
+    params: List[Any] = []
+    if query is not None:
+        clauses.append("query_title = ?")
+        params.append(query)
+    if taxid is not None:
+        clauses.append("taxid = ?")
+        params.append(str(taxid))
+    if min_identity is not None:
+        clauses.append("identity_pct >= ?")
+        params.append(min_identity)
+    if max_identity is not None:
+        clauses.append("identity_pct <= ?")
+        params.append(max_identity)
+    if max_evalue is not None:
+        clauses.append("evalue <= ?")
+        params.append(max_evalue)
+    if target is not None:
+        clauses.append("target = ?")
+        params.append(target)
+    op = ">" if order == "asc" else "<"
+    last_value = last_rowid = None
+    if cursor:
+        last_value, last_rowid = decode_cursor(cursor)
+
+    index_path = ensure_hit_index(folder_path)
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+
+    def fetch(extra: List[str], extra_params: List[Any], order_by: str, count: int):
+        where = f"WHERE {' AND '.join(clauses + extra)}"
+        sql = (
+            f"SELECT rowid, {', '.join(COLUMN_NAMES)} FROM hits {where} "
+            f"ORDER BY {order_by} LIMIT ?"
+        )
+        return conn.execute(sql, params + extra_params + [count]).fetchall()
+
+    # NULL sort values (e.g. scores missing from older jobs) come last in either
+    # order, by rowid; two keyset queries keep both segments on an index seek
+    try:
+        rows = []
+        if not cursor or last_value is not None:
+            keyset = [f"{column} IS NOT NULL"]
+            keyset_params: List[Any] = []
+            if cursor:
+                keyset.append(f"({column} {op} ? OR ({column} = ? AND rowid {op} ?))")
+                keyset_params = [last_value, last_value, last_rowid]
+            rows = fetch(keyset, keyset_params, f"{column} {order}, rowid {order}", limit + 1)
+        if len(rows) <= limit:
+            nulls = [f"{column} IS NULL"]
+            null_params: List[Any] = []
+            if cursor and last_value is None:
+                nulls.append(f"rowid {op} ?")
+                null_params = [last_rowid]
+            rows += fetch(nulls, null_params, f"rowid {order}", limit + 1 - len(rows))
+    finally:
+        conn.close()
+
+    hits = [dict(zip(COLUMN_NAMES, row[1:])) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[1 + COLUMN_NAMES.index(column)], last[0])
+    return {"hits": hits, "nextCursor": next_cursor}
+
+
+def query_hsps(
+    folder_path,
+    query: Optional[str] = None,
+    accession: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Every HSP for a query and/or subject accession, in archive order."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses: List[str] = []
+    params: List[Any] = []
+    if query is not None:
+        clauses.append("query_title = ?")
+        params.append(query)
+    if accession is not None:
+        clauses.append("subject_accession = ?")
+        params.append(accession)
+    if cursor:
+        _, last_rowid = decode_cursor(cursor)
+        clauses.append("rowid > ?")
+        params.append(last_rowid)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT rowid, {', '.join(HSP_COLUMN_NAMES)} FROM hsps {where} ORDER BY rowid LIMIT ?"
+    params.append(limit + 1)
+
+    index_path = ensure_hit_index(folder_path)
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    hsps = [dict(zip(HSP_COLUMN_NAMES, row[1:])) for row in rows[:limit]]
+    next_cursor = encode_cursor(None, rows[limit - 1][0]) if len(rows) > limit else None
+    return {"hsps": hsps, "nextCursor": next_cursor}
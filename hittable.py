@@ -0,0 +1,179 @@
+"""Compact columnar storage for every HSP in a BLAST result.
+
+Each column is a typed ``array`` and repeated strings (query titles,
+subject titles, species) are interned once in a shared pool, so a job with
+hundreds of queries × 1000 hits × several HSPs costs a few dozen bytes per
+HSP instead of a dict per row.
+"""
+import csv
+import math
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+HSP_FILENAME = "hsps.tsv"
+
+# (name, typecode); "S" marks an interned string column
+HSP_COLUMNS: List[Tuple[str, str]] = [
+    ("query_id", "S"),
+    ("query_title", "S"),
+    ("query_len", "I"),
+    ("hit_num", "I"),
+    ("hsp_num", "I"),
+    ("subject_id", "S"),
+    ("subject_accession", "S"),
+    ("subject_title", "S"),
+    ("subject_len", "I"),
+    ("taxid", "S"),
+    ("sci_name", "S"),
+    ("identity_pct", "d"),
+    ("query_cov_pct", "d"),
+    ("bit_score", "d"),
+    ("score", "I"),
+    ("evalue", "d"),
+    ("identity", "I"),
+    ("align_len", "I"),
+    ("gaps", "I"),
+    ("query_from", "I"),
+    ("query_to", "I"),
+    ("query_strand", "S"),
+    ("hit_from", "I"),
+    ("hit_to", "I"),
+    ("hit_strand", "S"),
+    # "program:database" for multi-target jobs, empty otherwise
+    ("target", "S"),
+]
+HSP_COLUMN_NAMES = [name for name, _ in HSP_COLUMNS]
+
+
+class StringPool:
+    """Interns strings to small integer ids."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: Any) -> int:
+        value = "" if value is None else str(value)
+        index = self._ids.get(value)
+        if index is None:
+            index = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[index]
+
+
+def _number(value: Any, typecode: str):
+    if typecode == "d":
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return math.nan
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _format(value: Any, typecode: str) -> Any:
+    if typecode == "d" and math.isnan(value):
+        return ""
+    return value
+
+
+class HitTable:
+    """Append-only struct-of-arrays table of HSPs (see HSP_COLUMNS)."""
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.columns = {
+            name: array("I" if code == "S" else code) for name, code in HSP_COLUMNS
+        }
+        self._codes = dict(HSP_COLUMNS)
+
+    def __len__(self) -> int:
+        return len(self.columns["hsp_num"])
+
+    def append(self, values: Dict[str, Any]) -> None:
+        for name, code in HSP_COLUMNS:
+            value = values.get(name)
+            if code == "S":
+                self.columns[name].append(self.strings.intern(value))
+            else:
+                self.columns[name].append(_number(value, code))
+
+    def add_search(self, search: Dict[str, Any], query_title: str, target: str = "") -> range:
+        """Append every HSP of one BLAST JSON2 search; returns the new row range."""
+        start = len(self)
+        query_id = search.get("query_id", "")
+        query_len = search.get("query_len") or 0
+        for position, hit in enumerate(search.get("hits", []), start=1):
+            if not hit.get("description") or not hit.get("hsps"):
+                continue
+            desc = hit["description"][0]
+            for hsp in hit["hsps"]:
+                align_len = hsp.get("align_len") or 0
+                query_span = abs((hsp.get("query_to") or 0) - (hsp.get("query_from") or 0)) + 1
+                self.append({
+                    "query_id": query_id,
+                    "query_title": query_title,
+                    "query_len": query_len,
+                    "hit_num": hit.get("num") or position,
+                    "hsp_num": hsp.get("num"),
+                    "subject_id": desc.get("id", ""),
+                    "subject_accession": desc.get("accession", ""),
+                    "subject_title": desc.get("title", ""),
+                    "subject_len": hit.get("len"),
+                    "taxid": desc.get("taxid", ""),
+                    "sci_name": desc.get("sciname", ""),
+                    "identity_pct": round(100 * hsp.get("identity", 0) / max(align_len, 1), 2),
+                    "query_cov_pct": round(100 * query_span / query_len, 2) if query_len else None,
+                    "bit_score": hsp.get("bit_score"),
+                    "score": hsp.get("score"),
+                    "evalue": hsp.get("evalue"),
+                    "identity": hsp.get("identity"),
+                    "align_len": align_len,
+                    "gaps": hsp.get("gaps"),
+                    "query_from": hsp.get("query_from"),
+                    "query_to": hsp.get("query_to"),
+                    "query_strand": hsp.get("query_strand", ""),
+                    "hit_from": hsp.get("hit_from"),
+                    "hit_to": hsp.get("hit_to"),
+                    "hit_strand": hsp.get("hit_strand", ""),
+                    "target": target,
+                })
+        return range(start, len(self))
+
+    def value(self, name: str, index: int) -> Any:
+        raw = self.columns[name][index]
+        code = self._codes[name]
+        return self.strings[raw] if code == "S" else _format(raw, code)
+
+    def row(self, index: int, names: Sequence[str] = HSP_COLUMN_NAMES) -> List[Any]:
+        return [self.value(name, index) for name in names]
+
+    def rows(self, indices=None, names: Sequence[str] = HSP_COLUMN_NAMES) -> Iterator[List[Any]]:
+        for index in range(len(self)) if indices is None else indices:
+            yield self.row(index, names)
+
+    def top_hsps(self, indices: range) -> Iterator[int]:
+        """Indices of each hit's first (best) HSP."""
+        hit_num = self.columns["hit_num"]
+        last_hit = None
+        for index in indices:
+            if hit_num[index] != last_hit:
+                last_hit = hit_num[index]
+                yield index
+
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+    def write_tsv(self, path) -> Path:
+        path = Path(path)
+        with path.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(HSP_COLUMN_NAMES)
+            writer.writerows(self.rows())
+        return path
@@ -0,0 +1,279 @@
+"""Streamed HTML report, a lightweight alternative to the ReportLab PDFs.
+
+Built from the same per-file analysis as anomaly_output.pdf
+(``anomaly.AnomalyAggregator``) but written as a sequence of HTML chunks:
+the header and job summary go out before any CSV is read, then one
+section per query as its file is processed, so a browser shows the report
+while the rest is still being produced. Each section carries its hits as
+compact JSON (column names once, rows as arrays) that a small script
+pages and sorts client-side, instead of laying out every row up front.
+"""
+import csv
+import heapq
+import json
+from collections import defaultdict
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from typing import Iterator, List
+
+from CONFIG import CONFIG, load_config
+from anomaly import TOP_SCORED, AnomalyAggregator, is_anomaly, row_score
+
+HTML_FILENAME = "report.html"
+PAGE_SIZE = 50
+HIT_COLUMNS = [
+    "subject_accession",
+    "subject_title",
+    "sci_name",
+    "identity_pct",
+    "bit_score",
+    "evalue",
+    "anomaly_score",
+    "anomaly_rank",
+]
+COLUMN_LABELS = {
+    "subject_accession": "Accession",
+    "subject_title": "Subject",
+    "sci_name": "Species",
+    "identity_pct": "Identity %",
+    "bit_score": "Bit Score",
+    "evalue": "E-value",
+    "anomaly_score": "Score",
+    "anomaly_rank": "Rank",
+    "target": "Target",
+    "anomaly": "Anomaly",
+}
+
+HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; margin: 24px auto; max-width: 1100px; color: #2C3E50; }}
+h1 {{ text-align: center; }}
+h2 {{ color: #34495E; border-bottom: 1px solid #ddd; padding-bottom: 4px; margin-top: 36px; }}
+table {{ border-collapse: collapse; width: 100%; margin: 8px 0 16px; font-size: 13px; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 6px; text-align: left; vertical-align: top; }}
+th {{ background: #2C3E50; color: #fff; }}
+table.anomaly th {{ background: #E74C3C; }}
+table.grouped th {{ background: #8E44AD; }}
+table.hits th {{ background: #27AE60; cursor: pointer; }}
+tr:nth-child(even) td {{ background-color: #F8F9FA; }}
+tr.anomalous td {{ background: #FDEDEC; }}
+.muted {{ color: #777; font-size: 13px; }}
+.pager button {{ margin-right: 4px; }}
+nav a {{ margin-right: 10px; }}
+</style>
+<script>
+function tally(records, anomalies) {{
+  const cell = id => document.getElementById(id);
+  const total = Number(cell('total-records').dataset.value) + records;
+  const flagged = Number(cell('total-anomalies').dataset.value) + anomalies;
+  cell('total-records').dataset.value = total;
+  cell('total-anomalies').dataset.value = flagged;
+  cell('total-records').textContent = total.toLocaleString();
+  cell('total-anomalies').textContent = flagged.toLocaleString();
+  cell('anomaly-rate').textContent = total ? (flagged / total * 100).toFixed(1) + '%' : '0.0%';
+  cell('files-done').textContent = Number(cell('files-done').textContent) + 1;
+}}
+
+function hitTable(id) {{
+  const data = JSON.parse(document.getElementById(id + '-data').textContent);
+  const box = document.getElementById(id);
+  const flag = data.columns.indexOf('anomaly');
+  let page = 0, sortBy = -1, desc = false;
+  function value(v) {{
+    const n = Number(v);
+    return v !== '' && !Number.isNaN(n) ? n : String(v).toLowerCase();
+  }}
+  function render() {{
+    const pages = Math.max(1, Math.ceil(data.rows.length / data.pageSize));
+    page = Math.min(page, pages - 1);
+    const rows = data.rows.slice(page * data.pageSize, (page + 1) * data.pageSize);
+    const esc = s => String(s).replace(/[&<>"]/g, c => ({{'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}})[c]);
+    box.innerHTML =
+      '<table class="hits"><tr>' +
+      data.columns.map((c, i) => `<th data-col="${{i}}">${{esc(data.labels[i])}}${{i === sortBy ? (desc ? ' ▼' : ' ▲') : ''}}</th>`).join('') +
+      '</tr>' +
+      rows.map(r => `<tr${{flag >= 0 && r[flag] ? ' class="anomalous"' : ''}}>` +
+        r.map((v, i) => `<td>${{i === flag ? (v ? 'yes' : 'no') : esc(v)}}</td>`).join('') + '</tr>').join('') +
+      '</table><div class="pager">' +
+      `<button data-step="-1"${{page === 0 ? ' disabled' : ''}}>Prev</button>` +
+      `<button data-step="1"${{page >= pages - 1 ? ' disabled' : ''}}>Next</button>` +
+      `<span class="muted">Page ${{page + 1}} of ${{pages}} (${{data.rows.length}} hits)</span></div>`;
+  }}
+  box.addEventListener('click', event => {{
+    const step = event.target.dataset.step;
+    const col = event.target.dataset.col;
+    if (step) {{
+      page += Number(step);
+    }} else if (col !== undefined) {{
+      desc = sortBy === Number(col) ? !desc : false;
+      sortBy = Number(col);
+      data.rows.sort((a, b) => {{
+        const x = value(a[sortBy]), y = value(b[sortBy]);
+        return (x < y ? -1 : x > y ? 1 : 0) * (desc ? -1 : 1);
+      }});
+      page = 0;
+    }} else {{
+      return;
+    }}
+    render();
+  }});
+  render();
+}}
+</script>
+</head>
+<body>
+"""
+
+
+def _table(headers: List[str], rows: List[List], css_class: str = "") -> str:
+    if not rows:
+        return ""
+    head = "".join(f"<th>{escape(str(h))}</th>" for h in headers)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows
+    )
+    class_attr = f' class="{css_class}"' if css_class else ""
+    return f"<table{class_attr}><tr>{head}</tr>{body}</table>\n"
+
+
+def _json_script(element_id: str, payload) -> str:
+    # "</" inside a script element would end it early
+    data = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
+    return f'<script type="application/json" id="{element_id}">{data}</script>\n'
+
+
+def _pct(part: int, whole: int) -> str:
+    return f"{(part / whole * 100) if whole else 0:.1f}%"
+
+
+def _read_hits(csv_path: Path, aggregator: AnomalyAggregator):
+    """One pass over a result CSV: feed the aggregator and keep the compact hit rows."""
+    rows = []
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        columns = [c for c in HIT_COLUMNS if c in fields]
+        if "target" in fields:
+            columns.append("target")
+        for row in reader:
+            aggregator.add(row)
+            rows.append(
+                [row.get(c) or "" for c in columns]
+                + [1 if is_anomaly(row.get("subject_title", ""), aggregator.non_anomaly_keywords) else 0]
+            )
+    return columns + ["anomaly"], rows
+
+
+def _query_section(index: int, csv_path: Path, keywords) -> tuple:
+    aggregator = AnomalyAggregator(keywords, CONFIG['normal_sample_size'])
+    try:
+        columns, rows = _read_hits(csv_path, aggregator)
+    except Exception as e:
+        return f"<h2>{escape(csv_path.stem)}</h2><p>Could not read results: {escape(str(e))}</p>\n", aggregator
+
+    parts = [
+        f'<h2 id="q{index}">{escape(csv_path.stem)}</h2>\n',
+        _table(
+            ["Total", "Normal", "Anomalies", "Anomaly %"],
+            [[aggregator.total_records, aggregator.normal_count, aggregator.anomaly_count,
+              _pct(aggregator.anomaly_count, aggregator.total_records)]],
+        ),
+    ]
+    if aggregator.targets:
+        parts.append(_table(
+            ["Target", "Total", "Anomalies", "Anomaly %"],
+            [[target, records, anomalies, _pct(anomalies, records)]
+             for target, (records, anomalies) in sorted(aggregator.targets.items())],
+        ))
+    groups = aggregator.grouped_anomalies()
+    if groups:
+        parts.append(_table(
+            ["Species Group", "Count", "Percentage", "Sample Title", "Accession"],
+            [[g['species_group'], g['count'], _pct(g['count'], aggregator.anomaly_count),
+              g['sample'].get('subject_title', ''), g['sample'].get('subject_accession', '')]
+             for g in groups],
+            "anomaly",
+        ))
+    else:
+        parts.append('<p class="muted">No anomalies detected in this file.</p>\n')
+    if rows:
+        table_id = f"hits{index}"
+        parts.append(f'<div id="{table_id}"></div>\n')
+        parts.append(_json_script(f"{table_id}-data", {
+            "columns": columns,
+            "labels": [COLUMN_LABELS.get(c, c) for c in columns],
+            "pageSize": PAGE_SIZE,
+            "rows": rows,
+        }))
+        parts.append(f"<script>hitTable('{table_id}')</script>\n")
+    parts.append(f"<script>tally({aggregator.total_records}, {aggregator.anomaly_count})</script>\n")
+    return "".join(parts), aggregator
+
+
+def iter_html_report(folder_path, config=None) -> Iterator[str]:
+    """Yield the HTML report for a results folder in chunks, summary first."""
+    config = config or load_config()
+    folder = Path(folder_path)
+    keywords = [config[4]]
+    csv_files = sorted(folder.glob("*.csv"))
+    title = f"{config[5]} BLAST Anomaly Report"
+    folder_label = folder.name or folder.as_posix()
+
+    yield HEAD.format(title=escape(title))
+    yield (
+        f"<h1>{escape(title)}</h1>\n"
+        f'<p class="muted">Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} '
+        f"&middot; BatchBLAST ID: {escape(folder_label)} &middot; "
+        f"Program: {escape(config[2])} &middot; Database: {escape(config[3])} &middot; "
+        f"Non-anomaly keywords: {escape(config[4])}</p>\n"
+        "<h2>Overall Statistics</h2>\n"
+        "<table><tr><th>Metric</th><th>Value</th></tr>"
+        f'<tr><td>Sequences Analyzed</td><td><span id="files-done">0</span> of {len(csv_files)}</td></tr>'
+        '<tr><td>Total Records</td><td id="total-records" data-value="0">0</td></tr>'
+        '<tr><td>Total Anomalies</td><td id="total-anomalies" data-value="0">0</td></tr>'
+        '<tr><td>Anomaly Rate</td><td id="anomaly-rate">0.0%</td></tr></table>\n'
+        '<nav><a href="#top-scores">Highest anomaly scores</a><a href="#patterns">Cross-file patterns</a></nav>\n'
+    )
+    if not csv_files:
+        yield "<p>No results in this folder.</p>\n</body></html>\n"
+        return
+
+    cross = defaultdict(int)
+    top_scored = []
+    for index, csv_path in enumerate(csv_files):
+        section, aggregator = _query_section(index, csv_path, keywords)
+        yield section
+        for group in aggregator.grouped_anomalies():
+            cross[group['species_group']] += group['count']
+        top_scored.extend(row for _, _, row in aggregator.top_scored)
+
+    scored = heapq.nlargest(TOP_SCORED, top_scored, key=row_score)
+    yield '<h2 id="top-scores">Highest Anomaly Scores</h2>\n'
+    yield _table(
+        ["Rank", "Query", "Subject", "Identity %", "Bit Score", "E-value", "Score"],
+        [[row.get('anomaly_rank', ''), row.get('query_title', ''), row.get('subject_title', ''),
+          row.get('identity_pct', ''), row.get('bit_score', ''), row.get('evalue', ''),
+          row.get('anomaly_score', '')] for row in scored],
+        "anomaly",
+    ) or '<p class="muted">No anomaly scores in these results.</p>\n'
+    yield '<h2 id="patterns">Cross-File Anomaly Patterns</h2>\n'
+    yield _table(
+        ["Species Group", "Total Occurrences"],
+        sorted(([species, count] for species, count in cross.items()), key=lambda x: x[1], reverse=True)[:10],
+        "grouped",
+    ) or '<p class="muted">No cross-file anomaly patterns detected.</p>\n'
+    yield "</body></html>\n"
+
+
+def write_html_report(folder_path, config=None) -> Path:
+    """Write the HTML report into the results folder, for jobs that skip the PDFs."""
+    path = Path(folder_path) / HTML_FILENAME
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in iter_html_report(folder_path, config):
+            f.write(chunk)
+    return path
@@ -1,23 +1,53 @@
 import asyncio
+import codecs
+import hashlib
 import json
+import re
 import secrets
+import time
 import zipfile
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from fastapi import FastAPI, WebSocket, Request, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import FileResponse, StreamingResponse
 from starlette.websockets import WebSocketDisconnect
 from pydantic import BaseModel, Field
+from python_multipart.multipart import MultipartParser, parse_options_header
 import uvicorn
 from io import BytesIO
 from pathlib import Path
-from CONFIG import load_config, save_config
-from blast import run_blast_job
+from CONFIG import CONFIG, RESULTS_FOLDER, UPLOADS_FOLDER, load_config, save_config
+from blast import (
+    QC_FILENAME,
+    job_version_folder,
+    normalize_report_format,
+    normalize_targets,
+    raw_results_folder,
+    reprocess_job,
+    run_blast_job,
+    stored_config,
+)
+from workers import PARSE_POOL, REPORT_POOL
+from htmlreport import iter_html_report
+from hitindex import INDEX_FILENAME, query_hits, query_hsps
+from hittable import HSP_FILENAME
+from catalog import search_jobs
+from fasta import FastaError, FastaStreamParser, format_fasta, parse_fasta, query_alphabet
+from profiling import PROFILE_FILES
+from metrics import (
+    BROADCAST_SECONDS,
+    LOOP_LAG_LAST,
+    LOOP_LAG_SECONDS,
+    WS_SUBSCRIBERS,
+    JobMetrics,
+    render_prometheus,
+)
 
 
 class ConfigPayload(BaseModel):
@@ -28,20 +58,61 @@ class ConfigPayload(BaseModel):
     nonAnomaly: str = Field(..., min_length=1)
     speciesName: str = Field(..., min_length=1)
 
-app = FastAPI()
+LOOP_LAG_INTERVAL = 0.5
 
-RESULTS_DIR = (Path.cwd() / "blast_res").resolve()
+
+async def _monitor_event_loop_lag() -> None:
+    """Sample how late the loop wakes us up compared to the requested sleep."""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(time.monotonic() - start - LOOP_LAG_INTERVAL, 0.0)
+        LOOP_LAG_SECONDS.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    monitor = asyncio.create_task(_monitor_event_loop_lag())
+    # start report and parse workers in the background so startup isn't held up by their imports
+    prewarm = asyncio.gather(REPORT_POOL.prewarm(), PARSE_POOL.prewarm())
+    try:
+        yield
+    finally:
+        monitor.cancel()
+        prewarm.cancel()
+        REPORT_POOL.shutdown()
+        PARSE_POOL.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+RESULTS_DIR = (Path.cwd() / RESULTS_FOLDER).resolve()
 RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+UPLOADS_DIR = (Path.cwd() / UPLOADS_FOLDER).resolve()
+UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 JOB_RETENTION_SECONDS = 60 * 60  # keep finished job logs for 1 hour
+TERMINAL_STATUSES = {"completed", "error", "cancelled"}
+# terminal event -> the status it sets; only the first one a job publishes counts
+TERMINAL_EVENTS = {"complete": "completed", "error": "error", "cancelled": "cancelled"}
 job_states: Dict[str, Dict[str, Any]] = {}
 job_subscribers: Dict[str, Set[WebSocket]] = defaultdict(set)
 connection_jobs: Dict[WebSocket, Set[str]] = defaultdict(set)
+# job id -> queues of Server-Sent Events readers, fed (event id, message) by publish_job_event
+job_streams: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+SSE_KEEPALIVE_SECONDS = 15
+# idempotency key -> job id of the running job with that input and config
+inflight_jobs: Dict[str, str] = {}
 job_lock = asyncio.Lock()
+# results folder -> lock held while its PDFs are rendered on demand
+pdf_render_locks: Dict[str, asyncio.Lock] = {}
+PDF_REPORTS = ("BLAST_Full_Report.pdf", "anomaly_output.pdf")
 
 
 def _now() -> datetime:
@@ -56,33 +127,90 @@ def _parse_ws_payload(message: str) -> Dict[str, Any]:
     return data
 
 
-async def _cleanup_expired_jobs() -> None:
+def _sweep_uploads(cutoff: datetime, finished: Optional[Path], in_use: Set[Path]) -> None:
+    """Delete a finished job's upload and uploads never started within the retention time."""
+    for upload in UPLOADS_DIR.glob("*.fasta"):
+        if upload in in_use:
+            continue
+        if upload == finished or datetime.utcfromtimestamp(upload.stat().st_mtime) < cutoff:
+            upload.unlink(missing_ok=True)
+
+
+async def _cleanup_expired_jobs(finished_upload: Optional[Path] = None) -> None:
     cutoff = _now() - timedelta(seconds=JOB_RETENTION_SECONDS)
     async with job_lock:
         expired_ids = [
             job_id
             for job_id, state in job_states.items()
-            if state.get("status") in {"completed", "error"}
+            if state.get("status") in TERMINAL_STATUSES
             and state.get("last_update", _now()) < cutoff
         ]
         for job_id in expired_ids:
             job_states.pop(job_id, None)
             job_subscribers.pop(job_id, None)
+            job_streams.pop(job_id, None)
+        # an upload lives as long as a job started from it is running
+        in_use = {
+            state["upload"] for state in job_states.values()
+            if state["status"] == "running" and state.get("upload")
+        }
+
+    await asyncio.to_thread(_sweep_uploads, cutoff, finished_upload, in_use)
+
+
+def _job_key(
+    fasta_data: Any,
+    config: Tuple[str, ...],
+    targets: List[Tuple[str, str]],
+    adaptive: Optional[bool],
+    report_format: str,
+    profile: bool = False,
+) -> str:
+    """Fingerprint a job start from its input, config snapshot, BLAST targets and per-job options."""
+    digest = hashlib.sha256()
+    if isinstance(fasta_data, Path):
+        with fasta_data.open("rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+    else:
+        try:
+            canonical = format_fasta(parse_fasta(str(fasta_data), query_alphabet(config[2])))
+        except FastaError:
+            canonical = str(fasta_data)
+        digest.update(canonical.encode("utf-8"))
+    digest.update(json.dumps([list(config), targets, adaptive, report_format, profile]).encode("utf-8"))
+    return digest.hexdigest()
 
 
-async def _create_job(job_id: str) -> None:
-    async with job_lock:
-        job_states[job_id] = {
+def _create_job_state(job_id: str) -> None:
+    # caller must hold job_lock
+    job_states[job_id] = {
             "job_id": job_id,
             "messages": [],
             "folder_id": None,
             "status": "running",
             "created_at": _now(),
             "last_update": _now(),
+            "metrics": JobMetrics(),
+            "job_key": None,
+            "task": None,
+            # cancel tokens of everyone who started (or attached to) the job
+            "owners": set(),
+            "prescreen": None,
+            # uploaded FASTA the job was started from, deleted once it finishes
+            "upload": None,
         }
 
 
+def _add_owner(job_id: str) -> str:
+    # caller must hold job_lock
+    token = secrets.token_hex(16)
+    job_states[job_id]["owners"].add(token)
+    return token
+
+
 async def _broadcast(subscribers: List[WebSocket], message: Dict[str, Any]) -> None:
+    start = time.monotonic()
     serialized = json.dumps(message)
     for ws in list(subscribers):
         try:
@@ -90,6 +218,7 @@ async def _broadcast(subscribers: List[WebSocket], message: Dict[str, Any]) -> N
         except Exception:
             await unregister_connection(ws)
             continue
+    BROADCAST_SECONDS.observe(time.monotonic() - start)
 
 
 async def _send_ws_error(websocket: WebSocket, detail: str, job_id: Optional[str] = None) -> None:
@@ -161,21 +290,33 @@ async def publish_job_event(job_id: str, event_type: str, payload: Any) -> None:
     async with job_lock:
         state = job_states.get(job_id)
         subscribers = list(job_subscribers.get(job_id, set()))
+        streams = list(job_streams.get(job_id, set()))
+        event_id = None
         if state:
+            if event_type in TERMINAL_EVENTS:
+                if state["status"] in TERMINAL_STATUSES:
+                    # e.g. a cancel that lost the race with completion: the job already ended
+                    return
+                state["status"] = TERMINAL_EVENTS[event_type]
             if event_type == "folder" and isinstance(payload, dict):
                 state["folder_id"] = payload.get("folderId")
-            if event_type == "complete":
-                state["status"] = "completed"
-            if event_type == "error":
-                state["status"] = "error"
+            if event_type == "prescreen":
+                state["prescreen"] = payload
+            if event_type in TERMINAL_EVENTS:
+                message["metrics"] = state["metrics"].as_dict()
+                if inflight_jobs.get(state["job_key"]) == job_id:
+                    inflight_jobs.pop(state["job_key"], None)
             state["last_update"] = _now()
             # Keep history even if no subscribers for replay.
             state["messages"].append(message)
+            event_id = len(state["messages"])
 
     await _broadcast(subscribers, message)
+    for queue in streams:
+        queue.put_nowait((event_id, message))
 
-    if event_type in {"complete", "error"}:
-        await _cleanup_expired_jobs()
+    if event_type in TERMINAL_EVENTS:
+        await _cleanup_expired_jobs(state.get("upload") if state else None)
 
 
 def resolve_results_folder(folder_id: str) -> Path:
@@ -192,6 +333,40 @@ def resolve_results_folder(folder_id: str) -> Path:
 
     return resolved
 
+def resolve_job_folder(job_id: str, version: Optional[int] = None) -> Path:
+    """Map a live job id or a results folder name to its results folder.
+
+    A results folder name resolves to its latest reprocessed version, so
+    reprocessed results outlive the reprocess job's id; ``version`` picks
+    one explicitly (1 is the original run).
+    """
+    state = job_states.get(job_id)
+    if state:
+        if not state.get("folder_id"):
+            raise HTTPException(status_code=409, detail="Job has no results yet")
+        folder = resolve_results_folder(state["folder_id"])
+        if version is None:
+            return folder
+        folder = raw_results_folder(folder) or folder
+    elif re.fullmatch(r"[A-Za-z0-9]+", job_id) and (RESULTS_DIR / job_id).is_dir():
+        folder = RESULTS_DIR / job_id
+    else:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    found = job_version_folder(folder, version)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown version")
+    return found
+
+
+def resolve_upload(upload_id: str) -> Path:
+    if not re.fullmatch(r"[0-9a-f]{16}", upload_id or ""):
+        raise HTTPException(status_code=400, detail="Invalid upload id")
+    path = UPLOADS_DIR / f"{upload_id}.fasta"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Unknown upload id")
+    return path
+
+
 @app.get("/", response_class=HTMLResponse)
 async def get_home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -213,6 +388,12 @@ def serialize_config():
     }
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    WS_SUBSCRIBERS.set(sum(len(subscribers) for subscribers in job_subscribers.values()))
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/getconfig")
 async def getconfig():
     return serialize_config()
@@ -230,13 +411,257 @@ async def saveconfig(payload: ConfigPayload):
     )
     return {"status": "success", "config": serialize_config()}
 
+@app.get("/jobs/{job_id}/hits")
+async def job_hits(
+    job_id: str,
+    query: Optional[str] = None,
+    taxid: Optional[str] = None,
+    min_identity: Optional[float] = None,
+    max_identity: Optional[float] = None,
+    max_evalue: Optional[float] = None,
+    target: Optional[str] = None,
+    sort: str = "evalue",
+    order: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    version: Optional[int] = None,
+):
+    folder_path = resolve_job_folder(job_id, version)
+    state = job_states.get(job_id)
+    if state and state["status"] == "running" and not (folder_path / INDEX_FILENAME).exists():
+        raise HTTPException(status_code=409, detail="Results are not indexed yet")
+    try:
+        return await asyncio.to_thread(
+            query_hits,
+            folder_path,
+            query=query,
+            taxid=taxid,
+            min_identity=min_identity,
+            max_identity=max_identity,
+            max_evalue=max_evalue,
+            target=target,
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/jobs/{job_id}/hsps")
+async def job_hsps(
+    job_id: str,
+    query: Optional[str] = None,
+    accession: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    version: Optional[int] = None,
+):
+    folder_path = resolve_job_folder(job_id, version)
+    state = job_states.get(job_id)
+    if state and state["status"] == "running" and not (folder_path / INDEX_FILENAME).exists():
+        raise HTTPException(status_code=409, detail="Results are not indexed yet")
+    try:
+        return await asyncio.to_thread(
+            query_hsps, folder_path, query=query, accession=accession, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/catalog/jobs")
+async def catalog_jobs(
+    species: Optional[str] = None,
+    taxid: Optional[str] = None,
+    accession: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+):
+    """Past jobs filtered by hit species/taxid/accession and creation time (ISO dates)."""
+    jobs = await asyncio.to_thread(
+        search_jobs,
+        species=species,
+        taxid=taxid,
+        accession=accession,
+        since=since,
+        until=until,
+        limit=max(1, min(limit, 1000)),
+        results_dir=RESULTS_DIR,
+    )
+    return {"jobs": jobs}
+
+
+async def _multipart_field(content_type: str, body, field: str):
+    """Yield one multipart form field's bytes as the body streams in.
+
+    ``request.form()`` spools the whole body before returning; this feeds it
+    through python-multipart's push parser instead.
+    """
+    boundary = parse_options_header(content_type)[1].get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Missing multipart boundary")
+    part = {"name": b"", "value": b"", "headers": {}, "wanted": False}
+    found = False
+    pending: List[bytes] = []
+
+    def on_part_begin() -> None:
+        part.update(name=b"", value=b"", headers={}, wanted=False)
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        part["name"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        part["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        part["headers"][part["name"].lower()] = part["value"]
+        part["name"] = part["value"] = b""
+
+    def on_headers_finished() -> None:
+        nonlocal found
+        disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))[1]
+        part["wanted"] = not found and disposition.get(b"name") == field.encode()
+        found = found or part["wanted"]
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if part["wanted"]:
+            pending.append(data[start:end])
+
+    multipart = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    async for chunk in body:
+        multipart.write(chunk)
+        if pending:
+            yield b"".join(pending)
+            pending.clear()
+    multipart.finalize()
+    if pending:
+        yield b"".join(pending)
+    if not found:
+        raise HTTPException(status_code=400, detail=f"Missing '{field}' field")
+
+
+@app.post("/upload")
+async def upload_endpoint(request: Request):
+    """Stream a FASTA file to disk, validating records as they arrive.
+
+    Accepts either a raw (optionally chunked) request body or a multipart
+    form with a ``file`` field, neither buffered whole; bodies over
+    ``CONFIG['upload_max_bytes']`` get a 413. Records are checked against
+    the alphabet of ``program`` (default: the configured program). Returns
+    an upload id that a websocket ``start`` action can reference instead of
+    inline FASTA text. The file is deleted when a job started from it
+    finishes, or once ``JOB_RETENTION_SECONDS`` pass without one starting.
+    """
+    upload_id = secrets.token_hex(8)
+    path = UPLOADS_DIR / f"{upload_id}.fasta"
+    program = request.query_params.get("program") or load_config()[2]
+    parser = FastaStreamParser(collect=False, alphabet=query_alphabet(program))
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    size = 0
+
+    def consume(chunk: bytes, out) -> None:
+        out.write(chunk)
+        parser.feed(decoder.decode(chunk))
+
+    max_bytes = CONFIG['upload_max_bytes']
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+
+    async def body():
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+            yield chunk
+
+    async def chunks():
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            async for chunk in _multipart_field(content_type, body(), "file"):
+                yield chunk
+        else:
+            async for chunk in body():
+                yield chunk
+
+    try:
+        with path.open("wb") as out:
+            async for chunk in chunks():
+                size += len(chunk)
+                # parsing is CPU-bound; keep the event loop free for other jobs
+                await asyncio.to_thread(consume, chunk, out)
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    except FastaError as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return {
+        "uploadId": upload_id,
+        "records": parser.record_count,
+        "residues": parser.residue_count,
+        "bytes": size,
+    }
+
+
+async def ensure_pdf_reports(folder_path: Path) -> None:
+    """Render a folder's PDFs on first request if its job only wrote the HTML report."""
+    def missing() -> bool:
+        return not all((folder_path / name).exists() for name in PDF_REPORTS)
+
+    if not missing():
+        return
+    for state in job_states.values():
+        if (
+            state["status"] == "running"
+            and state.get("folder_id")
+            and resolve_results_folder(state["folder_id"]) == folder_path
+        ):
+            raise HTTPException(status_code=409, detail="Reports are still being generated")
+    if not any(folder_path.glob("*.csv")):
+        raise HTTPException(status_code=404, detail="No results in this folder")
+    async with pdf_render_locks.setdefault(folder_path.as_posix(), asyncio.Lock()):
+        if missing():
+            config = await asyncio.to_thread(stored_config, folder_path)
+            await REPORT_POOL.render(folder_path, config or load_config())
+
+
+@app.get("/report")
+async def report_endpoint(folderid: str):
+    """The job's report as HTML, streamed: the summary first, then one section per query."""
+    folder_path = resolve_results_folder(folderid)
+    if not folder_path.is_dir():
+        raise HTTPException(status_code=404, detail="Unknown job folder")
+    config = await asyncio.to_thread(stored_config, folder_path)
+    # a sync iterator, so Starlette reads the CSVs in its threadpool
+    return StreamingResponse(
+        iter_html_report(folder_path, config or load_config()),
+        media_type="text/html; charset=utf-8",
+    )
+
+
 @app.get("/download")
 async def download_endpoint(request: Request, type: int, folderid: str):
     folder_path = resolve_results_folder(folderid)
     folder_label = folder_path.name or folder_path.as_posix()
+    if type in (2, 3):
+        await ensure_pdf_reports(folder_path)
 
     if type == 1:
-        csv_paths = sorted(folder_path.glob("*.csv"))
+        csv_paths = sorted(folder_path.glob("*.csv")) + [folder_path / HSP_FILENAME, folder_path / QC_FILENAME]
         zip_buffer = BytesIO()
         with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
             for file_path in csv_paths:
@@ -279,11 +704,41 @@ async def download_endpoint(request: Request, type: int, folderid: str):
                 'Content-Disposition': f'attachment; filename="{folder_label}_inputs.fasta"'
             }
         )
+    elif type == 5:
+        profile_paths = [folder_path / name for name in PROFILE_FILES]
+        if not any(path.exists() for path in profile_paths):
+            raise HTTPException(status_code=404, detail="No profile captured for this job")
+        zip_buffer = BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for file_path in profile_paths:
+                if file_path.exists():
+                    zipf.write(file_path, arcname=file_path.name)
+
+        zip_buffer.seek(0)
+        return StreamingResponse(
+            zip_buffer,
+            media_type="application/x-zip-compressed",
+            headers={"Content-Disposition": f"attachment; filename={folder_label}_profile.zip"}
+        )
+    elif type == 6:
+        qc_path = folder_path / QC_FILENAME
+        if not qc_path.exists():
+            raise HTTPException(status_code=404, detail="This job was not pre-screened")
+        return FileResponse(
+            str(qc_path),
+            media_type='text/tab-separated-values',
+            filename=f'{folder_label}_qc.tsv',
+            headers={
+                'Content-Disposition': f'attachment; filename="{folder_label}_qc.tsv"'
+            }
+        )
 
 @app.get("/preview")
 async def download_endpoint(request: Request, type: int, folderid: str):
     folder_path = resolve_results_folder(folderid)
     folder_label = folder_path.name or folder_path.as_posix()
+    if type in (2, 3):
+        await ensure_pdf_reports(folder_path)
     if type == 2:
         return FileResponse(
             str(folder_path / "BLAST_Full_Report.pdf"),
@@ -307,6 +762,311 @@ async def download_endpoint(request: Request, type: int, folderid: str):
 
 
 
+def _job_notifier(job_id: str):
+    async def notifier(event_type: str, event_payload: Any) -> None:
+        await publish_job_event(job_id, event_type, event_payload)
+
+    return notifier
+
+
+async def _handle_start(websocket: WebSocket, payload: Dict[str, Any]) -> None:
+    fasta_data = payload.get("fasta")
+    upload_id = payload.get("uploadId")
+    if upload_id:
+        try:
+            fasta_data = resolve_upload(str(upload_id))
+        except HTTPException as e:
+            await _send_ws_error(websocket, e.detail)
+            return
+    elif not fasta_data or not str(fasta_data).strip():
+        await _send_ws_error(websocket, "Missing FASTA payload for job start")
+        return
+
+    # ensure the connection only listens to the new job
+    await unsubscribe_connection(websocket)
+
+    config = load_config()
+    try:
+        targets = normalize_targets(payload.get("targets"), config)
+        report_format = normalize_report_format(payload.get("reportFormat"))
+    except ValueError as e:
+        await _send_ws_error(websocket, str(e))
+        return
+    adaptive = payload.get("adaptive")
+    adaptive = None if adaptive is None else bool(adaptive)
+    profile = True if payload.get("profile") else None
+    # a job asking for a profile must not attach to one that won't write it
+    job_key = await asyncio.to_thread(
+        _job_key, fasta_data, config, targets, adaptive, report_format,
+        bool(profile or CONFIG['profile_jobs']),
+    )
+    requested_job = payload.get("jobId")
+    attached = False
+    async with job_lock:
+        existing = inflight_jobs.get(job_key)
+        if existing and job_states.get(existing, {}).get("status") == "running":
+            # single-flight: an identical job is already running, share it
+            job_id = existing
+            attached = True
+            cancel_token = _add_owner(job_id)
+        else:
+            job_id = requested_job if requested_job and requested_job not in job_states else None
+            while job_id is None or job_id in job_states:
+                job_id = secrets.token_hex(8)
+            _create_job_state(job_id)
+            job_states[job_id]["job_key"] = job_key
+            if isinstance(fasta_data, Path):
+                job_states[job_id]["upload"] = fasta_data
+            inflight_jobs[job_key] = job_id
+            cancel_token = _add_owner(job_id)
+
+    try:
+        await subscribe_connection(websocket, job_id, replay=attached)
+    except HTTPException:
+        await _send_ws_error(websocket, "Unable to subscribe to job", job_id)
+        return
+
+    if not attached:
+        await publish_job_event(
+            job_id, "job_started", {"message": "BLAST job accepted"}
+        )
+        job_states[job_id]["task"] = asyncio.create_task(
+            run_blast_job(
+                fasta_data,
+                _job_notifier(job_id),
+                job_states[job_id]["metrics"],
+                profile=profile,
+                config=config,
+                targets=targets,
+                adaptive=adaptive,
+                report_format=report_format,
+            )
+        )
+
+    ack_payload = {
+        "type": "job_ack",
+        "jobId": job_id,
+        "attached": attached,
+        "cancelToken": cancel_token,
+        "timestamp": _now().isoformat(),
+    }
+    await websocket.send_text(json.dumps(ack_payload))
+
+
+async def _start_reprocess(folder_path: Path) -> Tuple[str, str]:
+    """Spawn a reprocess of a finished job folder as a new job; returns its id and cancel token."""
+    if raw_results_folder(folder_path) is None:
+        raise HTTPException(status_code=409, detail="No stored BLAST results for this job")
+    async with job_lock:
+        job_id = secrets.token_hex(8)
+        while job_id in job_states:
+            job_id = secrets.token_hex(8)
+        _create_job_state(job_id)
+        cancel_token = _add_owner(job_id)
+    await publish_job_event(
+        job_id, "job_started", {"message": "Reprocess accepted", "source": folder_path.name}
+    )
+    job_states[job_id]["task"] = asyncio.create_task(
+        reprocess_job(
+            folder_path,
+            _job_notifier(job_id),
+            job_states[job_id]["metrics"],
+            config=load_config(),
+        )
+    )
+    return job_id, cancel_token
+
+
+@app.post("/jobs/{job_id}/reprocess")
+async def reprocess_endpoint(job_id: str, version: Optional[int] = None):
+    """Regenerate a finished job's reports with the current report settings, without re-BLASTing."""
+    folder_path = resolve_job_folder(job_id, version)
+    state = job_states.get(job_id)
+    if state and state["status"] == "running":
+        raise HTTPException(status_code=409, detail="Job is still running")
+    new_job_id, cancel_token = await _start_reprocess(folder_path)
+    return {"jobId": new_job_id, "cancelToken": cancel_token}
+
+
+async def _handle_reprocess(websocket: WebSocket, payload: Dict[str, Any]) -> None:
+    job_ref = payload.get("jobId") or payload.get("folderId")
+    if not job_ref:
+        await _send_ws_error(websocket, "Missing job id for reprocess")
+        return
+    job_ref = str(job_ref)
+    try:
+        if job_ref in job_states and job_states[job_ref]["status"] == "running":
+            raise HTTPException(status_code=409, detail="Job is still running")
+        if job_ref in job_states or "/" not in job_ref:
+            folder_path = resolve_job_folder(job_ref)
+        else:
+            # a folderId as sent in "folder" events, e.g. blast_res/abc123
+            folder_path = resolve_results_folder(job_ref)
+            if not folder_path.is_dir():
+                raise HTTPException(status_code=404, detail="Unknown job folder")
+    except HTTPException as e:
+        await _send_ws_error(websocket, e.detail, job_ref)
+        return
+
+    if raw_results_folder(folder_path) is None:
+        await _send_ws_error(websocket, "No stored BLAST results for this job", job_ref)
+        return
+
+    await unsubscribe_connection(websocket)
+    job_id, cancel_token = await _start_reprocess(folder_path)
+    await subscribe_connection(websocket, job_id, replay=True)
+    await websocket.send_text(json.dumps({
+        "type": "job_ack",
+        "jobId": job_id,
+        "attached": False,
+        "reprocess": True,
+        "cancelToken": cancel_token,
+        "timestamp": _now().isoformat(),
+    }))
+
+
+async def cancel_job(job_id: str, token: Optional[str]) -> str:
+    """Cancel a running job on behalf of the owner of ``token``; returns the outcome.
+
+    Only someone who started or attached to the job (and so got its cancel
+    token) may cancel it. While others still share a single-flight job, the
+    caller just lets go of it ("detached"). Otherwise the job's task is
+    cancelled: its NCBI polling, batch slot, report worker and parse stop
+    (see ParsePool for how far a parse gets), and every subscriber gets a
+    "cancelled" event. A job that finishes before the cancel lands keeps
+    its own outcome, which is returned instead of "cancelled". Raises
+    HTTPException for unknown or already finished jobs and bad tokens.
+    """
+    async with job_lock:
+        state = job_states.get(job_id)
+        if not state:
+            raise HTTPException(status_code=404, detail="Unknown job id")
+        if state["status"] != "running":
+            raise HTTPException(status_code=409, detail=f"Job is already {state['status']}")
+        if not token or token not in state["owners"]:
+            raise HTTPException(status_code=403, detail="Not allowed to cancel this job")
+        state["owners"].discard(token)
+        if state["owners"]:
+            return "detached"
+        task = state["task"]
+        # claim the job so a concurrent cancel gets a 409
+        state["status"] = "cancelling"
+        if inflight_jobs.get(state["job_key"]) == job_id:
+            inflight_jobs.pop(state["job_key"], None)
+
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.wait({task})
+    await publish_job_event(
+        job_id, "cancelled", ["Job cancelled", "The BLAST job was stopped before it finished."]
+    )
+    return state["status"]
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_endpoint(job_id: str, request: Request):
+    """Cancel a job; send the cancel token from its job_ack as X-Cancel-Token."""
+    status = await cancel_job(job_id, request.headers.get("x-cancel-token"))
+    return {"jobId": job_id, "status": status}
+
+
+def _job_snapshot(job_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = state["metrics"]
+    return {
+        "jobId": job_id,
+        "status": state["status"],
+        "stage": metrics.current,
+        "folderId": state["folder_id"],
+        "createdAt": state["created_at"].isoformat(),
+        "updatedAt": state["last_update"].isoformat(),
+        "events": len(state["messages"]),
+        "queue": metrics.queue_position(),
+        "timings": metrics.as_dict(),
+        # queries the local pre-screen kept out of the search, if it ran
+        "prescreen": state["prescreen"],
+    }
+
+
+def _snapshot_etag(snapshot: Dict[str, Any]) -> str:
+    # a running job's total_seconds ticks constantly; leave it out so the tag only
+    # changes when the job actually does something
+    stable = dict(snapshot, timings={
+        key: value for key, value in snapshot["timings"].items()
+        if key != "total_seconds" or snapshot["status"] in TERMINAL_STATUSES
+    })
+    digest = hashlib.sha1(json.dumps(stable, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, request: Request):
+    """A small status snapshot of a live job; send If-None-Match to poll cheaply."""
+    state = job_states.get(job_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    snapshot = _job_snapshot(job_id, state)
+    etag = _snapshot_etag(snapshot)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(json.dumps(snapshot), media_type="application/json", headers=headers)
+
+
+def _sse(message: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(message)}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, replay: bool = False):
+    """Server-Sent Events for one job: a snapshot, then every event as it is published.
+
+    Read-only alternative to the websocket. History is only replayed with
+    ``replay=true`` or after a Last-Event-ID (as EventSource sends when it
+    reconnects). The stream ends after the job's terminal event.
+    """
+    try:
+        last_event_id = int(request.headers.get("last-event-id") or -1)
+    except ValueError:
+        last_event_id = -1
+    queue: asyncio.Queue = asyncio.Queue()
+    async with job_lock:
+        state = job_states.get(job_id)
+        if not state:
+            raise HTTPException(status_code=404, detail="Unknown job id")
+        snapshot = _job_snapshot(job_id, state)
+        start = last_event_id if last_event_id >= 0 else (0 if replay else len(state["messages"]))
+        history = list(enumerate(state["messages"], start=1))[start:]
+        finished = state["status"] in TERMINAL_STATUSES
+        if not finished:
+            job_streams[job_id].add(queue)
+
+    async def stream():
+        try:
+            yield _sse({"type": "snapshot", "jobId": job_id, "payload": snapshot})
+            for event_id, message in history:
+                yield _sse(message, event_id)
+            if finished:
+                return
+            while True:
+                try:
+                    event_id, message = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(message, event_id)
+                if message["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            job_streams.get(job_id, set()).discard(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.websocket("/")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -335,49 +1095,35 @@ async def websocket_endpoint(websocket: WebSocket):
                 await websocket.send_text(json.dumps(resume_ack))
                 continue
 
-            if action != "start":
-                await _send_ws_error(websocket, f"Unknown action '{action}'")
+            if action == "reprocess":
+                await _handle_reprocess(websocket, payload)
                 continue
 
-            fasta_data = payload.get("fasta")
-            if not fasta_data or not str(fasta_data).strip():
-                await _send_ws_error(websocket, "Missing FASTA payload for job start")
+            if action == "cancel":
+                job_id = payload.get("jobId")
+                if not job_id:
+                    await _send_ws_error(websocket, "Missing job id for cancel")
+                    continue
+                try:
+                    status = await cancel_job(str(job_id), payload.get("cancelToken"))
+                except HTTPException as e:
+                    await _send_ws_error(websocket, e.detail, job_id)
+                    continue
+                if status == "detached":
+                    await unsubscribe_connection(websocket, str(job_id))
+                await websocket.send_text(json.dumps({
+                    "type": "cancel_ack",
+                    "jobId": job_id,
+                    "status": status,
+                    "timestamp": _now().isoformat(),
+                }))
                 continue
 
-            # ensure the connection only listens to the new job
-            await unsubscribe_connection(websocket)
-
-            requested_job = payload.get("jobId")
-            job_id: Optional[str] = None
-            while True:
-                candidate = requested_job or secrets.token_hex(8)
-                async with job_lock:
-                    if candidate not in job_states:
-                        job_id = candidate
-                        break
-                requested_job = None  # regenerate id if collision detected
-
-            await _create_job(job_id)
-            try:
-                await subscribe_connection(websocket, job_id, replay=False)
-            except HTTPException:
-                await _send_ws_error(websocket, "Unable to subscribe to job", job_id)
+            if action != "start":
+                await _send_ws_error(websocket, f"Unknown action '{action}'")
                 continue
 
-            async def notifier(event_type: str, event_payload: Any) -> None:
-                await publish_job_event(job_id, event_type, event_payload)
-
-            await publish_job_event(
-                job_id, "job_started", {"message": "BLAST job accepted"}
-            )
-            asyncio.create_task(run_blast_job(fasta_data, notifier))
-
-            ack_payload = {
-                "type": "job_ack",
-                "jobId": job_id,
-                "timestamp": _now().isoformat(),
-            }
-            await websocket.send_text(json.dumps(ack_payload))
+            await _handle_start(websocket, payload)
     except WebSocketDisconnect:
         pass
     finally:
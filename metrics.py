@@ -0,0 +1,254 @@
+"""In-process pipeline metrics rendered in Prometheus text format."""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+STAGE_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values: Dict[LabelKey, Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.setdefault(
+                key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._values.items():
+                for bound, count in zip(self.buckets, series["counts"]):
+                    le = ("le", _format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+JOBS_ACTIVE = Gauge("batchblast_jobs_active", "BLAST jobs currently running.")
+JOBS_ACTIVE.set(0)
+JOBS_TOTAL = Counter("batchblast_jobs_total", "Finished BLAST jobs by final status.")
+STAGE_SECONDS = Histogram("batchblast_job_stage_seconds", "Time spent in each pipeline stage.")
+NCBI_POLLS = Counter("batchblast_ncbi_polls_total", "Status polls sent to NCBI.")
+DOWNLOAD_BYTES = Counter("batchblast_download_bytes_total", "Bytes of BLAST results downloaded.")
+NCBI_HEDGES = Counter("batchblast_ncbi_hedges_total", "Hedged resubmissions of slow searches, by result.")
+WS_SUBSCRIBERS = Gauge("batchblast_websocket_subscribers", "Websocket connections subscribed to a job.")
+BROADCAST_SECONDS = Histogram(
+    "batchblast_broadcast_seconds", "Time to fan a job event out to its subscribers.", LATENCY_BUCKETS
+)
+LOOP_LAG_SECONDS = Histogram(
+    "batchblast_event_loop_lag_seconds", "Event loop scheduling delay.", LATENCY_BUCKETS
+)
+LOOP_LAG_LAST = Gauge("batchblast_event_loop_lag_last_seconds", "Most recent event loop lag sample.")
+
+
+def count_global(name: str, amount: float = 1) -> None:
+    """Count NCBI traffic that isn't owned by a single job (e.g. shared batches)."""
+    if name == "polls":
+        NCBI_POLLS.inc(amount)
+    elif name == "download_bytes":
+        DOWNLOAD_BYTES.inc(amount)
+    elif name == "hedges":
+        NCBI_HEDGES.inc(amount, result="submitted")
+    elif name == "hedge_wins":
+        NCBI_HEDGES.inc(amount, result="won")
+
+
+def render_prometheus() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+class JobMetrics:
+    """Per-job stage timings, mirrored into the process-wide metrics."""
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.status: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.searches: List[float] = []  # seconds each finished NCBI search (RID) took
+        self.current: Optional[str] = None  # stage in progress, for status snapshots
+        self.lines: List["WaitLine"] = []  # shared resources the job is queued for
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        self.record("queue_wait", self.started - self.created)
+        JOBS_ACTIVE.inc()
+
+    def finish(self, status: str) -> None:
+        if self.finished is not None:
+            return
+        self.finished = time.monotonic()
+        self.status = status
+        JOBS_TOTAL.inc(status=status)
+        if self.started is not None:
+            JOBS_ACTIVE.dec()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def observe_search(self, seconds: float) -> None:
+        self.searches.append(seconds)
+
+    def count(self, name: str, amount: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+        count_global(name, amount)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mark what the job is doing without timing it."""
+        previous, self.current = self.current, name
+        try:
+            yield
+        finally:
+            self.current = previous
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            with self.phase(name):
+                yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    def queue_position(self) -> Optional[Dict[str, Any]]:
+        """Where the job waits for a shared resource (1 = next in line), or None."""
+        for line in self.lines:
+            position = line.position(self)
+            if position is not None:
+                return {"name": line.name, "position": position, "length": len(line)}
+        return None
+
+    def as_dict(self) -> Dict[str, Any]:
+        end = self.finished or time.monotonic()
+        return {
+            "status": self.status,
+            "total_seconds": round(end - self.created, 3),
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "search_seconds": [round(s, 3) for s in self.searches],
+        }
+
+
+# the job whose task is running; set by the pipeline so shared resources can tell jobs apart
+CURRENT_JOB: ContextVar[Optional[JobMetrics]] = ContextVar("batchblast_current_job", default=None)
+
+
+class WaitLine:
+    """FIFO of jobs waiting on a shared resource, so each can report its place in line."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._waiting: List[JobMetrics] = []
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def position(self, job: JobMetrics) -> Optional[int]:
+        try:
+            return self._waiting.index(job) + 1
+        except ValueError:
+            return None
+
+    @contextmanager
+    def waiting(self) -> Iterator[None]:
+        """Hold the current job's place in line for the duration of the block."""
+        job = CURRENT_JOB.get()
+        if job is None:
+            yield
+            return
+        self._waiting.append(job)
+        job.lines.append(self)
+        try:
+            yield
+        finally:
+            self._waiting.remove(job)
+            job.lines.remove(self)
@@ -0,0 +1,234 @@
+"""Parsing of big multi-query archives on a pool of worker processes.
+
+A JSON2 archive holds one file per query, and ``parse_archives`` decodes
+them one after another. Here chunks of members go to worker processes
+instead: each decodes its members and writes their rows to fragment files,
+returning every hit's scoring inputs. A query's hits are scored together
+(and a title can recur across members), and ranks span the whole job, so
+the parent scores and ranks everything in one ``score_hits`` pass, in the
+same row order as ``parse_archives``; a second pooled pass then writes
+each query's CSV from its fragments with the scores appended. The output
+matches ``parse_archives`` (``python -m benchmarks.parse_bench``).
+"""
+import asyncio
+import csv
+import io
+import shutil
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from blast import CSV_FIELDNAMES, query_summary, read_member
+from hittable import HSP_COLUMN_NAMES, HSP_FILENAME, HitTable
+from profiling import profile_call
+from scoring import SCORE_COLUMNS, hit_features, score_hits
+
+# not *.csv in the folder root: the reports glob those
+FRAGMENT_DIR = "_parse"
+# several chunks per worker so progress moves and a slow chunk doesn't idle the rest
+CHUNKS_PER_WORKER = 4
+
+
+def _member_names(content):
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        return [name for name in zf.namelist() if name.lower().endswith(".json")]
+
+
+def member_count(archives) -> int:
+    """JSON files across the archives, without decompressing them."""
+    return sum(len(_member_names(content)) for _, content, _ in archives)
+
+
+def parse_members(fragment_dir, members, fieldnames, non_anomaly_keywords):
+    """Decode and write a chunk of (seq, target, query_prefix, archive_path, name) members.
+
+    Writes ``<seq>.rows`` (CSV rows without scores, no header) and
+    ``<seq>.hsps`` (hsps.tsv rows) per search; returns
+    [(seq, query_title, csv_name, target, features, row_ends, summary)]
+    with the ``hit_features`` of each row (taxids as strings) and the
+    search's ``query_summary``.
+    """
+    fragment_dir = Path(fragment_dir)
+    parsed = []
+    archives = {}
+    try:
+        for seq, target, query_prefix, archive_path, name in members:
+            if archive_path not in archives:
+                archives[archive_path] = zipfile.ZipFile(archive_path)
+            member = read_member(name, archives[archive_path].read(name), query_prefix)
+            if member is None:
+                continue
+            query_title, csv_name, report = member
+            search = report["results"]["search"]
+            table = HitTable()
+            rows = table.add_search(search, query_title, target or "")
+            top = list(table.top_hsps(rows))
+            features = hit_features(table, top, non_anomaly_keywords)
+            features["taxid"] = np.array([table.strings[int(code)] for code in features["taxid"]], dtype=str)
+            # where each row ends, so the scores can be spliced in without parsing the CSV again
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            row_ends = []
+            for index in top:
+                writer.writerow(table.row(index, fieldnames))
+                row_ends.append(buffer.tell())
+            (fragment_dir / f"{seq}.rows").write_text(buffer.getvalue(), encoding="utf-8", newline="")
+            with (fragment_dir / f"{seq}.hsps").open("w", newline="", encoding="utf-8") as f:
+                csv.writer(f, delimiter="\t").writerows(table.rows())
+            summary = {**query_summary(query_title, search, non_anomaly_keywords), "target": target}
+            parsed.append((seq, query_title, csv_name, target or "", features, row_ends, summary))
+    finally:
+        for archive in archives.values():
+            archive.close()
+    return parsed
+
+
+def write_query_csvs(fragment_dir, header, outputs):
+    """Write each (csv_path, [(seq, row_ends, scores, ranks)]) CSV from its fragments, appending the scores."""
+    fragment_dir = Path(fragment_dir)
+    terminator = csv.get_dialect("excel").lineterminator
+    for csv_path, parts in outputs:
+        with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+            csv.writer(csvfile).writerow(header)
+            for seq, row_ends, scores, ranks in parts:
+                with (fragment_dir / f"{seq}.rows").open("r", newline="", encoding="utf-8") as f:
+                    text = f.read()
+                start = 0
+                pieces = []
+                for end, score, rank in zip(row_ends, scores, ranks):
+                    pieces.append(f"{text[start:end - len(terminator)]},{score!r},{rank}{terminator}")
+                    start = end
+                csvfile.write("".join(pieces))
+
+
+def score_queries(queries):
+    """Score and rank {query_title: (csv_name, [(seq, target, features, row_ends)])} in one pass.
+
+    Rows go in query order, then member order, as ``parse_archives`` lays
+    them out; returns [(query_title, csv_name, [(seq, row_ends, scores, ranks)])].
+    """
+    parts = [(title, part) for title, (_, title_parts) in queries.items() for part in title_parts]
+    groups = {}
+    group = np.repeat(
+        np.array([groups.setdefault((title, part[1]), len(groups)) for title, part in parts], dtype=np.int64),
+        [len(part[3]) for _, part in parts],
+    )
+    columns = {
+        name: np.concatenate([part[2][name] for _, part in parts]) if parts else np.zeros(0)
+        for name in ("identity", "bit_score", "evalue", "taxid", "keyword_miss")
+    }
+    scores, ranks, _ = score_hits(group, **columns)
+    scores, ranks = scores.tolist(), ranks.tolist()
+    scored = []
+    position = 0
+    for query_title, (csv_name, title_parts) in queries.items():
+        ranked = []
+        for seq, _, _, row_ends in title_parts:
+            end = position + len(row_ends)
+            ranked.append((seq, row_ends, scores[position:end], ranks[position:end]))
+            position = end
+        scored.append((query_title, csv_name, ranked))
+    return scored
+
+
+def _join_hsps(folder_path: Path, fragment_dir: Path, seqs) -> None:
+    with (folder_path / HSP_FILENAME).open("w", newline="", encoding="utf-8") as out:
+        csv.writer(out, delimiter="\t").writerow(HSP_COLUMN_NAMES)
+        for seq in seqs:
+            with (fragment_dir / f"{seq}.hsps").open("r", newline="", encoding="utf-8") as f:
+                shutil.copyfileobj(f, out)
+
+
+def _chunks(items, count):
+    size = max(1, -(-len(items) // count))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+async def parse_in_pool(
+    executor, workers, archives, folderid, non_anomaly_keywords, progress=None, profiler=None, results=None
+):
+    """``parse_archives`` on an executor's worker processes; returns {query_title: csv_path}.
+
+    Fragments and spilled archives live in FRAGMENT_DIR, removed when done.
+    ``progress(done, total)`` is awaited as chunks of members finish, and
+    ``results(summaries)`` with the chunk's query summaries. With
+    a JobProfiler, the workers and the scoring pass are profiled where they
+    run and merged into it.
+    """
+    loop = asyncio.get_running_loop()
+    folder_path = Path(folderid)
+    fragment_dir = folder_path / FRAGMENT_DIR
+    fragment_dir.mkdir(parents=True, exist_ok=True)
+    fieldnames = CSV_FIELDNAMES + (["target"] if any(target for target, _, _ in archives) else [])
+    profile = profiler is not None
+
+    def profiled(stats):
+        if stats is not None:
+            profiler.add_marshalled(stats)
+
+    async def parse_chunk(chunk):
+        parsed, stats = await loop.run_in_executor(
+            executor, profile_call, profile, parse_members,
+            str(fragment_dir), chunk, fieldnames, non_anomaly_keywords,
+        )
+        profiled(stats)
+        return len(chunk), parsed
+
+    async def write_chunk(chunk):
+        _, stats = await loop.run_in_executor(
+            executor, profile_call, profile, write_query_csvs, str(fragment_dir), header, chunk
+        )
+        profiled(stats)
+
+    tasks = []
+    try:
+        # workers read their members from disk: the decompressed JSON is ~10x the archive
+        members = []
+        for number, (target, content, query_prefix) in enumerate(archives):
+            archive_path = fragment_dir / f"archive_{number}.zip"
+            await asyncio.to_thread(archive_path.write_bytes, content)
+            first = len(members)
+            members.extend(
+                (first + offset, target, query_prefix, str(archive_path), name)
+                for offset, name in enumerate(_member_names(content))
+            )
+        tasks = [
+            asyncio.ensure_future(parse_chunk(chunk))
+            for chunk in _chunks(members, workers * CHUNKS_PER_WORKER)
+        ]
+        parsed = []
+        done = 0
+        for next_done in asyncio.as_completed(tasks):
+            count, chunk_parsed = await next_done
+            parsed.extend(chunk_parsed)
+            done += count
+            if results is not None:
+                await results([entry[-1] for entry in chunk_parsed])
+            if progress is not None:
+                await progress(done, len(members))
+        parsed.sort(key=lambda entry: entry[0])
+
+        queries = {}  # query_title -> (csv_name, [(seq, target, features, row_ends)])
+        for seq, query_title, csv_name, target, features, row_ends, _ in parsed:
+            queries.setdefault(query_title, (csv_name, []))[1].append((seq, target, features, row_ends))
+        scored, stats = await asyncio.to_thread(profile_call, profile, score_queries, queries)
+        profiled(stats)
+        outputs = {}
+        written = {}
+        for query_title, csv_name, ranked in scored:
+            csv_path = folder_path / f"{csv_name}.csv"
+            # titles that share a file name overwrite each other, as in parse_archives
+            outputs[str(csv_path)] = ranked
+            written[query_title] = csv_path
+
+        header = fieldnames + SCORE_COLUMNS
+        await asyncio.gather(
+            asyncio.to_thread(_join_hsps, folder_path, fragment_dir, [entry[0] for entry in parsed]),
+            *(write_chunk(chunk) for chunk in _chunks(list(outputs.items()), workers * CHUNKS_PER_WORKER)),
+        )
+        return written
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.to_thread(shutil.rmtree, fragment_dir, True)
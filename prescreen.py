@@ -0,0 +1,191 @@
+"""Local pre-screen of query sequences before they are sent to NCBI.
+
+Near-empty reads, primer-dimers and poly-A runs come back with thousands of
+meaningless hits. Every sequence of a job is checked here in one NumPy pass
+over the concatenated residues: length, N and GC content, and a DUST
+low-complexity score. DUST (as in dustmasker and sdust) scores a window by
+how often its triplets repeat, sum c_t(c_t - 1)/2 / (l - 1) over its l
+triplets, and calls it low complexity when ten times that exceeds the level
+(dustmasker's default is 20). Windows are 64 bases stepping by 32 rather
+than dustmasker's exact interval search, which is enough to flag junk; a
+mask can reach up to one window past the repeat it covers.
+
+The screen is on by default (``CONFIG['prescreen']``, off with
+BATCHBLAST_PRESCREEN=0) and skipped for protein queries. Sequences failing a threshold stay out of the search; with
+``CONFIG['prescreen_mask']`` the low-complexity stretches of the rest are
+replaced with N before submission. The client is sent the rejections as a
+"prescreen" event, and the job folder gets qc.tsv with one row per input
+sequence (also in the CSV download).
+"""
+import csv
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from CONFIG import CONFIG
+from blast import QC_FILENAME
+from fasta import FastaRecord
+
+QC_COLUMNS = [
+    "query_title", "length", "n_pct", "gc_pct", "dust_score", "low_complexity_pct", "status", "reason",
+]
+DUST_WINDOW = 64
+DUST_STEP = DUST_WINDOW // 2
+
+# A C G T (and U) to 0..3; every other code, N included, to 4
+BASE_CODES = np.full(256, 4, dtype=np.int64)
+for _code, _bases in enumerate(("A", "C", "G", "TU")):
+    for _base in _bases:
+        BASE_CODES[ord(_base)] = _code
+
+
+class SequenceQc(NamedTuple):
+    title: str
+    length: int
+    n_pct: float
+    gc_pct: float
+    dust_score: float  # highest window score, on dustmasker's scale
+    low_complexity_pct: float
+    reason: str  # empty when the sequence passed
+
+    @property
+    def passed(self) -> bool:
+        return not self.reason
+
+
+def _dust(codes: np.ndarray, seq_of: np.ndarray, local: np.ndarray, lengths: np.ndarray, level: float):
+    """Per-residue low-complexity mask and each sequence's highest window score.
+
+    Triplets are counted per 32-base block; window w of a sequence is blocks
+    w and w + 1, so every residue lies in two overlapping windows.
+    """
+    n = len(codes)
+    triplet = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    if n >= 3:
+        triplet[:-2] = codes[:-2] * 16 + codes[1:-1] * 4 + codes[2:]
+        # all three bases unambiguous and inside the same sequence
+        valid[:-2] = (
+            (local[:-2] + 2 < lengths[seq_of[:-2]])
+            & (codes[:-2] < 4) & (codes[1:-1] < 4) & (codes[2:] < 4)
+        )
+    blocks = lengths // DUST_STEP + 1
+    first_block = np.r_[0, np.cumsum(blocks)[:-1]]
+    last_block = first_block + blocks - 1
+    block = first_block[seq_of] + local // DUST_STEP
+    counts = np.bincount(
+        block[valid] * 64 + triplet[valid], minlength=int(blocks.sum()) * 64
+    ).reshape(-1, 64)
+
+    window = counts.copy()
+    window[:-1] += counts[1:]
+    window[last_block] = counts[last_block]  # a sequence's last window has no next block
+    triplets = window.sum(axis=1)
+    pairs = (window * (window - 1) // 2).sum(axis=1)
+    score = np.where(triplets > 1, 10 * pairs / np.maximum(triplets - 1, 1), 0.0)
+
+    low = score > level
+    covered = low.copy()
+    covered[1:] |= low[:-1]
+    covered[first_block] = low[first_block]  # the previous window belongs to another sequence
+    return covered[block], np.maximum.reduceat(score, first_block)
+
+
+def screen_sequences(
+    records: List[FastaRecord],
+    min_length: int,
+    max_n_fraction: float,
+    dust_level: float,
+    max_low_complexity: float,
+) -> Tuple[List[SequenceQc], List[np.ndarray]]:
+    """QC every record; returns the rows and each record's low-complexity mask, in input order."""
+    if not records:
+        return [], []
+    joined = "".join(record.sequence for record in records)
+    residues = np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+    lengths = np.array([len(record.sequence) for record in records], dtype=np.int64)
+    starts = np.r_[0, np.cumsum(lengths)[:-1]]
+    seq_of = np.repeat(np.arange(len(records)), lengths)
+    local = np.arange(len(residues)) - starts[seq_of]
+    codes = BASE_CODES[residues]
+
+    n_count = np.add.reduceat(residues == ord("N"), starts)
+    acgt = np.add.reduceat(codes < 4, starts)
+    gc = np.add.reduceat((codes == 1) | (codes == 2), starts)
+    low, dust = _dust(codes, seq_of, local, lengths, dust_level)
+    low_count = np.add.reduceat(low, starts)
+
+    n_fraction = n_count / lengths
+    low_fraction = low_count / lengths
+    gc_fraction = np.where(acgt > 0, gc / np.maximum(acgt, 1), 0.0)
+    rows = []
+    for index, record in enumerate(records):
+        reasons = []
+        if lengths[index] < min_length:
+            reasons.append(f"shorter than {min_length} bp")
+        if n_fraction[index] > max_n_fraction:
+            reasons.append(f"{100 * n_fraction[index]:.1f}% N")
+        if low_fraction[index] > max_low_complexity:
+            reasons.append(f"{100 * low_fraction[index]:.1f}% low complexity")
+        rows.append(SequenceQc(
+            record.title,
+            int(lengths[index]),
+            round(100 * float(n_fraction[index]), 2),
+            round(100 * float(gc_fraction[index]), 2),
+            round(float(dust[index]), 2),
+            round(100 * float(low_fraction[index]), 2),
+            "; ".join(reasons),
+        ))
+    return rows, np.split(low, starts[1:])
+
+
+def mask_sequence(sequence: str, low: np.ndarray) -> str:
+    """Replace the masked residues with N."""
+    residues = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8).copy()
+    residues[low] = ord("N")
+    return residues.tobytes().decode("ascii")
+
+
+def prescreen(
+    records: List[FastaRecord], unique_records: List[FastaRecord]
+) -> Tuple[List[FastaRecord], List[SequenceQc]]:
+    """Screen a job's records with the CONFIG thresholds.
+
+    Returns the unique records that passed (masked when
+    ``CONFIG['prescreen_mask']`` is set) and a QC row per input record.
+    """
+    rows, masks = screen_sequences(
+        records,
+        CONFIG['prescreen_min_length'],
+        CONFIG['prescreen_max_n'],
+        CONFIG['prescreen_dust_level'],
+        CONFIG['prescreen_max_low_complexity'],
+    )
+    # identical sequences screen identically, so the unique records follow their inputs
+    passed: Dict[str, np.ndarray] = {
+        record.sequence: low for record, row, low in zip(records, rows, masks) if row.passed
+    }
+    kept = [
+        FastaRecord(
+            record.title,
+            mask_sequence(record.sequence, passed[record.sequence])
+            if CONFIG['prescreen_mask'] else record.sequence,
+        )
+        for record in unique_records
+        if record.sequence in passed
+    ]
+    return kept, rows
+
+
+def write_qc_table(rows: List[SequenceQc], folder_path) -> Path:
+    path = Path(folder_path) / QC_FILENAME
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(QC_COLUMNS)
+        for row in rows:
+            writer.writerow([
+                row.title, row.length, row.n_pct, row.gc_pct, row.dust_score,
+                row.low_complexity_pct, "pass" if row.passed else "fail", row.reason,
+            ])
+    return path
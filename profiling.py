@@ -0,0 +1,108 @@
+"""Opt-in cProfile capture for the CPU-bound stages of a BLAST job."""
+import cProfile
+import io
+import marshal
+import pstats
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+PROFILE_FILES = ("profile.prof", "profile_summary.txt", "profile_calltree.txt")
+
+# fraction of total time below which call-tree branches are pruned
+CALLTREE_MIN_FRACTION = 0.005
+CALLTREE_MAX_DEPTH = 15
+
+FuncKey = Tuple[str, int, str]
+
+
+def _label(func: FuncKey) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def profile_call(profile: bool, func: Callable, *args, **kwargs) -> Tuple[Any, Optional[bytes]]:
+    """Call func; returns its result and, if profiling, marshalled pstats data.
+
+    For work on another thread or process, which a job's JobProfiler can't
+    see: merge the data in with ``JobProfiler.add_marshalled``.
+    """
+    if not profile:
+        return func(*args, **kwargs), None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, marshal.dumps(profiler.stats)
+
+
+class _LoadedStats:
+    """Adapter so pstats.Stats.add() accepts stats captured in another process."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class JobProfiler:
+    """Accumulates profile data across the CPU-bound stages of one job.
+
+    Each stage is profiled on the thread or worker process it runs on (see
+    ``profile_call``) and merged in with ``add_marshalled``. Nothing is
+    profiled on the event loop: a profile enabled across an await would
+    pick up other jobs' coroutines.
+    """
+
+    def __init__(self, folder_path):
+        self.folder_path = Path(folder_path)
+        self._extra: List[bytes] = []
+
+    def add_marshalled(self, data: bytes) -> None:
+        self._extra.append(data)
+
+    def _call_tree(self, stats: pstats.Stats) -> List[str]:
+        raw: Dict[FuncKey, tuple] = stats.stats  # type: ignore[attr-defined]
+        callees: Dict[FuncKey, Dict[FuncKey, tuple]] = {}
+        for func, (_, _, _, _, callers) in raw.items():
+            for caller, timing in callers.items():
+                callees.setdefault(caller, {})[func] = timing
+        roots = [func for func, entry in raw.items() if not entry[4]]
+        total = sum(raw[func][3] for func in roots) or 1.0
+
+        lines = [f"Total profiled time: {total:.3f}s", ""]
+
+        def walk(func: FuncKey, cumtime: float, depth: int, seen: Set[FuncKey]) -> None:
+            if cumtime / total < CALLTREE_MIN_FRACTION or depth > CALLTREE_MAX_DEPTH:
+                return
+            lines.append(f"{'  ' * depth}{cumtime / total * 100:5.1f}% {cumtime:8.3f}s  {_label(func)}")
+            if func in seen:
+                return
+            children = sorted(callees.get(func, {}).items(), key=lambda item: item[1][3], reverse=True)
+            for child, timing in children:
+                walk(child, timing[3], depth + 1, seen | {func})
+
+        for root in sorted(roots, key=lambda func: raw[func][3], reverse=True):
+            walk(root, raw[root][3], 0, set())
+        return lines
+
+    def write(self) -> List[Path]:
+        """Dump the raw profile plus text summaries into the job folder."""
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+        prof_path, summary_path, tree_path = (self.folder_path / name for name in PROFILE_FILES)
+        buffer = io.StringIO()
+        stats = pstats.Stats(stream=buffer)
+        for data in self._extra:
+            raw = marshal.loads(data)
+            if raw:
+                stats.add(_LoadedStats(raw))
+        stats.dump_stats(str(prof_path))
+        stats.sort_stats("cumulative").print_stats(60)
+        summary_path.write_text(buffer.getvalue(), encoding="utf-8")
+        tree_path.write_text("\n".join(self._call_tree(stats)) + "\n", encoding="utf-8")
+        return [prof_path, summary_path, tree_path]
@@ -1,5 +1,3 @@
-import os
-import csv
 from pathlib import Path
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
@@ -8,101 +6,17 @@ from reportlab.lib import colors
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-import random
+import heapq
 from collections import defaultdict
 from datetime import datetime
 from CONFIG import *
 import textwrap
 import pandas as pd
 from typing import List, Dict, Any
+# the CSV analysis lives in anomaly so the HTML report can skip ReportLab
+from anomaly import TOP_SCORED, is_anomaly, process_csv_file, row_score
 
 
-def is_anomaly(title, non_anomaly_keywords):
-    """Check if a result is anomalous based on absence of non-anomaly keywords"""
-    if not title:
-        return True  # Empty title is considered anomalous
-    title_lower = title.lower()
-    return not any(keyword.lower() in title_lower for keyword in non_anomaly_keywords)
-
-def extract_species_group(title):
-    """Extract species group from title - improved version"""
-    if not title:
-        return "Unknown"
-    
-    # Try to extract genus and species (first 2 meaningful words)
-    words = title.split()
-    if len(words) >= 2:
-        # Look for the genus (first capitalized word typically)
-        for i, word in enumerate(words):
-            if word and word[0].isupper() and len(word) > 1:
-                # Try to get genus and next word for species
-                if i + 1 < len(words):
-                    # Clean the species name (remove commas, etc.)
-                    species_word = words[i + 1].rstrip(',.;')
-                    return f"{word} {species_word}"
-                return word
-    return title[:50]  # Return first 50 chars if we can't extract properly
-
-def group_anomalies(anomalies):
-    """Group anomalies by species and return grouped data with counts"""
-    grouped = defaultdict(list)
-    
-    for anomaly in anomalies:
-        species_group = extract_species_group(anomaly.get('subject_title', ''))
-        grouped[species_group].append(anomaly)
-    
-    grouped_data = []
-    for species, records in grouped.items():
-        grouped_data.append({
-            'species_group': species,
-            'count': len(records),
-            'sample': records[0] if records else {},
-            'all_records': records
-        })
-    
-    return sorted(grouped_data, key=lambda x: x['count'], reverse=True)
-
-def process_csv_file(csv_path):
-    """Process a single CSV file and return data for PDF"""
-    filename = os.path.basename(csv_path)
-    data = {
-        'filename': filename,
-        'anomalies': [],
-        'grouped_anomalies': [],
-        'normal_samples': [],
-        'total_records': 0,
-        'anomaly_count': 0,
-        'normal_count': 0
-    }
-    
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            all_normal = []
-            
-            for row in reader:
-                data['total_records'] += 1
-                
-                # Use subject_title instead of title for BLAST results
-                title_to_check = row.get('subject_title', '')
-                if is_anomaly(title_to_check, [load_config()[4]]):
-                    data['anomalies'].append(row)
-                    data['anomaly_count'] += 1
-                else:
-                    all_normal.append(row)
-                    data['normal_count'] += 1
-            
-            data['grouped_anomalies'] = group_anomalies(data['anomalies'])
-            
-            # Take random sample of normal results
-            sample_size = min(CONFIG['normal_sample_size'], len(all_normal))
-            data['normal_samples'] = random.sample(all_normal, sample_size) if all_normal else []
-            
-    except Exception as e:
-        print(f"Error processing {csv_path}: {str(e)}")
-    
-    return data
-
 def truncate_text(text, max_length=80):
     """Truncate text to maximum length and add ellipsis if needed"""
     if not text:
@@ -250,8 +164,39 @@ def create_detailed_section(title, records, max_rows=8, max_table_width=7.0*inch
     
     return elements
 
-def create_pdf_report(all_data, folder_path):
+def target_rows(target_counts):
+    """Table rows of (target, total, anomalies, anomaly %) sorted by target."""
+    rows = []
+    for target, (records, anomalies) in sorted(target_counts.items()):
+        pct = (anomalies / records * 100) if records else 0
+        rows.append([truncate_text(target, 40), str(records), str(anomalies), f"{pct:.1f}%"])
+    return rows
+
+def top_scored_rows(all_data, non_anomaly_keywords, limit=TOP_SCORED):
+    """Table rows for the job's highest anomaly scores, best first."""
+    rows = heapq.nlargest(
+        limit,
+        (row for data in all_data for row in data.get('top_scored', [])),
+        key=row_score,
+    )
+    return [
+        [
+            row.get('anomaly_rank', ''),
+            truncate_text(row.get('query_title', ''), 24),
+            truncate_text(row.get('subject_title', ''), 40),
+            row.get('identity_pct', ''),
+            row.get('bit_score', ''),
+            row.get('evalue', ''),
+            row.get('anomaly_score', ''),
+            "yes" if is_anomaly(row.get('subject_title', ''), non_anomaly_keywords) else "no",
+        ]
+        for row in rows
+    ]
+
+
+def create_pdf_report(all_data, folder_path, config=None):
     """Create PDF report from processed data"""
+    config = config or load_config()
     folder_path = Path(folder_path)
     doc = SimpleDocTemplate(str(folder_path / "anomaly_output.pdf"), pagesize=A4)
     styles = getSampleStyleSheet()
@@ -276,7 +221,7 @@ def create_pdf_report(all_data, folder_path):
     )
     
     # Title and metadata
-    story.append(Paragraph(load_config()[5]+" BLAST Anomaly Report", title_style))
+    story.append(Paragraph(config[5]+" BLAST Anomaly Report", title_style))
     story.append(Paragraph(
         f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 
         styles['Normal']
@@ -302,12 +247,45 @@ def create_pdf_report(all_data, folder_path):
     story.append(Paragraph("Overall Statistics", section_style))
     story.append(stats_table)
     story.append(Spacer(1, 25))
+
+    # Per-target view for jobs searched against several program/database pairs
+    target_totals = defaultdict(lambda: [0, 0])
+    for data in all_data:
+        for target, (records, anomalies) in data.get('target_counts', {}).items():
+            target_totals[target][0] += records
+            target_totals[target][1] += anomalies
+    if target_totals:
+        story.append(Paragraph("Per-Target Statistics", section_style))
+        story.append(create_styled_table(
+            ["Target", "Total", "Anomalies", "Anomaly %"],
+            target_rows(target_totals),
+            'summary'
+        ))
+        story.append(Spacer(1, 25))
+
+    # Statistical ranking: hits that stand out from the rest of their query
+    scored = top_scored_rows(all_data, [config[4]])
+    if scored:
+        story.append(Paragraph("Highest Anomaly Scores", section_style))
+        story.append(Paragraph(
+            "Hits ranked by how far their identity, bit score and e-value fall below the rest "
+            "of their query, their gap to the best hit, how rare their taxon is among the "
+            "query's hits, and whether the title misses the non-anomaly keyword.",
+            styles['Normal']
+        ))
+        story.append(Spacer(1, 8))
+        story.append(create_styled_table(
+            ["Rank", "Query", "Subject", "Identity %", "Bit Score", "E-value", "Score", "Keyword Miss"],
+            scored,
+            'anomaly'
+        ))
+        story.append(Spacer(1, 25))
     
     # Configuration info in a more compact format
     folder_label = folder_path.name or folder_path.as_posix()
     config_text = f"""
     <b>Analysis Configuration:</b><br/>
-    Non-anomaly keywords: {', '.join([load_config()[4]])}<br/>
+    Non-anomaly keywords: {', '.join([config[4]])}<br/>
     Normal sample size: {CONFIG['normal_sample_size']}<br/>
     BatchBLAST ID: {folder_label}
     """
@@ -357,6 +335,15 @@ def create_pdf_report(all_data, folder_path):
         file_stats_table = create_styled_table(["Metric", "Value"], file_stats, 'summary')
         story.append(file_stats_table)
         story.append(Spacer(1, 20))
+
+        if data.get('target_counts'):
+            story.append(Paragraph("Per-Target Breakdown", styles['Heading3']))
+            story.append(create_styled_table(
+                ["Target", "Total", "Anomalies", "Anomaly %"],
+                target_rows(data['target_counts']),
+                'summary'
+            ))
+            story.append(Spacer(1, 20))
         
         # Anomalies section
         if data['grouped_anomalies']:
@@ -452,7 +439,8 @@ def analyze_anomaly_patterns(all_data):
     
     return dict(anomaly_species)
 
-def generate_report(folder_path):
+def generate_report(folder_path, config=None):
+    config = config or load_config()
     results_folder = Path(folder_path)
     if not results_folder.exists():
         return 1
@@ -463,16 +451,18 @@ def generate_report(folder_path):
         return 1
 
     all_data = []
+    non_anomaly_keywords = [config[4]]
 
     for csv_file in csv_files:
-        data = process_csv_file(str(csv_file))
+        data = process_csv_file(str(csv_file), non_anomaly_keywords)
         all_data.append(data)
 
-    create_pdf_report(all_data, results_folder)
+    create_pdf_report(all_data, results_folder, config)
 
 class BLASTReportGenerator:
-    def __init__(self, output_filename: str = "BLAST_Report.pdf"):
+    def __init__(self, output_filename: str = "BLAST_Report.pdf", config=None):
         self.output_filename = output_filename
+        self.config = config or load_config()
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
         
@@ -522,7 +512,8 @@ class BLASTReportGenerator:
                     'sci_name',        # <-- include species name
                     'identity_pct',
                     'bit_score',
-                    'evalue'
+                    'evalue',
+                    'target'           # <-- only present for multi-target jobs
                 ]
                 available_columns = [col for col in required_columns if col in df.columns]
                 
@@ -542,8 +533,19 @@ class BLASTReportGenerator:
         all_files_data = []
         all_species = []
         all_queries = []
+        target_totals: Dict[str, Dict[str, Any]] = {}
     
         for filename, df in dataframes.items():
+            if 'target' in df.columns:
+                for target, group in df.groupby('target'):
+                    totals = target_totals.setdefault(
+                        target, {'hits': 0, 'identity_sum': 0.0, 'taxids': set()}
+                    )
+                    totals['hits'] += len(group)
+                    if 'identity_pct' in group.columns:
+                        totals['identity_sum'] += group['identity_pct'].sum()
+                    if 'taxid' in group.columns:
+                        totals['taxids'].update(group['taxid'].dropna().tolist())
             # Accumulate global lists for cross-file aggregation
             if 'sci_name' in df.columns:
                 all_species.extend(df['sci_name'].dropna().tolist())
@@ -565,7 +567,16 @@ class BLASTReportGenerator:
             'unique_files': len(dataframes),
             'file_stats': all_files_data,
             'all_species': all_species,
-            'all_queries': all_queries
+            'all_queries': all_queries,
+            'target_stats': [
+                {
+                    'target': target,
+                    'hits': totals['hits'],
+                    'avg_identity': totals['identity_sum'] / totals['hits'] if totals['hits'] else 0,
+                    'unique_taxids': len(totals['taxids']),
+                }
+                for target, totals in sorted(target_totals.items())
+            ]
         }
 
 
@@ -580,7 +591,7 @@ class BLASTReportGenerator:
         """Create the summary section of the report dynamically using real data."""
         elements = []
     
-        elements.append(Paragraph(load_config()[5]+" BLAST Full Report", self.styles['CustomTitle']))
+        elements.append(Paragraph(self.config[5]+" BLAST Full Report", self.styles['CustomTitle']))
         elements.append(Spacer(1, 0.3 * inch))
     
         elements.append(Paragraph("<b>Summary Statistics</b>", self.styles['CustomHeading']))
@@ -626,6 +637,26 @@ class BLASTReportGenerator:
         ]))
         elements.append(summary_table)
         elements.append(Spacer(1, 0.3 * inch))
+
+        # === Per-Target Summary (multi-target jobs) ===
+        if stats.get('target_stats'):
+            elements.append(Paragraph("<b>Per-Target Summary</b>", self.styles['CustomHeading']))
+            target_data = [["Target", "Hits", "Avg Identity %", "Unique TaxIDs"]] + [
+                [t['target'], f"{t['hits']:,}", f"{t['avg_identity']:.2f}", str(t['unique_taxids'])]
+                for t in stats['target_stats']
+            ]
+            target_table = Table(target_data, colWidths=[2.4 * inch, 1 * inch, 1.2 * inch, 1.2 * inch])
+            target_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#DCE6F1")),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('BOX', (0, 0), (-1, -1), 1, colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ]))
+            elements.append(target_table)
+            elements.append(Spacer(1, 0.3 * inch))
     
         # === Source Files ===
         elements.append(Paragraph("<b>Source Files</b>", self.styles['CustomHeading']))
@@ -688,49 +719,15 @@ class BLASTReportGenerator:
             # Add section header for this file
             elements.append(Paragraph(f"Sequence: {filename}", self.styles['CustomHeading']))
             elements.append(Spacer(1, 0.1*inch))
-            
-            # Prepare table data with wrapped text
-            table_data = [["Subject Title", "TaxID", "Identity %", "Bit Score", "E-value"]]
-            
-            for _, row in df.iterrows():
-                wrapped_subject = self.wrap_text(row['subject_title'], 40) if 'subject_title' in row else "N/A"
-                taxid = str(row['taxid']) if 'taxid' in row else "N/A"
-                identity = f"{row['identity_pct']:.1f}" if 'identity_pct' in row else "N/A"
-                bit_score = f"{row['bit_score']:.4f}" if 'bit_score' in row else "N/A"
-                evalue = f"{row['evalue']:.6f}" if 'evalue' in row else "N/A"
-                
-                table_data.append([wrapped_subject, taxid, identity, bit_score, evalue])
-            
-            # Create table with optimized column widths
-            table = Table(
-                table_data, 
-                colWidths=[3.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch],
-                repeatRows=1  # Repeat header on each page
-            )
-            
-            # Apply table styling
-            table.setStyle(TableStyle([
-                # Header style
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                
-                # Data row styles
-                ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-                
-                # Specific column alignments
-                ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # TaxID centered
-                ('ALIGN', (2, 1), (3, -1), 'CENTER'),  # Numeric columns centered
-            ]))
-            
-            elements.append(table)
+
+            if 'target' in df.columns and df['target'].nunique() > 1:
+                # one table per program/database target
+                for target, group in df.groupby('target', sort=True):
+                    elements.append(Paragraph(f"<b>Target: {target}</b>", self.styles['CustomBody']))
+                    elements.append(self._hits_table(group))
+                    elements.append(Spacer(1, 0.15*inch))
+            else:
+                elements.append(self._hits_table(df))
             elements.append(Paragraph(f"Total records in {filename}: {len(df):,}", self.styles['CustomBody']))
             elements.append(Spacer(1, 0.3*inch))
             
@@ -740,6 +737,49 @@ class BLASTReportGenerator:
         
         return elements
 
+    def _hits_table(self, df: pd.DataFrame) -> Table:
+        # Prepare table data with wrapped text
+        table_data = [["Subject Title", "TaxID", "Identity %", "Bit Score", "E-value"]]
+        
+        for _, row in df.iterrows():
+            wrapped_subject = self.wrap_text(row['subject_title'], 40) if 'subject_title' in row else "N/A"
+            taxid = str(row['taxid']) if 'taxid' in row else "N/A"
+            identity = f"{row['identity_pct']:.1f}" if 'identity_pct' in row else "N/A"
+            bit_score = f"{row['bit_score']:.4f}" if 'bit_score' in row else "N/A"
+            evalue = f"{row['evalue']:.6f}" if 'evalue' in row else "N/A"
+            
+            table_data.append([wrapped_subject, taxid, identity, bit_score, evalue])
+        
+        # Create table with optimized column widths
+        table = Table(
+            table_data, 
+            colWidths=[3.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch],
+            repeatRows=1  # Repeat header on each page
+        )
+        
+        # Apply table styling
+        table.setStyle(TableStyle([
+            # Header style
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            
+            # Data row styles
+            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+            
+            # Specific column alignments
+            ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # TaxID centered
+            ('ALIGN', (2, 1), (3, -1), 'CENTER'),  # Numeric columns centered
+        ]))
+        return table
+
     def generate_report(self, folder_path: Path) -> str:
         try:
             # Read and process data
@@ -777,11 +817,11 @@ class BLASTReportGenerator:
         except Exception as e:
             raise
 
-def generate_blast_full_report(folder_path: Path, output_filename: str = "BLAST_Full_Report.pdf") -> str:
+def generate_blast_full_report(folder_path: Path, output_filename: str = "BLAST_Full_Report.pdf", config=None) -> str:
     folder = Path(folder_path)
     if not folder.exists():
         raise ValueError(f"Folder path does not exist: {folder_path}")
 
-    generator = BLASTReportGenerator(output_filename)
+    generator = BLASTReportGenerator(output_filename, config)
     return generator.generate_report(folder)
 
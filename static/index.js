@@ -2,15 +2,19 @@ const host = window.location.host;
 const wsProtocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
 const wsUrl = `${wsProtocol}://${host}`;
 const WS_RECONNECT_DELAY = 2000;
+// files above this size are streamed to /upload instead of parsed in the tab
+const LARGE_UPLOAD_BYTES = 2 * 1024 * 1024;
 let ws = null;
 let reconnectTimer = null;
 let connectTimeout = null;
 const STORAGE_KEYS = {
     jobId: 'blastJobId',
+    cancelToken: 'blastCancelToken',
     jobStatus: 'blastJobStatus',
     jobStart: 'blastJobStart',
     folderId: 'blid',
-    preview: 'blastJobPreview'
+    preview: 'blastJobPreview',
+    reportFormat: 'blastReportFormat'
 };
 
 let activeJobId = localStorage.getItem(STORAGE_KEYS.jobId) || null;
@@ -105,6 +109,7 @@ function restorePreviewFromStorage() {
 function clearJobTracking(preserveFolder = true) {
     activeJobId = null;
     localStorage.removeItem(STORAGE_KEYS.jobId);
+    localStorage.removeItem(STORAGE_KEYS.cancelToken);
     setJobStatus(null);
     setJobStartTimestamp(null);
     if (!preserveFolder) {
@@ -269,16 +274,25 @@ const loadingTitle = document.getElementById('loadingTitle');
 const loadingDescription = document.getElementById('loadingDescription');
 const loadingTime = document.getElementById('loadingTime');
 const showLoadingBtn = document.getElementById('showLoading');
+const cancelJobBtn = document.getElementById('cancelJob');
+const liveResults = document.getElementById('liveResults');
+const liveResultsList = document.getElementById('liveResultsList');
+const liveResultsCount = document.getElementById('liveResultsCount');
+// rows kept in the live list; the count still covers every query
+const LIVE_RESULTS_LIMIT = 200;
 
 // Download buttons
 const downloadFastaBtn = document.getElementById('downloadFasta');
 const downloadFullBtn = document.getElementById('downloadFull');
 const downloadAnomalyBtn = document.getElementById('downloadAnomaly');
 const downloadCSVBtn = document.getElementById('downloadCSV');
+const openHtmlReportBtn = document.getElementById('openHtmlReport');
+const reportFormatSelect = document.getElementById('reportFormatSelect');
 const configAlert = document.getElementById('configAlert');
 let configAlertTimeout = null;
 
 let entries = [];
+let pendingUpload = null;
 let loadingStartTime = null;
 let timerInterval = null;
 let currentResults = restorePreviewFromStorage();
@@ -318,6 +332,7 @@ function removeEntry(index) {
 
 function clearAll() {
     entries = [];
+    pendingUpload = null;
     renderEntries();
     previewDiv.innerHTML = "";
     downloadSection.style.display = 'none';
@@ -404,16 +419,72 @@ function downloadFull() {
     window.location.href = `/download?${queryString}`;
 }
 
+function openHtmlReport() {
+    const fid = localStorage.getItem(STORAGE_KEYS.folderId);
+    const queryString = new URLSearchParams({folderid: fid}).toString();
+    window.open(`/report?${queryString}`, '_blank');
+}
+
+function selectedReportFormat() {
+    const format = reportFormatSelect ? reportFormatSelect.value : 'pdf';
+    localStorage.setItem(STORAGE_KEYS.reportFormat, format);
+    return format;
+}
+
 function downloadCSV() {
     const fid = localStorage.getItem(STORAGE_KEYS.folderId);
     const queryString = new URLSearchParams({type: 1, folderid: fid}).toString();
     window.location.href = `/download?${queryString}`;
 }
 
+function showSequenceCount(message) {
+    let sequenceCount = uploadArea.querySelector('.sequence-count');
+    if (!sequenceCount) {
+        sequenceCount = document.createElement('div');
+        sequenceCount.className = 'sequence-count';
+        uploadArea.appendChild(sequenceCount);
+    }
+    sequenceCount.textContent = message;
+}
+
+// Stream a large file to the server; the job is later started by upload id
+function uploadLargeFile(file) {
+    pendingUpload = null;
+    showSequenceCount(`Uploading ${file.name}...`);
+    fetch('/upload', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/octet-stream' },
+        body: file
+    })
+        .then(response => response.json().then(data => ({ ok: response.ok, data })))
+        .then(({ ok, data }) => {
+            if (!ok) {
+                throw new Error(data?.detail || 'Upload failed');
+            }
+            pendingUpload = { ...data, name: file.name };
+            entries = [];
+            renderEntries();
+            showSequenceCount(
+                `Uploaded ${data.records} DNA sequence(s) from ${file.name}, ready to submit`
+            );
+        })
+        .catch(error => {
+            console.error('Upload error:', error);
+            showSequenceCount('');
+            alert(`Unable to upload ${file.name}: ${error.message}`);
+        });
+}
+
 // Handle file upload
 function handleFileUpload(file) {
     if (!file) return;
 
+    if (file.size > LARGE_UPLOAD_BYTES) {
+        uploadLargeFile(file);
+        return;
+    }
+    pendingUpload = null;
+
     const reader = new FileReader();
     reader.onload = (e) => {
         const content = e.target.result;
@@ -456,13 +527,7 @@ function parseFastaContent(content) {
     renderEntries();
     
     // Show success message
-    let sequenceCount = uploadArea.querySelector('.sequence-count');
-    if (!sequenceCount) {
-        sequenceCount = document.createElement('div');
-        sequenceCount.className = 'sequence-count';
-        uploadArea.appendChild(sequenceCount);
-    }
-    sequenceCount.textContent = `Loaded ${entries.length} DNA sequence(s) from the file`;
+    showSequenceCount(`Loaded ${entries.length} DNA sequence(s) from the file`);
 }
 
 // Event listeners for file upload
@@ -497,6 +562,10 @@ downloadFastaBtn.addEventListener('click', downloadFasta);
 downloadFullBtn.addEventListener('click', downloadFull);
 downloadAnomalyBtn.addEventListener('click', downloadAnomaly);
 downloadCSVBtn.addEventListener('click', downloadCSV);
+openHtmlReportBtn.addEventListener('click', openHtmlReport);
+if (reportFormatSelect) {
+    reportFormatSelect.value = localStorage.getItem(STORAGE_KEYS.reportFormat) || 'pdf';
+}
 
 // Other event listeners
 document.getElementById('addEntry').addEventListener('click', () => addEntry());
@@ -568,6 +637,36 @@ function applyStatusPayload(payload) {
     }
 }
 
+function resetLiveResults() {
+    liveResultsList.replaceChildren();
+    liveResultsCount.textContent = '0';
+    liveResults.hidden = true;
+}
+
+function handleQueryResult(result) {
+    if (!result) return;
+    const item = document.createElement('div');
+    item.className = 'live-result';
+    const title = document.createElement('strong');
+    title.textContent = result.target ? `${result.query} (${result.target})` : result.query;
+    const details = document.createElement('span');
+    const parts = [`${result.hits} hits`];
+    if (result.topSpecies) parts.push(`top ${result.topSpecies} (${result.topSpeciesHits})`);
+    if (result.bestIdentity !== null && result.bestIdentity !== undefined) {
+        parts.push(`best ${result.bestIdentity}% identity`);
+    }
+    parts.push(`${result.anomalies} anomalies`);
+    details.textContent = parts.join(' · ');
+    item.classList.toggle('has-anomalies', result.anomalies > 0);
+    item.append(title, details);
+    liveResultsList.prepend(item);
+    while (liveResultsList.childElementCount > LIVE_RESULTS_LIMIT) {
+        liveResultsList.lastElementChild.remove();
+    }
+    liveResultsCount.textContent = String(Number(liveResultsCount.textContent) + 1);
+    liveResults.hidden = false;
+}
+
 function updatePreviewUI(entries = currentResults) {
     if (!entries || !entries.length) {
         previewDiv.innerHTML = '<p class="text-muted">No sequences queued.</p>';
@@ -591,8 +690,17 @@ function showDownloadSectionForFolder(folderId, scrollIntoView = false) {
     const baseUrl = window.location.origin;
     const fullQuery = new URLSearchParams({ type: 2, folderid: folderId }).toString();
     const anomalyQuery = new URLSearchParams({ type: 3, folderid: folderId }).toString();
-
-    updatePDFs(`${baseUrl}/preview?${fullQuery}`, `${baseUrl}/preview?${anomalyQuery}`);
+    const htmlOnly = localStorage.getItem(STORAGE_KEYS.reportFormat) === 'html';
+
+    // HTML-only jobs preview the streamed report; their PDFs render on first download
+    document.getElementById('pdf1Title').textContent = htmlOnly ? 'HTML Report' : 'Full Report';
+    document.getElementById('pdf2Wrapper').style.display = htmlOnly ? 'none' : '';
+    if (htmlOnly) {
+        const reportQuery = new URLSearchParams({ folderid: folderId }).toString();
+        updatePDFs(`${baseUrl}/report?${reportQuery}`, 'about:blank');
+    } else {
+        updatePDFs(`${baseUrl}/preview?${fullQuery}`, `${baseUrl}/preview?${anomalyQuery}`);
+    }
     if (scrollIntoView) {
         downloadSection.scrollIntoView({ behavior: 'smooth' });
     }
@@ -602,6 +710,7 @@ function handleJobCompletion(payload) {
     setJobStatus('completed');
     setJobStartTimestamp(null);
     localStorage.removeItem(STORAGE_KEYS.jobId);
+    localStorage.removeItem(STORAGE_KEYS.cancelToken);
     resetLoadingIcon();
     hideLoading();
 
@@ -629,6 +738,59 @@ function handleJobError(payload) {
     updatePreviewUI([]);
 }
 
+function handlePrescreen(payload) {
+    const rejected = (payload && payload.rejected) || [];
+    if (!rejected.length) {
+        return;
+    }
+    const shown = rejected.slice(0, 5).map(({ query, reason }) => `${query} (${reason})`);
+    if (rejected.length > shown.length) {
+        shown.push(`${rejected.length - shown.length} more`);
+    }
+    showConfigAlert(
+        'warning',
+        `${rejected.length} of ${payload.screened} sequences failed the pre-screen and are not searched: ` +
+        `${shown.join(', ')}. See qc.tsv in the CSV download.`
+    );
+}
+
+function handleJobCancelled(payload) {
+    clearJobTracking(false);
+    resetLoadingIcon();
+    hideLoading();
+    const [title] = Array.isArray(payload) ? payload : ['Job cancelled'];
+    showConfigAlert('warning', title);
+    persistPreview([]);
+    currentResults = [];
+    downloadSection.style.display = 'none';
+    updatePreviewUI([]);
+}
+
+function requestJobCancel() {
+    if (!activeJobId) {
+        hideLoading();
+        return;
+    }
+    if (!confirm('Cancel this BLAST job? Results so far will be discarded.')) {
+        return;
+    }
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        alert("Reconnecting to the server. Please try again in a moment.");
+        connectWebSocket(true);
+        return;
+    }
+    cancelJobBtn.disabled = true;
+    loadingTitle.textContent = 'Cancelling job';
+    loadingDescription.textContent = 'Stopping the BLAST search and report generation...';
+    ws.send(JSON.stringify({
+        action: 'cancel',
+        jobId: activeJobId,
+        cancelToken: localStorage.getItem(STORAGE_KEYS.cancelToken)
+    }));
+}
+
+cancelJobBtn.addEventListener('click', requestJobCancel);
+
 function restoreUIFromStorage() {
     if (currentResults.length) {
         updatePreviewUI(currentResults);
@@ -677,6 +839,10 @@ function handleWebSocketMessage(event) {
     switch (type) {
         case 'job_ack': {
             const now = Date.now();
+            if (data.cancelToken) {
+                localStorage.setItem(STORAGE_KEYS.cancelToken, data.cancelToken);
+            }
+            cancelJobBtn.disabled = false;
             setJobStatus('running');
             setJobStartTimestamp(now);
             ensureLoadingActive(now);
@@ -697,6 +863,14 @@ function handleWebSocketMessage(event) {
             applyStatusPayload(payload);
             break;
         }
+        case 'query_result': {
+            handleQueryResult(payload);
+            break;
+        }
+        case 'prescreen': {
+            handlePrescreen(payload);
+            break;
+        }
         case 'folder': {
             if (payload && payload.folderId) {
                 persistFolderId(payload.folderId);
@@ -708,9 +882,22 @@ function handleWebSocketMessage(event) {
             break;
         }
         case 'error': {
+            cancelJobBtn.disabled = false;
             handleJobError(payload);
             break;
         }
+        case 'cancelled': {
+            cancelJobBtn.disabled = false;
+            handleJobCancelled(payload);
+            break;
+        }
+        case 'cancel_ack': {
+            // others share this job and it keeps running for them; stop following it here
+            if (data.status === 'detached') {
+                handleJobCancelled(['Job cancelled']);
+            }
+            break;
+        }
         default: {
             console.warn('Unhandled WebSocket event', data);
             break;
@@ -720,7 +907,46 @@ function handleWebSocketMessage(event) {
 
 connectWebSocket();
 
+function startUploadedJob() {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        alert("Reconnecting to the server. Please try again in a moment.");
+        connectWebSocket(true);
+        return;
+    }
+
+    currentResults = [{
+        title: pendingUpload.name,
+        sequence: `${pendingUpload.records} sequences, ${pendingUpload.residues} bp (uploaded)`
+    }];
+    persistPreview(currentResults);
+    updatePreviewUI(currentResults);
+    clearJobTracking(true);
+    resetLiveResults();
+    downloadSection.style.display = 'none';
+    resetLoadingIcon();
+    showLoading();
+    loadingTitle.textContent = "Submitting DNA Sequences";
+    loadingDescription.textContent = "Performing BLAST analysis and report generation...";
+
+    try {
+        ws.send(JSON.stringify({
+            action: 'start',
+            uploadId: pendingUpload.uploadId,
+            reportFormat: selectedReportFormat()
+        }));
+    } catch (sendError) {
+        console.error('Failed to send BLAST request:', sendError);
+        alert('Unable to start BLAST job. Please retry.');
+        hideLoading();
+    }
+}
+
 document.getElementById('submitAll').addEventListener('click', () => {
+    if (pendingUpload && entries.length === 0) {
+        startUploadedJob();
+        return;
+    }
+
     let allTitlesFilled = true;
     const submissionResults = [];
 
@@ -755,6 +981,7 @@ document.getElementById('submitAll').addEventListener('click', () => {
     persistPreview(currentResults);
     updatePreviewUI(currentResults);
     clearJobTracking(true);
+    resetLiveResults();
     downloadSection.style.display = 'none';
     resetLoadingIcon();
     showLoading();
@@ -763,7 +990,8 @@ document.getElementById('submitAll').addEventListener('click', () => {
 
     const startPayload = {
         action: 'start',
-        fasta: fastaData
+        fasta: fastaData,
+        reportFormat: selectedReportFormat()
     };
 
     try {
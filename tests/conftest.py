@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+import pytest
+
+# CONFIG reads these at import time, so point them somewhere disposable first
+_ROOT = tempfile.mkdtemp(prefix="batchblast-tests-")
+os.environ.setdefault("BATCHBLAST_RESULTS_DIR", os.path.join(_ROOT, "results"))
+os.environ.setdefault("BATCHBLAST_UPLOADS_DIR", os.path.join(_ROOT, "uploads"))
+
+
+@pytest.fixture
+def ncbi(monkeypatch):
+    """Point blast at the mock NCBI app in-process, with searches that finish at once."""
+    import httpx
+
+    import blast
+    from benchmarks import mock_ncbi
+    from CONFIG import CONFIG
+
+    client = httpx.AsyncClient
+
+    def mock_client(**kwargs):
+        return client(transport=httpx.ASGITransport(app=mock_ncbi.app), **kwargs)
+
+    monkeypatch.setattr(blast.httpx, "AsyncClient", mock_client)
+    monkeypatch.setattr(blast, "BASE_URL", "http://ncbi.test/Blast.cgi")
+    monkeypatch.setitem(mock_ncbi.SETTINGS, "latency", 0)
+    monkeypatch.setitem(mock_ncbi.SETTINGS, "hits", 8)
+    monkeypatch.setitem(CONFIG, "poll_interval", 0.01)
+    monkeypatch.setattr(blast.SUBMIT_LIMITER, "min_interval", 0)
+    # the tests' short repeat queries would all fail the low-complexity screen
+    monkeypatch.setitem(CONFIG, "prescreen", False)
+    return mock_ncbi.stats
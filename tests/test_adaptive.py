@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import io
+import json
+import random
+import zipfile
+from pathlib import Path
+
+import blast
+from benchmarks import mock_ncbi
+from CONFIG import CONFIG, load_config
+
+QUERIES = ">q1 first\n" + "ACGTTGCA" * 20 + "\n>q2 second\n" + "GGCATTAC" * 20 + "\n"
+
+
+def archive(searches, prefix=""):
+    """A JSON2 archive of {query_title: [(subject_title, bit_score)]}."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        files = []
+        for number, (title, hits) in enumerate(searches.items(), start=1):
+            search = {
+                "query_id": f"Query_{number}",
+                "query_title": f"{prefix}{title}",
+                "query_len": 100,
+                "hits": [
+                    {"num": n, "description": [{"title": subject, "accession": f"A{n}", "sciname": subject}],
+                     "hsps": [{"num": 1, "bit_score": score, "identity": 90, "align_len": 100}]}
+                    for n, (subject, score) in enumerate(hits, start=1)
+                ],
+            }
+            files.append(f"R_{number}.json")
+            zf.writestr(files[-1], json.dumps({"BlastOutput2": {"report": {"results": {"search": search}}}}))
+        zf.writestr("R.json", json.dumps({"BlastJSON": [{"File": name} for name in files]}))
+    return buffer.getvalue()
+
+
+SEARCHES = {
+    "short": [("Sus scrofa a", 200), ("Bos taurus b", 50)],
+    "mixed": [("Sus scrofa a", 200), ("Sus scrofa b", 100), ("Bos taurus c", 50)],
+    "settled": [("Sus scrofa a", 200), ("Sus scrofa b", 150), ("Sus scrofa c", 50)],
+    "flat": [("Sus scrofa a", 200), ("Sus scrofa b", 195), ("Sus scrofa c", 190)],
+    "contested": [("Sus scrofa a", 200), ("Bos taurus b", 190), ("Sus scrofa c", 50)],
+}
+
+
+def test_undecided_queries():
+    content = archive(SEARCHES, prefix="bb1__")
+    # a list shorter than asked for is complete; a full one is settled unless its top hits disagree
+    assert blast.undecided_queries(content, "bb1__", 3, ["sus scrofa"]) == {"contested"}
+
+
+def test_anomalies_in_the_tail_do_not_requery_a_realistic_batch():
+    rng = random.Random(0)
+    others = ["Bos taurus", "Ovis aries", "Capra hircus", "Homo sapiens", "Gallus gallus"]
+    searches = {}
+    for number in range(40):
+        # pork samples: a clear run of pig hits, then weaker hits across other species
+        hits = [(f"Sus scrofa isolate {n}", 520 - 3 * n) for n in range(rng.randint(4, 12))]
+        hits += [(f"{rng.choice(others + ['Sus scrofa'])} isolate", rng.uniform(150, 400))
+                 for _ in range(50 - len(hits))]
+        searches[f"sample{number}"] = sorted(hits, key=lambda hit: -hit[1])
+    # and a few where another species matches about as well as pig does
+    for number in range(3):
+        searches[f"mixed{number}"] = [("Sus scrofa isolate", 520), ("Bos taurus isolate", 515)] + [
+            ("Sus scrofa isolate", 300)
+        ] * 48
+    content = archive(searches, prefix="bb1__")
+    assert all(any(not title.startswith("Sus") for title, _ in hits) for hits in searches.values())
+    undecided = blast.undecided_queries(content, "bb1__", 50, ["sus scrofa"])
+    assert undecided == {"mixed0", "mixed1", "mixed2"}
+
+
+def test_merge_takes_requeried_searches_from_the_second_phase(tmp_path):
+    first = archive(SEARCHES, prefix="bb1__")
+    second = archive({"flat": [("Sus scrofa z", 300)] * 5, "mixed": [("Sus scrofa y", 300)]}, prefix="bb2__")
+    merged = blast.merge_phase_archives(first, "bb1__", second, "bb2__", {"flat"})
+    written = blast.parse_archives([(None, merged, None)], str(tmp_path), ["sus scrofa"])
+    assert sorted(written) == sorted(SEARCHES)
+    counts = {}
+    for title, path in written.items():
+        with open(path, newline="", encoding="utf-8") as f:
+            counts[title] = len(list(csv.DictReader(f)))
+    assert counts == {"short": 2, "mixed": 3, "settled": 3, "flat": 5, "contested": 3}
+
+
+def test_adaptive_hitlist_size(monkeypatch):
+    monkeypatch.setitem(CONFIG, "adaptive_initial_hits", 50)
+    config = ("F", "500", "blastn", "nt", "", "")
+    assert blast.adaptive_hitlist_size(config, True) == 50
+    assert blast.adaptive_hitlist_size(config, False) is None
+    assert blast.adaptive_hitlist_size(("F", "50", "blastn", "nt", "", ""), True) is None
+    assert blast.adaptive_hitlist_size(("F", "lots", "blastn", "nt", "", ""), True) is None
+
+
+def test_adaptive_job_reruns_undecided_queries(ncbi, monkeypatch):
+    monkeypatch.setitem(CONFIG, "adaptive_initial_hits", 4)
+    # every hit counts as top-scoring, and pig and cattle hits alternate
+    monkeypatch.setitem(CONFIG, "adaptive_tail_ratio", 0)
+    make_hit = mock_ncbi.make_hit
+
+    def alternating_hit(rng, num, *args):
+        hit = make_hit(rng, num, *args)
+        species = "Sus scrofa" if num % 2 else "Bos taurus"
+        hit["description"][0]["title"] = f"{species} {hit['description'][0]['title']}"
+        return hit
+
+    monkeypatch.setattr(mock_ncbi, "make_hit", alternating_hit)
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    puts = ncbi["put"]
+    config = load_config()
+    config = (config[0], "8", config[2], config[3], "sus scrofa", config[5])
+    asyncio.run(blast.run_blast_job(QUERIES, notifier, config=config, adaptive=True, report_format="html"))
+
+    assert events[-1][0] == "complete", events
+    # one short search, then both queries again together with the full list
+    assert ncbi["put"] == puts + 2
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    for title in ("q1 first", "q2 second"):
+        with (folder / f"{blast.safe_filename(title)}.csv").open(newline="", encoding="utf-8") as f:
+            assert len(list(csv.DictReader(f))) == 8
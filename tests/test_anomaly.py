@@ -0,0 +1,64 @@
+import csv
+import random
+
+from anomaly import TOP_SCORED, AnomalyAggregator, extract_species_group, is_anomaly, process_csv_file
+
+
+def test_is_anomaly():
+    assert not is_anomaly("Sus scrofa isolate 12", ["sus scrofa"])
+    assert is_anomaly("Bos taurus clone 3", ["sus scrofa"])
+    assert is_anomaly("", ["sus scrofa"])
+
+
+def test_extract_species_group():
+    assert extract_species_group("Bos taurus, clone 3") == "Bos taurus"
+    assert extract_species_group("") == "Unknown"
+
+
+def test_process_csv_file_groups_anomalies_and_keeps_top_scores(tmp_path):
+    path = tmp_path / "q1.csv"
+    titles = ["Sus scrofa a", "Bos taurus b", "Bos taurus c", "Gallus gallus d"]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["subject_title", "anomaly_score"])
+        for score, title in enumerate(titles):
+            writer.writerow([title, score])
+    data = process_csv_file(str(path), ["sus scrofa"])
+    assert (data["total_records"], data["anomaly_count"], data["normal_count"]) == (4, 3, 1)
+    assert [(g["species_group"], g["count"]) for g in data["grouped_anomalies"]] == [
+        ("Bos taurus", 2), ("Gallus gallus", 1),
+    ]
+    assert [row["subject_title"] for row in data["top_scored"]][0] == "Gallus gallus d"
+
+
+def test_aggregator_keeps_a_bounded_sample_of_normal_rows():
+    aggregator = AnomalyAggregator(["sus scrofa"], 10, rng=random.Random(0))
+    for i in range(1000):
+        aggregator.add({"subject_title": f"Sus scrofa {i}", "anomaly_score": str(i % 97)})
+    assert (aggregator.total_records, aggregator.normal_count) == (1000, 1000)
+    assert len(aggregator.normal_samples) == 10
+    # a reservoir, not the first rows
+    assert max(int(row["subject_title"].split()[-1]) for row in aggregator.normal_samples) >= 100
+    assert len(aggregator.top_scored) == TOP_SCORED
+    # scores 96, 95 and 94 each occur ten times
+    assert min(score for score, _, _ in aggregator.top_scored) == 94
+
+
+def test_aggregator_counts_groups_and_targets():
+    aggregator = AnomalyAggregator(["sus scrofa"], 5)
+    rows = [
+        {"subject_title": "Bos taurus a", "target": "blastn/nt"},
+        {"subject_title": "Bos taurus b", "target": "blastn/nt"},
+        {"subject_title": "Sus scrofa c", "target": "blastn/refseq_rna"},
+        {"subject_title": "Gallus gallus d", "target": "blastn/refseq_rna"},
+    ]
+    for row in rows:
+        aggregator.add(row)
+    assert aggregator.targets == {"blastn/nt": [2, 2], "blastn/refseq_rna": [2, 1]}
+    grouped = aggregator.grouped_anomalies()
+    # each group keeps its first row as the example
+    assert [(g["species_group"], g["count"], g["sample"]) for g in grouped] == [
+        ("Bos taurus", 2, rows[0]), ("Gallus gallus", 1, rows[3]),
+    ]
+    # rows without a score (older files) never reach the ranked table
+    assert aggregator.top_scored == []
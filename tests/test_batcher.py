@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from batcher import SubmissionBatcher
+from fasta import FastaRecord
+
+CONFIG = ("F", "100", "blastn", "nt", "", "")
+
+
+def records(*titles):
+    return [FastaRecord(title, "ACGT" * 10) for title in titles]
+
+
+class FakeNCBI:
+    def __init__(self):
+        self.submitted = []
+        self.waits = []
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def submit(self, fasta, config):
+        if self.error is not None:
+            raise self.error
+        self.submitted.append((fasta, config))
+        return f"RID{len(self.submitted)}"
+
+    async def wait(self, rid):
+        self.waits.append(rid)
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.waits.remove(rid)
+            raise
+        return rid.encode()
+
+
+def batcher(ncbi, window=0.05, small_job=5, max_queries=10):
+    return SubmissionBatcher(ncbi.submit, ncbi.wait, window, small_job, max_queries)
+
+
+def test_small_jobs_share_one_submission():
+    async def run():
+        ncbi = FakeNCBI()
+        shared = batcher(ncbi)
+        first = shared.enqueue(records("a", "b"), CONFIG)
+        # settings past the first four don't change the search
+        second = shared.enqueue(records("c"), CONFIG[:4] + ("keyword", "species"))
+        assert await first.rid == await second.rid == "RID1"
+        ncbi.release.set()
+        assert await first.result == await second.result == b"RID1"
+        ((fasta, _),) = ncbi.submitted
+        titles = [line[1:] for line in fasta.splitlines() if line.startswith(">")]
+        assert titles == [f"{first.prefix}a", f"{first.prefix}b", f"{second.prefix}c"]
+    asyncio.run(run())
+
+
+def test_batches_split_by_settings_and_size():
+    async def run():
+        ncbi = FakeNCBI()
+        shared = batcher(ncbi, window=60, max_queries=3)
+        protein = shared.enqueue(records("p"), ("F", "100", "blastp", "nr"))
+        full = shared.enqueue(records("a", "b", "c"), CONFIG)
+        # a full batch goes out at once, without waiting for the window
+        assert await full.rid == "RID1"
+        # one that would overflow the open batch flushes it and starts the next
+        first = shared.enqueue(records("d", "e"), CONFIG)
+        second = shared.enqueue(records("f", "g"), CONFIG)
+        assert await first.rid == "RID2"
+        assert not second.rid.done() and not protein.rid.done()
+        assert [config[2] for _, config in ncbi.submitted] == ["blastn", "blastn"]
+        assert shared.accepts(records("a"))
+        assert not shared.accepts(records(*"abcdef"))
+        assert not batcher(ncbi, window=0).accepts(records("a"))
+        for ticket in (protein, full, first, second):
+            shared.withdraw(ticket)
+    asyncio.run(run())
+
+
+def test_withdrawn_tickets_leave_the_batch():
+    async def run():
+        ncbi = FakeNCBI()
+        shared = batcher(ncbi)
+        gone = shared.enqueue(records("gone"), CONFIG)
+        kept = shared.enqueue(records("kept"), CONFIG)
+        shared.withdraw(gone)
+        assert await kept.rid == "RID1"
+        ((fasta, _),) = ncbi.submitted
+        assert "gone" not in fasta and gone.result.cancelled()
+
+        # the shared search keeps polling only while someone still waits on it
+        await asyncio.sleep(0)
+        assert ncbi.waits == ["RID1"]
+        shared.withdraw(kept)
+        await asyncio.sleep(0.01)
+        assert ncbi.waits == []
+
+        # a batch whose every ticket withdrew before submitting never goes out
+        shared.withdraw(shared.enqueue(records("x"), CONFIG))
+        await asyncio.sleep(0.1)
+        assert len(ncbi.submitted) == 1
+    asyncio.run(run())
+
+
+def test_submit_failure_reaches_every_ticket():
+    async def run():
+        ncbi = FakeNCBI()
+        ncbi.error = RuntimeError("NCBI is down")
+        shared = batcher(ncbi)
+        tickets = [shared.enqueue(records(title), CONFIG) for title in "ab"]
+        for ticket in tickets:
+            with pytest.raises(RuntimeError, match="NCBI is down"):
+                await ticket.result
+    asyncio.run(run())
@@ -0,0 +1,25 @@
+import csv
+
+from benchmarks.report_bench import FIELDNAMES, run_case, synthesize_job_folder
+
+
+def test_synthetic_folders_are_reproducible(tmp_path):
+    synthesize_job_folder(tmp_path / "a", 3, 4, seed=7)
+    synthesize_job_folder(tmp_path / "b", 3, 4, seed=7)
+    names = sorted(path.name for path in (tmp_path / "a").glob("*.csv"))
+    assert names == ["sample_00000.csv", "sample_00001.csv", "sample_00002.csv"]
+    for name in names:
+        assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+    with (tmp_path / "a" / names[0]).open(newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4 and list(rows[0]) == FIELDNAMES
+
+
+def test_run_case_times_every_report_stage():
+    case = run_case(2, 5, seed=0)
+    assert case["rows"] == 10
+    assert set(case["seconds"]) == {
+        "synthesize", "process_csv_file", "create_pdf_report", "read_csv_files",
+        "generate_summary_stats", "create_file_data_tables",
+    }
+    assert case["peak_rss_mb"] >= case["import_rss_mb"] > 0
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks import mock_ncbi
+from benchmarks.mock_ncbi import build_archive
+from blast import parse_archives
+
+
+async def start_job(owners=1, on_cancel=None):
+    job_id = main.secrets.token_hex(8)
+    async with main.job_lock:
+        main._create_job_state(job_id)
+        tokens = [main._add_owner(job_id) for _ in range(owners)]
+
+    async def job():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            if on_cancel is not None:
+                await on_cancel(job_id)
+                return
+            raise
+    main.job_states[job_id]["task"] = asyncio.create_task(job())
+    await asyncio.sleep(0)
+    return job_id, tokens
+
+
+def events(job_id):
+    return [message["type"] for message in main.job_states[job_id]["messages"]]
+
+
+def test_cancel_needs_the_owners_token():
+    async def run():
+        job_id, (token,) = await start_job()
+        for bad in (None, "not-the-token"):
+            with pytest.raises(HTTPException) as error:
+                await main.cancel_job(job_id, bad)
+            assert error.value.status_code == 403
+        assert await main.cancel_job(job_id, token) == "cancelled"
+        assert main.job_states[job_id]["task"].cancelled()
+        with pytest.raises(HTTPException) as error:
+            await main.cancel_job(job_id, token)
+        assert error.value.status_code == 409
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert main.job_states[job_id]["status"] == "cancelled"
+    assert events(job_id) == ["cancelled"]
+
+
+def test_a_shared_job_runs_until_its_last_owner_cancels():
+    async def run():
+        job_id, (first, second) = await start_job(owners=2)
+        assert await main.cancel_job(job_id, first) == "detached"
+        assert not main.job_states[job_id]["task"].done()
+        assert main.job_states[job_id]["status"] == "running"
+        assert await main.cancel_job(job_id, second) == "cancelled"
+
+    asyncio.run(run())
+
+
+def test_completion_that_beats_the_cancel_is_kept():
+    async def finish(job_id):
+        # the job's last step lands while the cancel is being delivered
+        await main.publish_job_event(job_id, "complete", ["done"])
+
+    async def run():
+        job_id, (token,) = await start_job(on_cancel=finish)
+        return job_id, await main.cancel_job(job_id, token)
+
+    job_id, status = asyncio.run(run())
+    assert status == "completed"
+    assert main.job_states[job_id]["status"] == "completed"
+    assert events(job_id) == ["complete"]
+
+
+def test_inline_parse_stops_once_asked(tmp_path):
+    archive = build_archive("RID1", [("q1", "ACGT" * 30), ("q2", "GGCA" * 30)], 3, 1, 0)
+    stop = threading.Event()
+    stop.set()
+    assert parse_archives([(None, archive, None)], tmp_path, ["sus scrofa"], stop) == {}
+    assert not list(tmp_path.glob("*.csv"))
+
+
+def test_cancelled_pool_parse_kills_its_workers(tmp_path):
+    from workers import ParsePool
+
+    pool = ParsePool(1, 0)
+    records = [(f"q{index}", "ACGT" * 30) for index in range(40)]
+    archives = [(None, build_archive("RID1", records, 5, 1, 0), None)]
+
+    async def run():
+        first_chunk = asyncio.Event()
+
+        async def progress(done, total):
+            first_chunk.set()
+        task = asyncio.create_task(pool.parse(archives, tmp_path, ["sus scrofa"], progress))
+        await first_chunk.wait()
+        executor = pool._executor
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return executor
+
+    try:
+        executor = asyncio.run(run())
+        assert pool._executor is None
+        for process in (executor._processes or {}).values():
+            process.join(5)
+            assert not process.is_alive()
+        assert not (tmp_path / "_parse").exists()
+    finally:
+        pool.shutdown()
+
+
+def test_cancel_endpoint_stops_a_polling_job(ncbi, monkeypatch):
+    monkeypatch.setitem(mock_ncbi.SETTINGS, "stall_every", 1)
+    with TestClient(main.app) as client, client.websocket_connect("/") as websocket:
+        websocket.send_text(json.dumps({"action": "start", "fasta": ">q1\n" + "ACGTTGCA" * 20}))
+        while (ack := json.loads(websocket.receive_text()))["type"] != "job_ack":
+            pass
+        job = f"/jobs/{ack['jobId']}"
+        deadline = time.monotonic() + 10
+        while ncbi["get"] < 3:  # polling the stalled search
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        assert client.post(f"{job}/cancel").status_code == 403
+        response = client.post(f"{job}/cancel", headers={"X-Cancel-Token": ack["cancelToken"]})
+        assert response.json() == {"jobId": ack["jobId"], "status": "cancelled"}
+        assert client.get(job).json()["status"] == "cancelled"
+        polls = ncbi["get"]
+        time.sleep(0.1)
+        # the job's task is gone, so nothing polls NCBI on its behalf any more
+        assert ncbi["get"] == polls
+        assert main.job_states[ack["jobId"]]["task"].done()
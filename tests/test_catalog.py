@@ -0,0 +1,119 @@
+import asyncio
+import csv
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import blast
+import main
+from blast import CSV_FIELDNAMES
+from catalog import backfill, connect, finish_job, record_job, search_jobs
+
+
+def make_job(root, name, hits):
+    """A results folder with inputs.fasta and one CSV per query of (accession, taxid, species) hits."""
+    folder = root / name
+    folder.mkdir()
+    (folder / "inputs.fasta").write_text("".join(f">{query}\nACGT\n" for query in hits), encoding="utf-8")
+    for query, rows in hits.items():
+        with (folder / f"{query}.csv").open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            for accession, taxid, species in rows:
+                writer.writerow({
+                    "query_title": query, "subject_accession": accession, "taxid": taxid,
+                    "sci_name": species, "identity_pct": 99.0, "bit_score": 100.0, "evalue": 1e-20,
+                })
+    return folder
+
+
+@pytest.fixture
+def root(tmp_path):
+    make_job(tmp_path, "jobfish", {
+        "q1": [("NM_1", "7955", "Danio rerio"), ("NM_2", "9606", "Homo sapiens")],
+        "q2": [("NM_3", "7955", "Danio rerio")],
+    })
+    make_job(tmp_path, "jobpig", {"q1": [("XM_9", "9823", "Sus scrofa")]})
+    assert backfill(tmp_path) == 2
+    return tmp_path
+
+
+def folders(jobs):
+    return sorted(job["folderId"] for job in jobs)
+
+
+def test_search_by_hit_terms(root):
+    assert folders(search_jobs(results_dir=root)) == ["jobfish", "jobpig"]
+    (fish,) = search_jobs(species="DANIO", results_dir=root)
+    assert fish["folderId"] == "jobfish"
+    assert fish["matchedQueries"] == ["q1", "q2"]
+    assert (fish["queryCount"], fish["hitCount"]) == (2, 3)
+    assert fish["inputs"] == ["q1", "q2"]
+    assert folders(search_jobs(taxid=9823, results_dir=root)) == ["jobpig"]
+    assert search_jobs(accession="NM_2", results_dir=root)[0]["matchedQueries"] == ["q1"]
+    # several terms narrow to the queries that match all of them
+    (both,) = search_jobs(species="danio", taxid="9606", results_dir=root)
+    assert both["matchedQueries"] == ["q1"]
+    assert search_jobs(species="danio", taxid="9823", results_dir=root) == []
+    assert search_jobs(species="zebra", results_dir=root) == []
+
+
+def test_search_by_creation_time(root):
+    assert folders(search_jobs(since="2000-01-01", results_dir=root)) == ["jobfish", "jobpig"]
+    assert search_jobs(until="2000-01-01", results_dir=root) == []
+    assert len(search_jobs(limit=1, results_dir=root)) == 1
+
+
+def test_record_and_finish_keep_what_they_are_not_given(root):
+    folder = root / "jobpig"
+    record_job(folder, config=("F", "100", "blastn", "nt", "", ""), status="running",
+               timings={"stages": {"search": 1.0}}, results_dir=root)
+    (folder / "extra.html").write_text("report", encoding="utf-8")
+    finish_job(folder, "completed", results_dir=root)
+    (job,) = search_jobs(taxid="9823", results_dir=root)
+    assert job["status"] == "completed"
+    assert job["config"]["program"] == "blastn"
+    assert job["timings"] == {"stages": {"search": 1.0}}
+    assert "extra.html" in job["artifacts"]
+    # a later re-index leaves the config and timings in place
+    record_job(folder, status="completed", results_dir=root)
+    (job,) = search_jobs(taxid="9823", results_dir=root)
+    assert job["config"]["program"] == "blastn" and job["timings"] == {"stages": {"search": 1.0}}
+
+
+def test_backfill_skips_known_and_empty_folders(root):
+    (root / "empty").mkdir()
+    assert backfill(root) == 0
+    assert backfill(root, force=True) == 2
+
+
+def test_catalog_endpoint():
+    make_job(main.RESULTS_DIR, "catalogendpoint", {"q": [("CATALOG_1", "9913", "Bos taurus")]})
+    record_job(main.RESULTS_DIR / "catalogendpoint", status="completed", results_dir=main.RESULTS_DIR)
+    with TestClient(main.app) as client:
+        response = client.get("/catalog/jobs", params={"species": "bos", "accession": "CATALOG_1"})
+    assert response.status_code == 200
+    (job,) = response.json()["jobs"]
+    assert (job["folderId"], job["matchedQueries"]) == ("catalogendpoint", ["q"])
+
+
+def test_failed_job_is_catalogued_as_an_error(ncbi, monkeypatch, tmp_path):
+    async def run_reports(*args, **kwargs):
+        raise RuntimeError("report failed")
+
+    monkeypatch.setattr(blast, "run_reports", run_reports)
+    # the error path writes error.log to the working directory
+    monkeypatch.chdir(tmp_path)
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    asyncio.run(blast.run_blast_job(">q\n" + "ACGT" * 30 + "\n", notifier, report_format="html"))
+    assert events[-1][0] == "error"
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    with closing(connect()) as conn:
+        status = conn.execute("SELECT status FROM jobs WHERE folder_id = ?", (folder.name,)).fetchone()
+    assert status == ("error",)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+
+import blast
+import cli
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    plates = tmp_path / "plates"
+    plates.mkdir()
+    for name in ("b.fasta", "a.fa", "notes.md"):
+        (plates / name).write_text(">q\nACGT\n", encoding="utf-8")
+    extra = tmp_path / "extra.txt"
+    extra.write_text(">bad\nACGT\n", encoding="utf-8")
+    return plates, extra
+
+
+def test_collect_inputs_expands_directories_in_order(inputs):
+    plates, extra = inputs
+    collected = cli.collect_inputs([str(plates), str(extra), str(plates / "a.fa")])
+    assert [path.name for path in collected] == ["a.fa", "b.fasta", "extra.txt"]
+    with pytest.raises(SystemExit):
+        cli.collect_inputs([str(plates / "missing.fasta")])
+
+
+def test_console_notifier_tracks_folder_and_status(capsys):
+    notifier = cli.ConsoleNotifier("a.fa", quiet=True)
+    asyncio.run(notifier("folder", {"folderId": "blast_res/abc"}))
+    asyncio.run(notifier("progress", ["Polling..."]))
+    asyncio.run(notifier("query_result", {"query": "q"}))
+    asyncio.run(notifier("error", "NCBI is down"))
+    assert (notifier.folder, notifier.status, notifier.messages) == ("blast_res/abc", "error", ["NCBI is down"])
+    printed = capsys.readouterr().err
+    assert "Polling" not in printed and "results -> blast_res/abc" in printed
+
+
+def test_main_runs_every_file_and_reports_failures(inputs, tmp_path, monkeypatch):
+    plates, extra = inputs
+    seen = []
+
+    async def run_blast_job(path, notifier, metrics, **kwargs):
+        seen.append((path.name, kwargs["report_format"]))
+        await notifier("folder", {"folderId": f"blast_res/{path.stem}"})
+        if path.name == "extra.txt":
+            await notifier("error", "BLAST search failed")
+        else:
+            await notifier("complete", ["done"])
+
+    monkeypatch.setattr(blast, "run_blast_job", run_blast_job)
+    summary_path = tmp_path / "summary.json"
+    code = cli.main([str(plates), str(extra), "--summary", str(summary_path), "--report-format", "html",
+                     "--concurrency", "1", "--quiet"])
+    assert code == 1
+    assert seen == [("a.fa", "html"), ("b.fasta", "html"), ("extra.txt", "html")]
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert (summary["completed"], summary["failed"]) == (2, 1)
+    assert [(job["folder"], job["status"]) for job in summary["jobs"]] == [
+        ("blast_res/a", "completed"), ("blast_res/b", "completed"), ("blast_res/extra", "error"),
+    ]
+    assert {"input", "messages", "metrics"} <= set(summary["jobs"][0])
+
+    assert cli.main([str(plates / "a.fa"), "--summary", str(summary_path)]) == 0
+
+
+def test_main_without_fasta_files(tmp_path):
+    (tmp_path / "notes.md").write_text("nothing", encoding="utf-8")
+    assert cli.main([str(tmp_path)]) == 2
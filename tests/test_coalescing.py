@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from CONFIG import load_config
+
+FASTA = ">a\nACGTACGTACGT\n>b\nTTTTGGGGCCCC\n"
+# the same records wrapped differently
+REWRAPPED = ">a\nACGTAC\nGTACGT\n\n>b\nTTTTGG\nGGCCCC\n"
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Replace the pipeline with one that waits for ``release`` and then completes."""
+    release = threading.Event()
+    calls = []
+
+    async def run_blast_job(data, notifier, metrics=None, **kwargs):
+        calls.append(data)
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        await notifier("complete", {"folderId": None})
+
+    monkeypatch.setattr(main, "run_blast_job", run_blast_job)
+    return calls, release
+
+
+def start(websocket, fasta, **options):
+    websocket.send_text(json.dumps({"action": "start", "fasta": fasta, **options}))
+    seen = []
+    while True:
+        message = json.loads(websocket.receive_text())
+        if message["type"] == "job_ack":
+            return message, seen
+        seen.append(message["type"])
+
+
+def wait_for(websocket, event_type):
+    while json.loads(websocket.receive_text())["type"] != event_type:
+        pass
+
+
+def test_identical_starts_share_one_job(runs):
+    calls, release = runs
+    with TestClient(main.app) as client, \
+            client.websocket_connect("/") as first, client.websocket_connect("/") as second:
+        ack, seen = start(first, FASTA)
+        assert not ack["attached"] and seen == ["job_started"]
+        shared, replayed = start(second, REWRAPPED)
+        assert shared["attached"] and shared["jobId"] == ack["jobId"]
+        # the attached client catches up on the job's history
+        assert replayed == ["job_started"]
+        # each owner gets its own cancel token
+        assert shared["cancelToken"] != ack["cancelToken"]
+        assert len(calls) == 1
+
+        other, _ = start(second, FASTA, reportFormat="html")
+        assert not other["attached"] and other["jobId"] != ack["jobId"]
+        # nor one asking for a profile the running job won't write
+        profiled, _ = start(second, FASTA, profile=True)
+        assert not profiled["attached"] and profiled["jobId"] != ack["jobId"]
+        assert len(calls) == 3
+
+        release.set()
+        wait_for(first, "complete")
+        # once the job has finished, the same input starts afresh
+        again, _ = start(first, FASTA)
+        assert not again["attached"] and again["jobId"] != ack["jobId"]
+        assert len(calls) == 4
+        wait_for(first, "complete")
+    assert ack["jobId"] not in main.inflight_jobs.values()
+
+
+def test_job_key_covers_input_config_and_options():
+    config = load_config()
+    targets = main.normalize_targets(None, config)
+    key = main._job_key(FASTA, config, targets, None, "pdf")
+    assert main._job_key(REWRAPPED, config, targets, None, "pdf") == key
+    assert main._job_key(FASTA + ">c\nAAAA\n", config, targets, None, "pdf") != key
+    assert main._job_key(FASTA, config, targets, None, "html") != key
+    assert main._job_key(FASTA, config, targets, True, "pdf") != key
+    assert main._job_key(FASTA, config, targets, None, "pdf", profile=True) != key
+    assert main._job_key(FASTA, ("other",) + tuple(config[1:]), targets, None, "pdf") != key
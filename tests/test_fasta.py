@@ -0,0 +1,83 @@
+import pytest
+
+from fasta import (
+    AMINO_ACID_CODES,
+    FastaError,
+    FastaStreamParser,
+    collapse_duplicates,
+    parse_fasta,
+    parse_fasta_file,
+    query_alphabet,
+)
+
+
+def test_nucleotide_records_are_normalized():
+    records = parse_fasta(">a one\nacgt\nAC GT\n>b\nNNRY\n")
+    assert [(r.title, r.sequence) for r in records] == [("a one", "ACGTACGT"), ("b", "NNRY")]
+
+
+def test_protein_query_rejected_for_nucleotide_programs():
+    with pytest.raises(FastaError, match="invalid characters"):
+        parse_fasta(">p\nMKTAYIAKQRQISFVKSHFSRQ\n", query_alphabet("blastn"))
+
+
+@pytest.mark.parametrize("program", ["blastp", "tblastn"])
+def test_protein_query_accepted_for_protein_programs(program):
+    records = parse_fasta(">p\nMKTAYIAKQRQ*\n>q\nXXBZJUO\n", query_alphabet(program))
+    assert [r.sequence for r in records] == ["MKTAYIAKQRQ*", "XXBZJUO"]
+
+
+@pytest.mark.parametrize("program", ["blastx", "tblastx", "megablast"])
+def test_translated_programs_take_nucleotide_queries(program):
+    assert query_alphabet(program) != AMINO_ACID_CODES
+
+
+def test_protein_programs_still_reject_non_residues():
+    with pytest.raises(FastaError, match="invalid characters: 1"):
+        parse_fasta(">p\nMKT1\n", query_alphabet("blastp"))
+
+
+def test_headerless_sequence_is_one_query():
+    records = parse_fasta("ACGTACGT\nACGT\n")
+    assert [(r.title, r.sequence) for r in records] == [("Query_1", "ACGTACGTACGT")]
+
+
+def test_text_before_first_header_is_ignored():
+    records = parse_fasta("notes\n>a\nACGT\n")
+    assert [(r.title, r.sequence) for r in records] == [("a", "ACGT")]
+
+
+def test_empty_input_is_an_error():
+    with pytest.raises(FastaError, match="No FASTA records"):
+        parse_fasta("\n  \n")
+
+
+def test_stream_parser_matches_whole_text_across_chunk_boundaries():
+    text = ">a\nACGTAC\nGT\n>b\nTTTT\n"
+    parser = FastaStreamParser(collect=False)
+    for index in range(0, len(text), 3):
+        parser.feed(text[index:index + 3])
+    parser.close()
+    assert (parser.record_count, parser.residue_count) == (2, 12)
+
+
+def test_file_parses_like_its_text_in_small_chunks(tmp_path):
+    text = ">a first\r\nACGTAC\r\ngt\r\n>b\nTTTT"
+    path = tmp_path / "upload.fasta"
+    path.write_bytes(text.encode("utf-8"))
+    assert parse_fasta_file(path, chunk_size=4) == parse_fasta(text)
+
+
+def test_headerless_stream_counts_one_record():
+    parser = FastaStreamParser(collect=False)
+    parser.feed("ACGT\nAC")
+    parser.feed("GT\n")
+    parser.close()
+    assert (parser.record_count, parser.residue_count) == (1, 8)
+
+
+def test_collapse_duplicates_keeps_first_title():
+    records = parse_fasta(">a\nACGT\n>b\nTTTT\n>c\nACGT\n")
+    unique, groups = collapse_duplicates(records)
+    assert [r.title for r in unique] == ["a", "b"]
+    assert groups == {"a": ["a", "c"], "b": ["b"]}
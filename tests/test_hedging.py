@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import blast
+from benchmarks import mock_ncbi
+from blast import RateLimiter
+from catalog import finish_job, recent_search_seconds, record_job
+from hedging import Hedger
+from metrics import JobMetrics
+
+
+def make_hedger(wait=None, **kwargs):
+    async def never(rid, count):
+        await asyncio.sleep(3600)
+    options = dict(rtoe_factor=2.0, percentile=90, min_wait=0.0, max_hedges=1)
+    options.update(kwargs)
+    return Hedger(wait or never, **options)
+
+
+def test_delay_takes_the_tighter_limit_but_never_below_min_wait():
+    hedger = make_hedger(min_wait=1.0)
+    assert hedger.delay(None) is None
+    assert hedger.delay(10) == 20
+    for seconds in (1, 2, 3, 4, 5, 6, 7, 8, 9, 10):
+        hedger.observe(seconds)
+    assert hedger.delay(10) == 9
+    assert make_hedger(min_wait=30.0).delay(10) == 30
+    assert make_hedger(max_hedges=0).delay(10) is None
+
+
+def test_history_is_seeded_once_and_errors_are_ignored():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return [5.0, 0, 6.0, 7.0, 8.0, 9.0]
+    hedger = make_hedger(load_history=load)
+    assert hedger.historical() is None
+    asyncio.run(hedger.seed())
+    assert hedger.historical() == 9.0
+    asyncio.run(hedger.seed())
+    assert len(calls) == 1
+
+    def broken():
+        raise RuntimeError("catalog unavailable")
+    hedger = make_hedger(load_history=broken)
+    asyncio.run(hedger.seed())
+    assert hedger.historical() is None
+
+
+def test_history_is_loaded_off_the_event_loop():
+    threads = []
+
+    def load():
+        threads.append(threading.current_thread())
+        return [5.0] * 5
+
+    async def primary():
+        return b"done"
+    hedger = make_hedger(load_history=load)
+    assert asyncio.run(hedger.run(primary(), None, None)) == (None, b"done")
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_primary_wins_without_a_hedge():
+    observed, counted = [], []
+
+    async def primary():
+        return b"primary"
+
+    async def resubmit():
+        raise AssertionError("no hedge expected")
+
+    result = asyncio.run(make_hedger().run(
+        primary(), 10, resubmit, count=lambda name, amount=1: counted.append(name),
+        observe=observed.append,
+    ))
+    assert result == (None, b"primary")
+    assert counted == [] and len(observed) == 1
+
+
+def test_a_straggler_is_hedged_and_the_hedge_wins():
+    observed, counted = [], []
+
+    async def wait(rid, count):
+        await asyncio.sleep(0.01)
+        return f"content of {rid}".encode()
+
+    async def primary():
+        await asyncio.sleep(3600)
+
+    async def resubmit():
+        return "HEDGE1"
+
+    result = asyncio.run(make_hedger(wait).run(
+        primary(), 0.02, resubmit, count=lambda name, amount=1: counted.append(name),
+        observe=observed.append,
+    ))
+    assert result == ("HEDGE1", b"content of HEDGE1")
+    assert counted == ["hedges", "hedge_wins"]
+    # the hedge's own search time, not the time since the primary was submitted
+    assert observed[0] < 0.04
+
+
+def test_deadline_raises_timeout():
+    async def primary():
+        await asyncio.sleep(3600)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        await make_hedger(max_hedges=0).run(primary(), None, None, deadline=loop.time() + 0.02)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+
+
+def test_catalog_history_is_per_search(tmp_path):
+    results = tmp_path / "results"
+    for name, searches in (("old", [4.0, 5.0]), ("new", [1.5])):
+        folder = results / name
+        folder.mkdir(parents=True)
+        record_job(folder, results_dir=results)
+        timings = {"stages": {"ncbi_wait": 99.0}, "search_seconds": searches}
+        finish_job(folder, "completed", timings, results_dir=results)
+    assert sorted(recent_search_seconds(results_dir=results)) == [1.5, 4.0, 5.0]
+    assert len(recent_search_seconds(limit=2, results_dir=results)) == 2
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(0.05, name="test_limiter")
+
+    async def burst():
+        sent = []
+
+        async def request():
+            await limiter.wait()
+            sent.append(time.monotonic())
+        await asyncio.gather(*(request() for _ in range(3)))
+        return sent
+
+    sent = asyncio.run(burst())
+    gaps = [later - earlier for earlier, later in zip(sent, sent[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_a_stalled_rid_is_hedged_end_to_end(ncbi, monkeypatch):
+    # the job's first submission never finishes; its resubmission does
+    monkeypatch.setitem(mock_ncbi.SETTINGS, "stall_every", 2)
+    monkeypatch.setitem(ncbi, "put", 0)
+    monkeypatch.setattr(blast.HEDGER, "rtoe_factor", 0.05)
+    monkeypatch.setattr(blast.HEDGER, "min_wait", 0)
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    metrics = JobMetrics()
+    fasta = ">q1\n" + "ACGTTGCA" * 20 + "\n"
+    asyncio.run(asyncio.wait_for(blast.run_blast_job(fasta, notifier, metrics, report_format="html"), 30))
+    assert events[-1][0] == "complete", events
+    assert ncbi["put"] == 2
+    assert (metrics.counters["hedges"], metrics.counters["hedge_wins"]) == (1, 1)
+    assert len(metrics.searches) == 1
+
+
+def test_estimates_of_cancelled_searches_are_dropped(monkeypatch):
+    async def forever(rid, count=None):
+        await asyncio.sleep(3600)
+
+    async def submit_blast(fasta_string, config):
+        # NCBI answered the hedge, then the job was cancelled before it was polled
+        blast.RTOE_ESTIMATES["HEDGE"] = 30
+        job.cancel()
+        return "HEDGE"
+
+    monkeypatch.setattr(blast, "wait_for_blast", forever)
+    monkeypatch.setattr(blast, "submit_blast", submit_blast)
+    monkeypatch.setattr(blast.HEDGER, "wait", forever)
+    monkeypatch.setattr(blast.HEDGER, "rtoe_factor", 0.001)
+    monkeypatch.setattr(blast.HEDGER, "min_wait", 0)
+    blast.RTOE_ESTIMATES["PRIMARY"] = 1
+    job = None
+
+    async def run():
+        nonlocal job
+        job = asyncio.ensure_future(
+            blast._await_target("PRIMARY", None, [], ("F", "5", "blastn", "nt", "", ""), JobMetrics(), None)
+        )
+        with pytest.raises(asyncio.CancelledError):
+            await job
+
+    asyncio.run(run())
+    assert "PRIMARY" not in blast.RTOE_ESTIMATES and "HEDGE" not in blast.RTOE_ESTIMATES
@@ -0,0 +1,124 @@
+import csv
+import shutil
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.mock_ncbi import build_archive
+from blast import CSV_FIELDNAMES, parse_archives
+from hitindex import INDEX_FILENAME, build_hit_index, ensure_hit_index, query_hits, query_hsps
+
+
+def write_csv(folder, name, rows, fieldnames=CSV_FIELDNAMES):
+    with (folder / f"{name}.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def hit(query, accession, evalue, identity=99.0, **extra):
+    return {
+        "query_id": "Query_1", "query_title": query, "subject_id": accession,
+        "subject_accession": accession, "subject_title": f"{accession} title",
+        "taxid": "9606", "sci_name": "Homo sapiens", "identity_pct": identity,
+        "bit_score": 100.0, "evalue": evalue, **extra,
+    }
+
+
+def all_pages(folder, limit, **kwargs):
+    seen, cursor = [], None
+    while True:
+        page = query_hits(folder, limit=limit, cursor=cursor, **kwargs)
+        seen.extend(row["subject_accession"] for row in page["hits"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return seen
+
+
+@pytest.fixture
+def folder(tmp_path):
+    write_csv(tmp_path, "q1", [hit("q1", f"A{i}", 10.0 ** -i, identity=90 + i) for i in range(5)])
+    write_csv(tmp_path, "q2", [hit("q2", f"B{i}", 10.0 ** -(i + 0.5)) for i in range(4)])
+    build_hit_index(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test_pages_cover_every_hit_in_order(folder, limit):
+    full = query_hits(folder, limit=100)["hits"]
+    assert [row["evalue"] for row in full] == sorted(row["evalue"] for row in full)
+    assert all_pages(folder, limit) == [row["subject_accession"] for row in full]
+
+
+def test_filters_apply_across_pages(folder):
+    assert all_pages(folder, 2, query="q1", sort="identity") == ["A4", "A3", "A2", "A1", "A0"]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_null_sort_values_paginate_last(tmp_path, order):
+    # a folder written before anomaly scores existed: the column is NULL throughout
+    write_csv(tmp_path, "legacy", [hit("legacy", f"L{i}", 0.1) for i in range(5)])
+    build_hit_index(tmp_path)
+    assert sorted(all_pages(tmp_path, 2, sort="anomaly", order=order)) == [f"L{i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_mixed_null_and_values(tmp_path, order):
+    fieldnames = CSV_FIELDNAMES + ["anomaly_score"]
+    rows = [hit("q", f"S{i}", 0.1, anomaly_score=i) for i in range(3)]
+    rows += [hit("q", f"N{i}", 0.1, anomaly_score="") for i in range(3)]
+    write_csv(tmp_path, "q", rows, fieldnames)
+    build_hit_index(tmp_path)
+    scored = ["S0", "S1", "S2"] if order == "asc" else ["S2", "S1", "S0"]
+    nulls = ["N0", "N1", "N2"] if order == "asc" else ["N2", "N1", "N0"]
+    for limit in (1, 2, 4, 10):
+        assert all_pages(tmp_path, limit, sort="anomaly", order=order) == scored + nulls
+
+
+def test_invalid_cursor(folder):
+    with pytest.raises(ValueError):
+        query_hits(folder, cursor="not-a-cursor")
+
+
+def test_hsps_page_in_archive_order(tmp_path):
+    archive = build_archive("RID1", [("q1", "ACGT" * 30), ("q2", "GGCA" * 30)], 3, 2, 0)
+    parse_archives([(None, archive, None)], str(tmp_path))
+    build_hit_index(tmp_path)
+    everything = query_hsps(tmp_path, limit=1000)["hsps"]
+    assert len(everything) == 2 * 3 * 2
+    seen, cursor = [], None
+    while True:
+        page = query_hsps(tmp_path, query="q2", limit=5, cursor=cursor)
+        seen.extend(page["hsps"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == [hsp for hsp in everything if hsp["query_title"] == "q2"]
+    accession = seen[0]["subject_accession"]
+    assert {hsp["hsp_num"] for hsp in query_hsps(tmp_path, accession=accession)["hsps"]} == {1, 2}
+
+
+def test_outdated_index_is_rebuilt(folder):
+    with sqlite3.connect(folder / INDEX_FILENAME) as conn:
+        conn.execute("PRAGMA user_version = 1")
+        conn.execute("DELETE FROM hits")
+    ensure_hit_index(folder)
+    assert len(query_hits(folder, limit=100)["hits"]) == 9
+
+
+def test_hits_endpoint(folder):
+    job = main.RESULTS_DIR / "hitsendpoint"
+    shutil.copytree(folder, job)
+    with TestClient(main.app) as client:
+        first = client.get(f"/jobs/{job.name}/hits", params={"limit": 4, "sort": "identity"})
+        assert first.status_code == 200
+        rest = client.get(
+            f"/jobs/{job.name}/hits",
+            params={"limit": 100, "sort": "identity", "cursor": first.json()["nextCursor"]},
+        ).json()
+        assert len(first.json()["hits"]) + len(rest["hits"]) == 9 and rest["nextCursor"] is None
+        assert client.get(f"/jobs/{job.name}/hits", params={"sort": "nope"}).status_code == 400
+        assert client.get(f"/jobs/{job.name}/hits", params={"cursor": "junk"}).status_code == 400
+        assert client.get("/jobs/nosuchjob/hits").status_code == 404
@@ -0,0 +1,84 @@
+import csv
+
+from hittable import HSP_COLUMN_NAMES, HitTable, StringPool
+
+
+def hsp(num, identity, align_len=100, **extra):
+    return {"num": num, "identity": identity, "align_len": align_len, "bit_score": 150.0 - num,
+            "score": 80, "evalue": 1e-30 * num, "query_from": 1, "query_to": 50, "hit_from": 5,
+            "hit_to": 54, **extra}
+
+
+def hit(num, accession, hsps, species="Danio rerio"):
+    return {
+        "num": num,
+        "len": 1200,
+        "description": [{"id": f"gi|{num}", "accession": accession, "title": f"{accession} mRNA",
+                         "taxid": 7955, "sciname": species}],
+        "hsps": hsps,
+    }
+
+
+SEARCH = {
+    "query_id": "Query_1",
+    "query_len": 200,
+    "hits": [
+        hit(1, "NM_1", [hsp(1, 99), hsp(2, 20, align_len=40)]),
+        {"num": 2, "description": [], "hsps": [hsp(1, 90)]},  # nothing to describe: skipped
+        hit(3, "NM_3", [hsp(1, 70)], species="Homo sapiens"),
+    ],
+}
+
+
+def test_every_hsp_becomes_a_row():
+    table = HitTable()
+    rows = table.add_search(SEARCH, "q1", target="blastn/nt")
+    assert rows == range(0, 3)
+    assert [table.value("hsp_num", i) for i in rows] == [1, 2, 1]
+    assert [table.value("subject_accession", i) for i in rows] == ["NM_1", "NM_1", "NM_3"]
+    first = dict(zip(HSP_COLUMN_NAMES, table.row(0)))
+    assert first["identity_pct"] == 99.0
+    assert first["query_cov_pct"] == 25.0
+    assert first["taxid"] == "7955"
+    assert first["target"] == "blastn/nt"
+    assert table.value("identity_pct", 1) == 50.0
+    # the next search's rows follow on
+    assert table.add_search(SEARCH, "q2") == range(3, 6)
+
+
+def test_top_hsps_are_each_hits_first():
+    table = HitTable()
+    rows = table.add_search(SEARCH, "q1")
+    assert list(table.top_hsps(rows)) == [0, 2]
+
+
+def test_missing_numbers_and_strings():
+    table = HitTable()
+    table.append({"query_title": None, "evalue": "n/a", "score": None})
+    row = dict(zip(HSP_COLUMN_NAMES, table.row(0)))
+    assert row["query_title"] == ""
+    # a missing float is written as an empty cell, a missing integer as 0
+    assert row["evalue"] == "" and row["score"] == 0
+
+
+def test_strings_are_interned_once():
+    pool = StringPool()
+    assert pool.intern("Danio rerio") == pool.intern("Danio rerio") == 0
+    assert pool.intern(None) == pool.intern("") == 1
+    assert pool[0] == "Danio rerio"
+    table = HitTable()
+    for _ in range(50):
+        table.add_search(SEARCH, "q1")
+    assert len(table) == 150
+    assert "Danio rerio" in table.strings.values and len(table.strings.values) < 20
+    assert table.nbytes() < 150 * len(HSP_COLUMN_NAMES) * 8
+
+
+def test_write_tsv(tmp_path):
+    table = HitTable()
+    table.add_search(SEARCH, "q1")
+    path = table.write_tsv(tmp_path / "hsps.tsv")
+    with path.open(newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f, delimiter="\t"))
+    assert rows[0] == HSP_COLUMN_NAMES
+    assert rows[1:] == [[str(value) for value in row] for row in table.rows()]
@@ -0,0 +1,77 @@
+import csv
+import json
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from blast import CSV_FIELDNAMES
+from htmlreport import HTML_FILENAME, iter_html_report, write_html_report
+
+CONFIG = ("F", "100", "blastn", "nt", "sus scrofa", "Pig")
+
+
+def write_csv(folder, name, titles):
+    fieldnames = CSV_FIELDNAMES + ["anomaly_score", "anomaly_rank"]
+    with (folder / f"{name}.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for number, title in enumerate(titles, start=1):
+            writer.writerow({"query_title": name, "subject_title": title, "subject_accession": f"A{number}",
+                             "identity_pct": 99.0, "evalue": 1e-50, "anomaly_score": number})
+
+
+@pytest.fixture
+def folder(tmp_path):
+    write_csv(tmp_path, "q1", ["Sus scrofa a", "Bos taurus b", "Bos taurus </script><b>c"])
+    write_csv(tmp_path, "q2", ["Sus scrofa d"])
+    return tmp_path
+
+
+def hit_tables(html):
+    return [json.loads(data) for data in re.findall(r'<script type="application/json" id="[^"]+">(.*?)</script>', html)]
+
+
+def test_summary_streams_before_any_query(folder):
+    chunks = list(iter_html_report(folder, CONFIG))
+    assert chunks[0].startswith("<!DOCTYPE html>")
+    assert "Pig BLAST Anomaly Report" in chunks[1] and "q1" not in chunks[1]
+    # then one chunk per query file, in name order
+    assert '<h2 id="q0">q1</h2>' in chunks[2] and '<h2 id="q1">q2</h2>' in chunks[3]
+    assert chunks[-1] == "</body></html>\n"
+
+
+def test_sections_carry_counts_and_hits(folder):
+    html = "".join(iter_html_report(folder, CONFIG))
+    assert "<script>tally(3, 2)</script>" in html and "<script>tally(1, 0)</script>" in html
+    assert "No anomalies detected in this file." in html
+    first, second = hit_tables(html)
+    assert first["columns"][-1] == "anomaly"
+    assert [row[-1] for row in first["rows"]] == [0, 1, 1]
+    assert len(second["rows"]) == 1
+    # titles are escaped in tables and can't close the JSON script early
+    assert "Bos taurus &lt;/script&gt;&lt;b&gt;c" in html
+    assert "</script><b>" not in html and "<\\/script><b>c" in html
+
+
+def test_empty_folder_and_written_file(tmp_path, folder):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert "No results in this folder." in "".join(iter_html_report(empty, CONFIG))
+    path = write_html_report(folder, CONFIG)
+    assert path == folder / HTML_FILENAME
+    assert path.read_text(encoding="utf-8").endswith("</body></html>\n")
+
+
+def test_report_endpoint():
+    job = main.RESULTS_DIR / "htmlreportjob"
+    job.mkdir()
+    write_csv(job, "q1", ["Sus scrofa a"])
+    with TestClient(main.app) as client:
+        response = client.get("/report", params={"folderid": str(job)})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert '<h2 id="q0">q1</h2>' in response.text
+        assert client.get("/report", params={"folderid": str(main.RESULTS_DIR / "missing")}).status_code == 404
+        assert client.get("/report", params={"folderid": "/etc"}).status_code == 400
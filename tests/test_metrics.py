@@ -0,0 +1,87 @@
+from fastapi.testclient import TestClient
+
+import main
+from metrics import CURRENT_JOB, Counter, Histogram, JobMetrics, REGISTRY, WaitLine, render_prometheus
+
+
+def sample(text, series, default=None):
+    """The value of ``series`` in Prometheus text, or ``default`` if it has none yet."""
+    values = [line.rsplit(" ", 1)[1] for line in text.splitlines() if line.startswith(series + " ")]
+    if not values and default is not None:
+        return default
+    (value,) = values
+    return float(value)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_histogram_seconds", "Test.", (1, 5))
+    try:
+        for value in (0.5, 2, 2, 10):
+            histogram.observe(value, stage="x")
+        text = histogram.render()
+    finally:
+        REGISTRY.remove(histogram)
+    assert "# TYPE test_histogram_seconds histogram" in text
+    assert sample(text, 'test_histogram_seconds_bucket{stage="x",le="1"}') == 1
+    assert sample(text, 'test_histogram_seconds_bucket{stage="x",le="5"}') == 3
+    assert sample(text, 'test_histogram_seconds_bucket{stage="x",le="+Inf"}') == 4
+    assert sample(text, 'test_histogram_seconds_sum{stage="x"}') == 14.5
+    assert sample(text, 'test_histogram_seconds_count{stage="x"}') == 4
+
+
+def test_job_metrics_feed_the_process_counters():
+    before = render_prometheus()
+    job = JobMetrics()
+    job.start()
+    with job.stage("search"):
+        assert job.current == "search"
+    job.count("polls", 3)
+    job.observe_search(1.25)
+    job.finish("completed")
+    job.finish("error")  # only the first final status counts
+    after = render_prometheus()
+
+    timings = job.as_dict()
+    assert timings["status"] == "completed"
+    assert set(timings["stages"]) == {"queue_wait", "search"}
+    assert timings["counters"] == {"polls": 3}
+    assert timings["search_seconds"] == [1.25]
+    assert job.current is None
+    for series, delta in (
+        ("batchblast_ncbi_polls_total", 3),
+        ('batchblast_jobs_total{status="completed"}', 1),
+        ('batchblast_jobs_total{status="error"}', 0),
+        ('batchblast_job_stage_seconds_count{stage="search"}', 1),
+    ):
+        assert sample(after, series, 0) - sample(before, series, 0) == delta
+
+
+def test_wait_line_reports_the_current_jobs_place():
+    line = WaitLine("test_line")
+    first, second = JobMetrics(), JobMetrics()
+    with line.waiting():  # no current job: nothing to track
+        assert len(line) == 0
+    token = CURRENT_JOB.set(first)
+    try:
+        with line.waiting():
+            CURRENT_JOB.set(second)
+            with line.waiting():
+                assert second.queue_position() == {"name": "test_line", "position": 2, "length": 2}
+            assert first.queue_position() == {"name": "test_line", "position": 1, "length": 1}
+            assert second.queue_position() is None
+    finally:
+        CURRENT_JOB.reset(token)
+    assert len(line) == 0
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    counter = Counter("test_endpoint_total", "Test.")
+    try:
+        counter.inc(2, kind="a")
+        response = TestClient(main.app).get("/metrics")
+    finally:
+        REGISTRY.remove(counter)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert sample(response.text, 'test_endpoint_total{kind="a"}') == 2
+    assert "# TYPE batchblast_websocket_subscribers gauge" in response.text
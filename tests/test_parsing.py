@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.mock_ncbi import build_archive
+from blast import parse_archives
+from parsing import parse_in_pool
+
+KEYWORDS = ["sus scrofa"]
+
+
+def snapshot(folder):
+    return {path.name: path.read_bytes() for path in sorted(folder.iterdir()) if path.is_file()}
+
+
+def pooled(archives, folder, workers=2):
+    with ThreadPoolExecutor(workers) as executor:
+        return asyncio.run(parse_in_pool(executor, workers, archives, folder, KEYWORDS))
+
+
+@pytest.mark.parametrize("records", [
+    [("same", "ACGT" * 30), ("same", "TTGA" * 30), ("other", "GGCA" * 30)],
+    [(f"q{index}", "ACGT" * 30) for index in range(12)],
+])
+def test_pool_matches_serial(tmp_path, records):
+    archives = [(None, build_archive("RID1", records, 6, 2, 1), None)]
+    serial = parse_archives(archives, tmp_path / "serial", KEYWORDS)
+    pool = pooled(archives, tmp_path / "pool")
+    assert {title: path.name for title, path in serial.items()} == {
+        title: path.name for title, path in pool.items()
+    }
+    assert snapshot(tmp_path / "pool") == snapshot(tmp_path / "serial")
+
+
+def test_pool_matches_serial_across_targets(tmp_path):
+    records = [("same", "ACGT" * 30), ("other", "GGCA" * 30), ("same", "TTGA" * 30)]
+    archives = [
+        ("blastn:nt", build_archive("RID1", records, 5, 1, 2), None),
+        ("blastn:refseq", build_archive("RID2", records[:2], 4, 1, 3), None),
+    ]
+    parse_archives(archives, tmp_path / "serial", KEYWORDS)
+    pooled(archives, tmp_path / "pool", workers=3)
+    assert snapshot(tmp_path / "pool") == snapshot(tmp_path / "serial")
+
+
+def test_pool_profiles_in_the_workers(tmp_path):
+    from profiling import JobProfiler
+
+    archives = [(None, build_archive("RID1", [("a", "ACGT" * 30), ("b", "GGCA" * 30)], 4, 1, 0), None)]
+    profiler = JobProfiler(tmp_path / "profile")
+    with ThreadPoolExecutor(2) as executor:
+        asyncio.run(parse_in_pool(executor, 2, archives, tmp_path / "pool", KEYWORDS, profiler=profiler))
+    profiler.write()
+    summary = (tmp_path / "profile" / "profile_summary.txt").read_text()
+    assert "parse_members" in summary and "score_queries" in summary
+
+
+def test_small_archives_skip_the_pool(tmp_path):
+    from workers import ParsePool
+
+    pool = ParsePool(2, min_queries=10)
+    archives = [(None, build_archive("RID1", [("a", "ACGT" * 30)], 3, 1, 0), None)]
+    written = asyncio.run(pool.parse(archives, tmp_path, KEYWORDS))
+    assert list(written) == ["a"]
+    assert pool._executor is None
+
+
+def test_query_results_come_from_the_parse(tmp_path):
+    from blast import query_result_notifier
+    from workers import ParsePool
+
+    records = [("a", "ACGT" * 30), ("b", "GGCA" * 30)]
+    archives = [(None, build_archive("RID1", records, 4, 1, 0), None)]
+    sent = []
+
+    async def notifier(event_type, payload):
+        sent.append((event_type, payload))
+
+    # "a" stands in for two inputs that collapsed to one query
+    results = query_result_notifier(notifier, {"a": ["a", "a copy"]})
+    asyncio.run(ParsePool(0, 0).parse(archives, tmp_path / "inline", KEYWORDS, results=results))
+    inline = [payload for _, payload in sent]
+    assert {event for event, _ in sent} == {"query_result"}
+    assert [payload["query"] for payload in inline] == ["a", "a copy", "b"]
+    assert all(payload["hits"] == 4 and payload["target"] is None for payload in inline)
+
+    sent.clear()
+    with ThreadPoolExecutor(2) as executor:
+        asyncio.run(parse_in_pool(executor, 2, archives, tmp_path / "pool", KEYWORDS, results=results))
+    assert sorted(inline, key=lambda payload: payload["query"]) == sorted(
+        (payload for _, payload in sent), key=lambda payload: payload["query"]
+    )
+
+
+def test_query_summary():
+    from blast import query_summary
+
+    def hit(title, species, identity):
+        return {"description": [{"title": title, "sciname": species}],
+                "hsps": [{"identity": identity, "align_len": 200}]}
+
+    search = {"hits": [
+        hit("Sus scrofa a", "Sus scrofa", 198),
+        hit("Bos taurus b", "Bos taurus", 150),
+        hit("Bos taurus c", "Bos taurus", 120),
+        {"description": [], "hsps": []},
+    ]}
+    assert query_summary("q", search, KEYWORDS) == {
+        "query": "q", "hits": 3, "topSpecies": "Bos taurus", "topSpeciesHits": 2,
+        "bestIdentity": 99.0, "anomalies": 2,
+    }
+    empty = query_summary("q", {"hits": []}, KEYWORDS)
+    assert (empty["hits"], empty["topSpecies"], empty["bestIdentity"]) == (0, None, None)
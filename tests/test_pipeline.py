@@ -0,0 +1,118 @@
+import asyncio
+import csv
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import blast
+import main
+from benchmarks import mock_ncbi
+
+QUERIES = ">q1 first\n" + "ACGTTGCA" * 20 + "\n>q2 second\n" + "GGCATTAC" * 20 + "\n"
+
+
+def test_job_runs_end_to_end_against_the_mock(ncbi):
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    puts = ncbi["put"]
+    asyncio.run(blast.run_blast_job(QUERIES, notifier, report_format="html"))
+
+    types = [event_type for event_type, _ in events]
+    assert "error" not in types, events
+    assert types[-1] == "complete"
+    assert ncbi["put"] == puts + 1
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    results = {}
+    for title in ("q1 first", "q2 second"):
+        with (folder / f"{blast.safe_filename(title)}.csv").open(newline="", encoding="utf-8") as f:
+            results[title] = list(csv.DictReader(f))
+    assert all(len(rows) == 8 for rows in results.values())
+    with sqlite3.connect(folder / "hits.sqlite") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == 16
+    assert sorted(payload["query"] for event_type, payload in events if event_type == "query_result") == [
+        "q1 first", "q2 second"
+    ]
+
+
+def test_targets_fan_out_into_labelled_rows(ncbi):
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    puts = ncbi["put"]
+    targets = ["blastn:nt", "blastn:refseq_rna"]
+    asyncio.run(blast.run_blast_job(QUERIES, notifier, targets=targets, report_format="html"))
+
+    assert [event_type for event_type, _ in events][-1] == "complete", events
+    # one search per target, side by side
+    assert ncbi["put"] == puts + 2
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    with (folder / f"{blast.safe_filename('q1 first')}.csv").open(newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["target"] for row in rows] == ["blastn:nt"] * 8 + ["blastn:refseq_rna"] * 8
+    results = sorted(
+        (payload["query"], payload["target"]) for event_type, payload in events if event_type == "query_result"
+    )
+    assert results == [
+        ("q1 first", "blastn:nt"), ("q1 first", "blastn:refseq_rna"),
+        ("q2 second", "blastn:nt"), ("q2 second", "blastn:refseq_rna"),
+    ]
+
+
+def test_normalize_targets():
+    config = ("F", "100", "blastn", "nt", "", "")
+    assert blast.normalize_targets(None, config) == [("blastn", "nt")]
+    assert blast.normalize_targets("blastn:refseq_rna", config) == [("blastn", "refseq_rna")]
+    assert blast.normalize_targets(
+        [":refseq_rna", ["megablast", "nt"], {"program": "blastn"}, "blastn:nt"], config
+    ) == [("blastn", "refseq_rna"), ("megablast", "nt"), ("blastn", "nt")]
+    with pytest.raises(ValueError):
+        blast.normalize_targets([["blastn"]], config)
+
+
+def test_duplicate_sequences_are_searched_once(ncbi):
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    # same sequence, differently wrapped and cased
+    fasta = QUERIES + ">q1 again\n" + "acgttgca" * 10 + "\n" + "ACGTTGCA" * 10 + "\n"
+    asyncio.run(blast.run_blast_job(fasta, notifier, report_format="html"))
+    assert events[-1][0] == "complete", events
+
+    submitted = list(mock_ncbi.jobs.values())[-1]
+    assert [title for title, _ in submitted["records"]] == ["q1 first", "q2 second"]
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    rows = {}
+    for title in ("q1 first", "q1 again"):
+        with (folder / f"{blast.safe_filename(title)}.csv").open(newline="", encoding="utf-8") as f:
+            rows[title] = list(csv.DictReader(f))
+    assert [row["query_title"] for row in rows["q1 again"]] == ["q1 again"] * 8
+    assert [row["subject_accession"] for row in rows["q1 again"]] == [
+        row["subject_accession"] for row in rows["q1 first"]
+    ]
+    with sqlite3.connect(folder / "hits.sqlite") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == 24
+        assert conn.execute("SELECT COUNT(*) FROM hsps WHERE query_title = 'q1 again'").fetchone()[0] == 8
+
+
+def test_query_results_reach_websocket_subscribers_before_completion(ncbi):
+    with TestClient(main.app) as client, client.websocket_connect("/") as websocket:
+        websocket.send_text(json.dumps({"action": "start", "fasta": QUERIES, "reportFormat": "html"}))
+        messages = []
+        while not messages or messages[-1]["type"] not in ("complete", "error"):
+            messages.append(json.loads(websocket.receive_text()))
+    assert messages[-1]["type"] == "complete"
+    results = [message for message in messages if message["type"] == "query_result"]
+    assert sorted(message["payload"]["query"] for message in results) == ["q1 first", "q2 second"]
+    assert all(message["payload"]["hits"] == 8 for message in results)
+    # tagged with their job like every other event
+    assert all(message["jobId"] == messages[-1]["jobId"] for message in results)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from blast import prescreens
+from CONFIG import CONFIG
+from fasta import FastaRecord
+from prescreen import prescreen, screen_sequences
+
+THRESHOLDS = dict(min_length=20, max_n_fraction=0.2, dust_level=20, max_low_complexity=0.5)
+
+
+def random_sequence(length, seed=0):
+    rng = random.Random(seed)
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def screen(*sequences, **overrides):
+    records = [FastaRecord(f"q{index}", sequence) for index, sequence in enumerate(sequences)]
+    rows, masks = screen_sequences(records, **{**THRESHOLDS, **overrides})
+    return rows, masks
+
+
+def test_ordinary_sequences_pass():
+    (row,), (mask,) = screen(random_sequence(300))
+    assert row.passed and row.length == 300
+    assert not mask.any()
+
+
+@pytest.mark.parametrize("sequence, reason", [
+    ("ACGTACGTAC", "shorter than 20 bp"),
+    (random_sequence(50) + "N" * 50, "50.0% N"),
+    ("A" * 200, "low complexity"),
+    ("CA" * 150, "low complexity"),
+])
+def test_failures(sequence, reason):
+    (row,), _ = screen(sequence)
+    assert reason in row.reason
+
+
+def test_thresholds_are_inclusive_limits():
+    sequence = random_sequence(80) + "N" * 20  # exactly 20% N
+    (row,), _ = screen(sequence)
+    assert row.passed
+    (row,), _ = screen(sequence, max_n_fraction=0.19)
+    assert not row.passed
+    (row,), _ = screen(random_sequence(19))
+    assert row.reason == "shorter than 20 bp"
+    (row,), _ = screen(random_sequence(19), min_length=19)
+    assert row.passed
+
+
+def test_masks_cover_only_the_low_complexity_stretch():
+    sequence = random_sequence(300, seed=1) + "A" * 128 + random_sequence(300, seed=2)
+    (row,), (mask,) = screen(sequence)
+    assert row.passed
+    assert mask[300:428].all()
+    # a mask reaches at most one window past the repeat
+    assert not mask[:236].any() and not mask[492:].any()
+
+
+def test_sequences_are_screened_independently():
+    rows, masks = screen("A" * 200, random_sequence(200), "ACGT")
+    assert [row.passed for row in rows] == [False, True, False]
+    assert [len(mask) for mask in masks] == [200, 200, 4]
+
+
+def test_prescreen_keeps_passing_unique_records(monkeypatch):
+    monkeypatch.setitem(CONFIG, "prescreen_mask", True)
+    good = random_sequence(300, seed=3) + "A" * 128 + random_sequence(300, seed=4)
+    records = [FastaRecord("a", good), FastaRecord("a copy", good), FastaRecord("junk", "T" * 100)]
+    kept, rows = prescreen(records, [records[0], records[2]])
+    assert [record.title for record in kept] == ["a"]
+    assert "NNNN" in kept[0].sequence and len(kept[0].sequence) == len(good)
+    assert [row.passed for row in rows] == [True, True, False]
+
+
+def test_prescreen_can_be_turned_off_and_is_nucleotide_only(monkeypatch):
+    monkeypatch.setitem(CONFIG, "prescreen", False)
+    assert not prescreens([("blastn", "nt")])
+    monkeypatch.setitem(CONFIG, "prescreen", True)
+    assert prescreens([("blastn", "nt"), ("tblastx", "nt")])
+    assert not prescreens([("blastp", "nr")])
+    assert not prescreens([("blastn", "nt"), ("tblastn", "nt")])
+
+
+def test_rejections_reach_the_job_status():
+    import asyncio
+
+    import main
+
+    async def run():
+        job_id = main.secrets.token_hex(8)
+        async with main.job_lock:
+            main._create_job_state(job_id)
+        payload = {"screened": 2, "rejected": [{"query": "junk", "reason": "shorter than 20 bp"}]}
+        await main.publish_job_event(job_id, "prescreen", payload)
+        return main._job_snapshot(job_id, main.job_states[job_id]), payload
+
+    snapshot, payload = asyncio.run(run())
+    assert snapshot["prescreen"] == payload
@@ -0,0 +1,60 @@
+import asyncio
+import pstats
+import threading
+from pathlib import Path
+
+import blast
+from blast import in_thread
+from profiling import PROFILE_FILES, JobProfiler, profile_call
+
+
+def busy(n):
+    return sum(i * i for i in range(n)), threading.get_ident()
+
+
+def test_profile_call_off():
+    (total, _), stats = profile_call(False, busy, 10)
+    assert total == 285
+    assert stats is None
+
+
+def test_in_thread_runs_off_the_loop_and_merges_the_profile(tmp_path):
+    profiler = JobProfiler(tmp_path)
+
+    async def run():
+        return await in_thread(profiler, busy, 1000), threading.get_ident()
+
+    (_, worker_thread), loop_thread = asyncio.run(run())
+    assert worker_thread != loop_thread
+    profiler.write()
+    assert "busy" in (tmp_path / "profile_summary.txt").read_text()
+
+
+def test_in_thread_without_profiler():
+    (total, _) = asyncio.run(in_thread(None, busy, 10))
+    assert total == 285
+
+
+def test_profiled_job_writes_its_profile(ncbi, monkeypatch):
+    writers = []
+    write = JobProfiler.write
+
+    def recording_write(self):
+        writers.append(threading.current_thread())
+        return write(self)
+
+    monkeypatch.setattr(JobProfiler, "write", recording_write)
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+
+    fasta = ">q1\n" + "ACGTTGCA" * 20 + "\n"
+    asyncio.run(blast.run_blast_job(fasta, notifier, profile=True, report_format="html"))
+    assert events[-1][0] == "complete", events
+    folder = Path(next(payload for event_type, payload in events if event_type == "folder")["folderId"])
+    assert all((folder / name).exists() for name in PROFILE_FILES)
+    # parsing, indexing and the report ran off the event loop and still show up
+    functions = {name for _, _, name in pstats.Stats(str(folder / "profile.prof")).stats}
+    assert {"parse_archives", "build_hit_index", "write_html_report"} <= functions
+    assert writers and threading.main_thread() not in writers
@@ -0,0 +1,106 @@
+import asyncio
+import csv
+import secrets
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.mock_ncbi import build_archive
+from blast import raw_results_folder, reprocess_job, save_raw_results, stored_config
+from CONFIG import load_config
+
+
+def collect():
+    events = []
+
+    async def notifier(event_type, payload):
+        events.append((event_type, payload))
+    return events, notifier
+
+
+@pytest.fixture
+def job_folder():
+    folder = main.RESULTS_DIR / f"reprocess{secrets.token_hex(4)}"
+    folder.mkdir(parents=True)
+    archive = build_archive("RID1", [("q1", "ACGT" * 30), ("q2", "GGCA" * 30)], 5, 1, 0)
+    result = {"label": None, "rid": "RID1", "queryPrefix": None, "content": archive}
+    save_raw_results([result], folder, {}, load_config(), report_format="html")
+    return folder
+
+
+def test_reprocess_a_reprocessed_version(job_folder):
+    events, notifier = collect()
+    asyncio.run(reprocess_job(job_folder, notifier))
+    version = job_folder / "v2"
+    assert ("folder", {"folderId": version.as_posix()}) in events
+    assert raw_results_folder(version) == job_folder
+
+    events, notifier = collect()
+    asyncio.run(reprocess_job(version, notifier))
+    assert not [payload for event, payload in events if event == "error"]
+    # versions always hang off the job folder, never nest
+    assert ("folder", {"folderId": (job_folder / "v3").as_posix()}) in events
+    assert sorted(path.name for path in (job_folder / "v3").glob("*.csv")) == ["q1.csv", "q2.csv"]
+
+
+def test_reprocess_without_stored_results_is_a_conflict(tmp_path):
+    folder = main.RESULTS_DIR / "norawresults"
+    folder.mkdir(parents=True)
+    assert raw_results_folder(folder) is None
+    with TestClient(main.app) as client:
+        response = client.post(f"/jobs/{folder.name}/reprocess")
+    assert response.status_code == 409
+
+
+def anomalies(folder):
+    with (folder / "q1.csv").open(newline="", encoding="utf-8") as f:
+        return [float(row["anomaly_score"]) for row in csv.DictReader(f)]
+
+
+def test_reprocess_applies_the_new_config_without_touching_earlier_versions(job_folder):
+    asyncio.run(reprocess_job(job_folder, collect()[1]))
+    before = anomalies(job_folder / "v2")
+    config = load_config()
+    # every mock hit title contains "isolate", so no hit misses the keyword any more
+    config = (*config[:4], "isolate", *config[5:])
+    events, notifier = collect()
+    asyncio.run(reprocess_job(job_folder, notifier, config=config))
+    assert anomalies(job_folder / "v2") == before
+    assert sum(anomalies(job_folder / "v3")) < sum(before)
+    assert sorted(payload["query"] for event, payload in events if event == "query_result") == ["q1", "q2"]
+    assert events[-1][0] == "complete"
+
+
+def test_reprocess_keeps_the_searched_program_and_database(job_folder):
+    config = ("F", "5", "blastp", "nr", "isolate", "Pig")
+    asyncio.run(reprocess_job(job_folder, collect()[1], config=config))
+    searched = load_config()
+    assert stored_config(job_folder / "v2") == (*searched[:4], "isolate", "Pig")
+
+
+def test_reprocess_endpoint_runs_a_new_job(job_folder):
+    with TestClient(main.app) as client:
+        started = client.post(f"/jobs/{job_folder.name}/reprocess").json()
+        assert started["cancelToken"]
+        deadline = time.monotonic() + 30
+        while client.get(f"/jobs/{started['jobId']}").json()["status"] == "running":
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        status = client.get(f"/jobs/{started['jobId']}").json()
+    assert status["status"] == "completed"
+    assert status["folderId"] == (job_folder / "v2").as_posix()
+
+
+def test_stored_job_resolves_to_its_latest_version(job_folder):
+    asyncio.run(reprocess_job(job_folder, collect()[1]))
+    # a version whose reprocess never got as far as indexing is skipped
+    (job_folder / "v3").mkdir()
+    assert main.resolve_job_folder(job_folder.name) == job_folder / "v2"
+    assert main.resolve_job_folder(job_folder.name, 1) == job_folder
+    with TestClient(main.app) as client:
+        latest = client.get(f"/jobs/{job_folder.name}/hits").json()
+        assert latest == client.get(f"/jobs/{job_folder.name}/hits", params={"version": 2}).json()
+        assert len(latest["hits"]) == 10
+        assert client.get(f"/jobs/{job_folder.name}/hsps", params={"version": 9}).status_code == 404
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from scoring import _segment_median, first_appearance_codes, rank_scores, score_hits
+
+
+def query_hits(rng, n, outlier=False):
+    """Hits of one query: high identity, one species, unless ``outlier`` makes the last one odd."""
+    hits = {
+        "identity": rng.uniform(97, 100, n),
+        "bit_score": rng.uniform(500, 520, n),
+        "evalue": 10.0 ** -rng.uniform(100, 120, n),
+        "taxid": np.full(n, 9823),
+        "keyword_miss": np.zeros(n, dtype=bool),
+    }
+    if outlier:
+        hits["identity"][-1] = 80
+        hits["bit_score"][-1] = 150
+        hits["evalue"][-1] = 1e-20
+        hits["taxid"][-1] = 9913
+        hits["keyword_miss"][-1] = True
+    return hits
+
+
+def concat(*parts):
+    query = np.concatenate([np.full(len(part["identity"]), code) for code, part in parts])
+    return query, {name: np.concatenate([part[name] for _, part in parts]) for name in parts[0][1]}
+
+
+def test_the_odd_hit_of_a_query_ranks_first():
+    rng = np.random.default_rng(0)
+    query, hits = concat((0, query_hits(rng, 20)), (1, query_hits(rng, 20, outlier=True)))
+    score, rank, components = score_hits(query, **hits)
+    assert np.argmax(score) == 39 and rank[39] == 1
+    assert components["rare_species"][39] == pytest.approx(19 / 20)
+    assert components["keyword_miss"][39] == 1
+    assert sorted(rank) == list(range(1, 41))
+
+
+def test_queries_are_scored_independently_of_each_other():
+    rng = np.random.default_rng(1)
+    alone = query_hits(rng, 15, outlier=True)
+    other = query_hits(rng, 30)
+    query, hits = concat((0, alone), (1, other))
+    together, _, _ = score_hits(query, **hits)
+    by_itself, _, _ = score_hits(np.zeros(15, dtype=np.int64), **alone)
+    np.testing.assert_array_equal(together[:15], by_itself)
+
+
+def test_interleaved_input_scores_like_grouped_input():
+    rng = np.random.default_rng(2)
+    query, hits = concat((0, query_hits(rng, 10, outlier=True)), (1, query_hits(rng, 12)))
+    shuffle = rng.permutation(len(query))
+    grouped, _, _ = score_hits(query, **hits)
+    shuffled, _, _ = score_hits(query[shuffle], **{name: values[shuffle] for name, values in hits.items()})
+    np.testing.assert_array_equal(shuffled, grouped[shuffle])
+
+
+def test_missing_values_and_empty_input():
+    score, rank, _ = score_hits(
+        np.zeros(3, dtype=np.int64),
+        identity=np.array([99.0, np.nan, 98.0]),
+        bit_score=np.array([500.0, 490.0, np.nan]),
+        evalue=np.array([1e-100, np.nan, 0.0]),
+        taxid=np.array([1, 1, 1]),
+        keyword_miss=np.zeros(3, dtype=bool),
+    )
+    assert np.all(np.isfinite(score))
+    empty = np.zeros(0)
+    score, rank, components = score_hits(empty, empty, empty, empty, empty, empty)
+    assert len(score) == len(rank) == 0 and all(len(values) == 0 for values in components.values())
+
+
+def test_segment_median_matches_numpy():
+    rng = np.random.default_rng(3)
+    counts = np.array([1, 2, 5, 8])
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    group = np.repeat(np.arange(len(counts)), counts)
+    values = rng.normal(0, 100, counts.sum())
+    expected = [np.median(values[start:start + count]) for start, count in zip(starts, counts)]
+    np.testing.assert_allclose(_segment_median(values, group, starts, counts), expected)
+
+
+def test_ranks_and_codes():
+    np.testing.assert_array_equal(rank_scores(np.array([1.0, 3.0, 3.0, 2.0])), [4, 1, 2, 3])
+    np.testing.assert_array_equal(first_appearance_codes(np.array([7, 3, 7, 9, 3])), [0, 1, 0, 2, 1])
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.import_time import time_import
+
+
+@pytest.mark.parametrize("module", ["main", "blast", "cli"])
+def test_server_import_path_stays_light(module):
+    # pandas and ReportLab are only imported when a report is rendered
+    assert time_import(module)["loaded"] == []
+
+
+def test_probe_sees_heavy_imports():
+    assert "reportlab" in time_import("report")["loaded"]
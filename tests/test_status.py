@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+
+import main
+
+
+async def new_job():
+    job_id = main.secrets.token_hex(8)
+    async with main.job_lock:
+        main._create_job_state(job_id)
+    return job_id
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def sse_messages(body):
+    """[(event id or None, message)] from an event-stream body, skipping comments."""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "data" in fields:
+            parsed.append((int(fields["id"]) if "id" in fields else None, json.loads(fields["data"])))
+    return parsed
+
+
+def test_status_etag_revalidates_until_the_job_changes():
+    async def run():
+        job_id = await new_job()
+        async with client() as http:
+            first = await http.get(f"/jobs/{job_id}")
+            assert first.status_code == 200
+            assert first.json()["status"] == "running"
+            etag = first.headers["etag"]
+
+            unchanged = await http.get(f"/jobs/{job_id}", headers={"If-None-Match": etag})
+            assert unchanged.status_code == 304
+            assert unchanged.headers["etag"] == etag
+            assert unchanged.content == b""
+
+            await main.publish_job_event(job_id, "status", "Submitting")
+            changed = await http.get(f"/jobs/{job_id}", headers={"If-None-Match": etag})
+            assert changed.status_code == 200
+            assert changed.headers["etag"] != etag
+            assert changed.json()["events"] == 1
+
+            # any tag in the list matches
+            listed = await http.get(
+                f"/jobs/{job_id}", headers={"If-None-Match": f'W/"stale", {changed.headers["etag"]}'}
+            )
+            assert listed.status_code == 304
+
+            assert (await http.get("/jobs/nosuchjob")).status_code == 404
+    asyncio.run(run())
+
+
+def test_events_stream_live_events_and_end_on_the_terminal_one():
+    async def run():
+        job_id = await new_job()
+        await main.publish_job_event(job_id, "status", "before subscribing")
+
+        async def publish():
+            while not main.job_streams.get(job_id):
+                await asyncio.sleep(0.01)
+            await main.publish_job_event(job_id, "status", "Parsing")
+            await main.publish_job_event(job_id, "complete", {"folderId": None})
+            await main.publish_job_event(job_id, "status", "after the end")
+
+        async with client() as http:
+            publisher = asyncio.create_task(publish())
+            response = await http.get(f"/jobs/{job_id}/events")
+            await publisher
+        assert response.headers["content-type"].startswith("text/event-stream")
+        messages = sse_messages(response.text)
+        # no history without replay: the snapshot, then only what came after
+        assert [message["type"] for _, message in messages] == ["snapshot", "status", "complete"]
+        assert messages[0][1]["payload"]["events"] == 1
+        assert [event_id for event_id, _ in messages] == [None, 2, 3]
+        assert not main.job_streams.get(job_id)
+    asyncio.run(run())
+
+
+def test_events_replay_history_of_a_finished_job():
+    async def run():
+        job_id = await new_job()
+        for text in ("Submitting", "Polling"):
+            await main.publish_job_event(job_id, "status", text)
+        await main.publish_job_event(job_id, "error", "boom")
+        async with client() as http:
+            replayed = sse_messages((await http.get(f"/jobs/{job_id}/events?replay=true")).text)
+            resumed = sse_messages(
+                (await http.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "2"})).text
+            )
+            bare = sse_messages((await http.get(f"/jobs/{job_id}/events")).text)
+            missing = await http.get("/jobs/nosuchjob/events")
+        assert [event_id for event_id, _ in replayed] == [None, 1, 2, 3]
+        assert replayed[0][1]["payload"]["status"] == "error"
+        # EventSource reconnects with the last id it saw and gets only the rest
+        assert [(event_id, message["type"]) for event_id, message in resumed] == [
+            (None, "snapshot"), (3, "error")
+        ]
+        assert [message["type"] for _, message in bare] == ["snapshot"]
+        assert missing.status_code == 404
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from CONFIG import CONFIG
+
+FASTA = b">a\nACGTACGT\n>b\nTTTTGGGG\n"
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_raw_body_upload(client):
+    response = client.post("/upload", content=FASTA, headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["records"], data["residues"], data["bytes"]) == (2, 16, len(FASTA))
+    assert (main.UPLOADS_DIR / f"{data['uploadId']}.fasta").read_bytes() == FASTA
+
+
+def test_multipart_upload_streams_only_the_file_field(client):
+    response = client.post(
+        "/upload",
+        data={"note": "ignored"},
+        files={"file": ("x.fasta", FASTA, "text/plain")},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["records"] == 2
+    assert (main.UPLOADS_DIR / f"{data['uploadId']}.fasta").read_bytes() == FASTA
+
+
+def test_multipart_without_file_field(client):
+    response = client.post("/upload", files={"other": ("x.fasta", FASTA, "text/plain")})
+    assert response.status_code == 400
+
+
+def test_oversized_upload_is_rejected(client, monkeypatch):
+    monkeypatch.setitem(CONFIG, "upload_max_bytes", 10)
+    before = set(main.UPLOADS_DIR.iterdir())
+    response = client.post("/upload", content=FASTA)
+    assert response.status_code == 413
+    assert set(main.UPLOADS_DIR.iterdir()) == before
+
+
+def test_oversized_chunked_upload_is_rejected(client, monkeypatch):
+    monkeypatch.setitem(CONFIG, "upload_max_bytes", 10)
+    response = client.post("/upload", content=iter([FASTA[:8], FASTA[8:]]))
+    assert response.status_code == 413
+
+
+def test_invalid_residues_are_rejected(client):
+    response = client.post("/upload", content=b">a\nMKTAYIAK\n")
+    assert response.status_code == 400
+
+
+def test_protein_upload_for_protein_program(client):
+    response = client.post("/upload?program=blastp", content=b">a\nMKTAYIAK\n")
+    assert response.status_code == 200
+
+
+def test_upload_lives_while_its_job_runs_and_goes_with_it(client, monkeypatch):
+    release = threading.Event()
+
+    async def run_blast_job(data, notifier, metrics=None, **kwargs):
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        await notifier("complete", {"folderId": None})
+
+    monkeypatch.setattr(main, "run_blast_job", run_blast_job)
+    started, unused = (
+        client.post("/upload", content=FASTA).json()["uploadId"] for _ in range(2)
+    )
+    paths = [main.UPLOADS_DIR / f"{upload_id}.fasta" for upload_id in (started, unused)]
+    expired = time.time() - main.JOB_RETENTION_SECONDS - 60
+    for path in paths:
+        os.utime(path, (expired, expired))
+    with client.websocket_connect("/") as websocket:
+        websocket.send_text(json.dumps({"action": "start", "uploadId": started}))
+        while json.loads(websocket.receive_text())["type"] != "job_ack":
+            pass
+        client.portal.call(main._cleanup_expired_jobs)
+        # in use, however old; the one never started has expired
+        assert paths[0].exists() and not paths[1].exists()
+        release.set()
+        while json.loads(websocket.receive_text())["type"] != "complete":
+            pass
+    deadline = time.monotonic() + 5
+    while paths[0].exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
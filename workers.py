@@ -0,0 +1,283 @@
+"""Report rendering and result parsing, either in-process or on pools of prewarmed worker processes.
+
+``report`` pulls in pandas and ReportLab, so it is only imported when the
+first report is rendered. With ``CONFIG['report_workers']`` set, rendering
+runs in spawned worker processes that import ``report`` as soon as they
+start; ``prewarm()`` starts them ahead of the first job so no request ever
+waits on those imports, and the event loop stays free while PDFs render.
+``CONFIG['parse_workers']`` does the same for parsing big result archives
+(see parsing.py).
+"""
+import asyncio
+import cProfile
+import importlib
+import marshal
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from CONFIG import CONFIG
+from metrics import WaitLine
+from profiling import profile_call
+
+
+def _warm_imports() -> None:
+    importlib.import_module("report")
+
+
+# ReportLab is not thread-safe: in-process renders take turns
+_INLINE_RENDER_LOCK = threading.Lock()
+
+
+def render_reports(
+    folder_path, config, profile: bool = False, stop: Optional[threading.Event] = None
+) -> Tuple[Dict[str, float], Optional[bytes]]:
+    """Render both PDFs; returns stage timings and, if profiling, marshalled pstats data.
+
+    Once ``stop`` is set no further PDF is started.
+    """
+    from report import generate_blast_full_report, generate_report
+
+    profiler = cProfile.Profile() if profile else None
+    timings: Dict[str, float] = {}
+    for stage, render in (
+        ("report_anomaly", lambda: generate_report(folder_path, config)),
+        ("report_full", lambda: generate_blast_full_report(Path(folder_path), config=config)),
+    ):
+        if stop is not None and stop.is_set():
+            break
+        start = time.monotonic()
+        if profiler:
+            profiler.enable()
+        try:
+            render()
+        finally:
+            if profiler:
+                profiler.disable()
+            timings[stage] = time.monotonic() - start
+    if profiler is None:
+        return timings, None
+    profiler.create_stats()
+    return timings, marshal.dumps(profiler.stats)
+
+
+def _render_inline(folder_path, config, profile, stop):
+    with _INLINE_RENDER_LOCK:
+        return render_reports(folder_path, config, profile, stop)
+
+
+def _terminate(executor: ProcessPoolExecutor) -> None:
+    """Kill an executor's worker processes outright, abandoning whatever they are running."""
+    terminate = getattr(executor, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ReportPool:
+    """Report rendering slots, one worker process each; size 0 renders in-process.
+
+    Each slot is its own single-process executor so a cancelled job's render
+    can be killed without disturbing renders running for other jobs.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: Optional[asyncio.Queue] = None
+        self._executors: List[ProcessPoolExecutor] = []
+        self.line = WaitLine("report_worker")
+
+    def _spawn(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_imports,
+        )
+        self._executors.append(executor)
+        return executor
+
+    def _slots(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(self._spawn())
+        return self._idle
+
+    async def prewarm(self) -> None:
+        """Start every worker now so the first job doesn't pay process start and imports."""
+        if self.size <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        slots = self._slots()
+        executors = [slots.get_nowait() for _ in range(slots.qsize())]
+        try:
+            await asyncio.gather(
+                *(loop.run_in_executor(executor, _warm_imports) for executor in executors)
+            )
+        finally:
+            for executor in executors:
+                slots.put_nowait(executor)
+
+    async def render(self, folder_path, config, profile: bool = False):
+        if self.size <= 0:
+            # in-process, on a thread so the event loop (and a cancel) isn't held up
+            stop = threading.Event()
+            try:
+                return await asyncio.to_thread(_render_inline, folder_path, config, profile, stop)
+            except asyncio.CancelledError:
+                # the PDF being drawn can't be interrupted; the next one isn't started
+                stop.set()
+                raise
+        loop = asyncio.get_running_loop()
+        slots = self._slots()
+        with self.line.waiting():
+            executor = await slots.get()
+        try:
+            return await loop.run_in_executor(
+                executor, render_reports, str(folder_path), tuple(config), profile
+            )
+        except asyncio.CancelledError:
+            # the job was cancelled mid-render: kill its worker and start a warm replacement
+            _terminate(executor)
+            self._executors.remove(executor)
+            executor = self._spawn()
+            loop.run_in_executor(executor, _warm_imports)
+            raise
+        finally:
+            slots.put_nowait(executor)
+
+    def shutdown(self) -> None:
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = []
+        self._idle = None
+
+
+def _warm_parser() -> None:
+    importlib.import_module("parsing")
+
+
+async def _parse_inline(archives, folder_path, non_anomaly_keywords, profiler=None, results=None):
+    from blast import parse_archives
+
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    summaries: List[dict] = []  # appended by the parse thread
+    parsed_more = asyncio.Event()
+
+    def on_query(summary):
+        summaries.append(summary)
+        loop.call_soon_threadsafe(parsed_more.set)
+
+    parse = asyncio.ensure_future(asyncio.to_thread(
+        profile_call, profiler is not None,
+        parse_archives, archives, folder_path, non_anomaly_keywords, stop, on_query,
+    ))
+    sent = 0
+    try:
+        while True:
+            waiter = asyncio.ensure_future(parsed_more.wait())
+            await asyncio.wait({parse, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            parsed_more.clear()
+            finished = parse.done()
+            # everything the thread appended before it finished is in the list by now
+            batch, sent = summaries[sent:], len(summaries)
+            if batch and results is not None:
+                await results(batch)
+            if finished:
+                break
+        written, stats = parse.result()
+    except asyncio.CancelledError:
+        # the thread gives up at its next query
+        stop.set()
+        parse.cancel()
+        raise
+    if stats is not None:
+        profiler.add_marshalled(stats)
+    return written
+
+
+class ParsePool:
+    """Worker processes that parse archives of at least ``min_queries`` members; size 0 parses in-process.
+
+    One executor is shared by every job. When a job is cancelled its
+    chunks that haven't started are dropped; if no other job is parsing
+    the workers are killed outright and fresh ones start on next use,
+    otherwise the chunks already running finish and are thrown away.
+    In-process parses stop at the next query.
+    """
+
+    def __init__(self, size: int, min_queries: int):
+        self.size = size
+        self.min_queries = min_queries
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._active = 0  # jobs parsing on the executor
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_parser,
+            )
+        return self._executor
+
+    async def prewarm(self) -> None:
+        if self.size <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._pool()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_parser) for _ in range(self.size)))
+
+    async def parse(
+        self, archives, folder_path, non_anomaly_keywords, progress=None, profiler=None, results=None
+    ):
+        """Parse like ``blast.parse_archives``; returns {query_title: csv_path}.
+
+        ``progress(done, total)`` is awaited as pooled members finish and
+        ``results(summaries)`` with each batch of ``blast.query_summary``
+        dicts as their queries are decoded. With a JobProfiler the parse is
+        profiled wherever it runs.
+        """
+        if self.size <= 0:
+            return await _parse_inline(archives, folder_path, non_anomaly_keywords, profiler, results)
+        import parsing
+
+        if parsing.member_count(archives) < self.min_queries:
+            # a few queries parse faster inline than they travel to a worker
+            return await _parse_inline(archives, folder_path, non_anomaly_keywords, profiler, results)
+        executor = self._pool()
+        self._active += 1
+        try:
+            return await parsing.parse_in_pool(
+                executor, self.size, archives, folder_path, non_anomaly_keywords, progress, profiler, results
+            )
+        except asyncio.CancelledError:
+            if self._active == 1 and self._executor is executor:
+                _terminate(executor)
+                self._executor = None
+            raise
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory); start fresh ones for the next job
+            self.shutdown()
+            raise
+        finally:
+            self._active -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+REPORT_POOL = ReportPool(CONFIG['report_workers'])
+PARSE_POOL = ParsePool(CONFIG['parse_workers'], CONFIG['parse_pool_min_queries'])